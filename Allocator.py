@@ -0,0 +1,268 @@
+#   ALLOCATOR PROGRAM    #
+
+# =========================================================================== #
+'''
+Program for handing out OCR and summary numbers. The next free number of each
+kind is kept in counters.txt, which is only changed while holding a lock on a
+lock file, so processes running at the same time never hand out the same
+number. Numbers are reserved a block at a time and then taken from memory, so
+most saves do not touch the disk at all. Comments are attempted to be written
+in accordance with PEP 8 Style Guide:
+http://legacy.python.org/dev/peps/pep-0008/#comments
+https://google.github.io/styleguide/pyguide.html
+'''
+# =========================================================================== #
+
+
+
+# ====== Imports (Python Native Modules and My Program Modules) ====== #
+
+from multiprocessing import util
+import Variables as v
+import Storage as D
+import threading
+import pickle
+import time
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+
+# ====== Variable definitions ====== #
+
+# Where the next free number of each kind is kept, and the lock file which is
+# held while it is changed
+counterPath = "counters.txt"
+lockSuffix = ".lock"
+
+# Numbers reserved at a time by each process's allocators
+blockSize = 16
+
+# Counters, with the kind of stored document each one numbers
+counterKinds = {"noOfOCRs": "conversion", "noOfSummaries": "summary"}
+
+
+
+# ====== Counter File Sub-Routines ====== #
+
+def acquire_lock(path, timeout=30):
+    '''Locks the lock file (creating it if needed), waiting while another
+    process holds it. The lock is taken by the operating system, so it is let
+    go of if the process holding it ends - a lock can never be left behind.
+    The file itself is never removed.
+
+    Args:
+        path: Location of the lock file
+        timeout: Seconds to wait at most, or None to wait for as long as it
+            takes
+
+    Returns:
+        The locked file, to be passed to release_lock
+
+    Raises:
+        TimeoutError: The lock could not be taken within timeout seconds
+    '''
+    deadline = None if timeout is None else time.monotonic() + timeout
+    lock = os.open(path, os.O_CREAT | os.O_RDWR)
+    while True:
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                os.lseek(lock, 0, os.SEEK_SET)
+                msvcrt.locking(lock, msvcrt.LK_NBLCK, 1)
+            return lock
+        except OSError:
+            pass
+        if deadline is not None and time.monotonic() > deadline:
+            os.close(lock)
+            raise TimeoutError("Could not lock " + path)
+        time.sleep(0.005)
+
+def release_lock(lock):
+    '''Lets go of a lock taken by acquire_lock.'''
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+        else:
+            os.lseek(lock, 0, os.SEEK_SET)
+            msvcrt.locking(lock, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(lock)
+
+def read_counters(path):
+    '''Reads the counters file.
+
+    Returns:
+        Dictionary of counter names and the next free number
+    '''
+    counters = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                name, separator, value = line.strip().partition("=")
+                if separator:
+                    counters[name] = int(value)
+    except FileNotFoundError:
+        pass
+    return counters
+
+def write_counters(path, counters):
+    '''Writes the counters to a temporary file and renames it into place, so
+    the file is never seen half-written.'''
+    temp = path + "." + str(os.getpid()) + ".tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        for name in sorted(counters):
+            f.write(name + "=" + str(counters[name]) + "\n")
+    os.replace(temp, path)
+
+def first_number(name):
+    '''Works out where a counter starts when counters.txt does not have it
+    yet - after the number in settings (where numbers used to be kept) and
+    after every stored document of its kind.'''
+    numbers = [1, v.settings.get(name, 1)]
+    try:
+        with open("settings.txt", "rb") as f:
+            numbers.append(pickle.load(f).get(name, 1))
+    except Exception:
+        pass
+    if name in counterKinds:
+        numbers.append(D.store().highest_number(counterKinds[name]) + 1)
+    return max(numbers)
+
+def change_counters(change, path=counterPath):
+    '''Changes the counters while holding the lock.
+
+    Args:
+        change: Function given the counters dictionary, which changes it in
+            place and returns a result
+
+    Returns:
+        The result of change
+    '''
+    lock = acquire_lock(path + lockSuffix)
+    try:
+        counters = read_counters(path)
+        result = change(counters)
+        write_counters(path, counters)
+        return result
+    finally:
+        release_lock(lock)
+
+
+
+# ====== Reserving Sub-Routines ====== #
+
+def reserve(name, count=1, path=counterPath):
+    '''Reserves count numbers in a row from a counter.
+
+    Returns:
+        The first of the reserved numbers
+    '''
+    # Worked out before locking, as it may wait on the document store
+    start = None
+    if name not in read_counters(path):
+        start = first_number(name)
+
+    def change(counters):
+        first = counters.get(name)
+        if first is None:
+            first = start if start is not None else first_number(name)
+        counters[name] = first + count
+        return first
+    return change_counters(change, path)
+
+def give_back(name, start, end, path=counterPath):
+    '''Returns the unused numbers start to end (not included) of a reserved
+    block, if nothing has been reserved after them.
+
+    Returns:
+        True if the numbers were given back
+    '''
+    def change(counters):
+        if counters.get(name) == end:
+            counters[name] = start
+            return True
+        return False
+    return change_counters(change, path)
+
+def reset(path=counterPath):
+    '''Starts every counter again from 1 (after the stored documents are
+    cleared).'''
+    for allocator in allocators.values():
+        allocator.next = allocator.end = 0
+    allocators.clear()
+    change_counters(lambda counters: counters.update((name, 1) for name in counterKinds), path)
+
+
+
+# ====== Main ID Allocator Class ====== #
+
+class ID_Allocator:
+    '''Hands out the numbers of one counter within a process.
+
+    Numbers are reserved from counters.txt blockSize at a time and handed out
+    from memory until the block runs out. Numbers left in the block when the
+    process ends are given back if no other process has reserved any since,
+    otherwise they are skipped. Can be used from several threads at once.
+
+    Attributes:
+        self.next: Next number to hand out
+        self.end: Number after the end of the reserved block
+    '''
+    def __init__(self, name, blockSize=blockSize, path=counterPath):
+        '''Inits the class. Assigns all the object wide variables.'''
+        self.name = name
+        self.blockSize = blockSize
+        self.path = path
+        self.next = 0
+        self.end = 0
+        self.lock = threading.Lock()
+
+    def take(self):
+        '''Returns the next number, reserving a new block if needed.'''
+        with self.lock:
+            if self.next >= self.end:
+                self.next = reserve(self.name, self.blockSize, self.path)
+                self.end = self.next + self.blockSize
+            number = self.next
+            self.next += 1
+            return number
+
+    def release(self):
+        '''Gives back the numbers not yet handed out.'''
+        with self.lock:
+            if self.next < self.end:
+                give_back(self.name, self.next, self.end, self.path)
+            self.next = self.end = 0
+
+
+
+# ====== Sub-Routines ====== #
+
+allocators = {}
+
+def take(name, path=counterPath):
+    '''Takes the next number of a counter, using this process's allocator
+    for it. Its unused numbers are given back when the process ends.'''
+    key = (name, path, os.getpid())
+    if key not in allocators:
+        allocator = ID_Allocator(name, blockSize, path)
+        # Run as the process exits, including batch worker processes
+        util.Finalize(allocator, allocator.release, exitpriority=10)
+        allocators[key] = allocator
+    return allocators[key].take()
+
+
+
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    print("This file cannot be run as main...")
+    input()
@@ -0,0 +1,285 @@
+#   BENCHMARK PROGRAM    #
+
+# =========================================================================== #
+'''
+Program for measuring how fast the TL;DR program is. Builds synthetic texts
+of set sizes (the same text every time for the same size and seed), then runs
+each stage of a Summary on its own and reports wall time, peak memory and
+sentences per second. Scorers can be compared against each other and against
+results saved earlier, flagging any stage that has become slower. Comments are
+attempted to be written in accordance with PEP 8 Style Guide:
+http://legacy.python.org/dev/peps/pep-0008/#comments
+https://google.github.io/styleguide/pyguide.html
+'''
+# =========================================================================== #
+
+
+
+# ====== Imports (Python Native Modules and My Program Modules) ====== #
+
+import TLDR_Program as TLDR
+import Allocator as A
+import Storage as D
+import Variables as v
+import tracemalloc
+import argparse
+import tempfile
+import shutil
+import random
+import json
+import time
+import sys
+import os
+
+
+
+# ====== Variable definitions ====== #
+
+# Stages of a Summary, in the order they are run
+stages = ["split_to_sentences", "rank_words", "rank_sentences", "form_summary", "save"]
+
+# Multipliers for sizes such as 1KB, 10MB
+units = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+
+# ====== Synthetic Texts ====== #
+
+def parse_size(size):
+    '''Turns a size such as "100MB" into a number of bytes.'''
+    size = size.upper().strip()
+    for unit in sorted(units, key=len, reverse=True):
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)]) * units[unit])
+    return int(size)
+
+def make_text(size, seed=0):
+    '''Builds a text of about size characters from a made-up vocabulary.
+
+    Word choice follows Zipf's law (like real text) and stop words are mixed
+    in, so every scorer has realistic work to do. The same size and seed always
+    give the same text.
+
+    Returns:
+        Tuple of (title, text)
+    '''
+    rng = random.Random(seed)
+    vocabulary = v.notAcceptedWords + ["word" + str(i) for i in range(20000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    title = " ".join(rng.choices(vocabulary[len(v.notAcceptedWords):], k=4))
+
+    sentences = []
+    length = 0
+    while length < size:
+        words = rng.choices(vocabulary, weights, k=rng.randint(4, 30))
+        if rng.random() < 0.3:
+            words[rng.randrange(len(words))] += ","
+        sentence = " ".join(words).capitalize()
+        # Some sentences end a line, like OCR output
+        if rng.random() < 0.05:
+            sentence += "\n"
+        sentences.append(sentence)
+        length += len(sentence) + 2
+    return title, ". ".join(sentences)[:size]
+
+
+
+# ====== Measuring ====== #
+
+def run_stages(scorer, title, text, summaryAmount, measureMemory):
+    '''Runs each stage of a Summary once.
+
+    Returns:
+        Tuple of (Summary, dictionary of stage and either seconds taken or
+        peak bytes allocated during the stage, above what was already held)
+    '''
+    results = {}
+    if measureMemory:
+        tracemalloc.start()
+
+    S = None
+    for stage in stages:
+        if measureMemory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        # Summary splits the text into sentences when it is created
+        if stage == "split_to_sentences":
+            S = TLDR.new_summary(title, text, summaryAmount, scorer)
+        else:
+            getattr(S, stage)()
+        results[stage] = time.perf_counter() - start
+        if measureMemory:
+            results[stage] = tracemalloc.get_traced_memory()[1] - before
+
+    if measureMemory:
+        tracemalloc.stop()
+    return S, results
+
+def benchmark(scorer, size, summaryAmount=5, repeat=3, seed=0):
+    '''Benchmarks one scorer on one size of text.
+
+    Stages are timed without tracemalloc (which slows Python down), taking the
+    best of repeat runs, then run once more to measure peak memory. Saving is
+    done in a temporary folder, with its own document store and summary
+    numbers, so the real Documents.db, counters.txt and settings are not
+    touched.
+
+    Returns:
+        Dictionary of the results for each stage and in total
+    '''
+    title, text = make_text(size, seed)
+    cwd = os.getcwd()
+    settings = dict(v.settings)
+    with tempfile.TemporaryDirectory() as folder:
+        # The TF-IDF scorer needs the IDF index in the working folder - a
+        # synthetic one is built if there is no real one to copy
+        for name in os.listdir(cwd):
+            if name.startswith(TLDR.I.indexPath):
+                shutil.copy(os.path.join(cwd, name), folder)
+        if scorer == "tfidf" and not os.path.exists(os.path.join(folder, TLDR.I.indexPath)):
+            index = TLDR.I.IDF_Index(os.path.join(folder, TLDR.I.indexPath), writable=True)
+            index.lock()
+            try:
+                for i in range(20):
+                    index.add_document(make_text(20000, seed + i + 1)[1])
+            finally:
+                index.unlock()
+                index.close()
+        os.chdir(folder)
+        # The shared store and allocators are swapped for ones in the folder
+        # while the benchmark runs
+        openStore, allocators = D.openStore, A.allocators
+        D.openStore = D.Document_Store(os.path.join(folder, D.databasePath))
+        D.openStore.pid = os.getpid()
+        A.allocators = {}
+        try:
+            times = None
+            for i in range(repeat):
+                S, run = run_stages(scorer, title, text, summaryAmount, False)
+                times = run if times is None else {stage: min(times[stage], run[stage]) for stage in stages}
+            S, memory = run_stages(scorer, title, text, summaryAmount, True)
+        finally:
+            # Unused numbers are given back to the folder's counters.txt now,
+            # not the real one when the program ends
+            for allocator in A.allocators.values():
+                allocator.release()
+            D.openStore.close()
+            D.openStore, A.allocators = openStore, allocators
+            os.chdir(cwd)
+            v.settings = settings
+
+    sentences = len(S.sentences)
+    result = {"scorer": scorer, "size": size, "sentences": sentences, "stages": {}}
+    for stage in stages:
+        result["stages"][stage] = {"seconds": times[stage], "peakBytes": memory[stage],
+                                   "sentencesPerSecond": sentences / times[stage] if times[stage] else None}
+    total = sum(times.values())
+    result["total"] = {"seconds": total, "peakBytes": max(memory.values()),
+                       "sentencesPerSecond": sentences / total if total else None}
+    return result
+
+
+
+# ====== Reporting ====== #
+
+def result_key(result):
+    '''Key identifying a benchmark in a baseline file.'''
+    return result["scorer"] + "@" + str(result["size"])
+
+def print_result(result):
+    '''Prints a table of one benchmark's results.'''
+    print("\n" + result["scorer"] + " - " + str(result["size"]) + " bytes, " + str(result["sentences"]) + " sentences")
+    print("  {:<20}{:>12}{:>14}{:>18}".format("stage", "seconds", "peak MB", "sentences/sec"))
+    for stage, values in list(result["stages"].items()) + [("total", result["total"])]:
+        rate = values["sentencesPerSecond"]
+        print("  {:<20}{:>12.4f}{:>14.2f}{:>18}".format(stage, values["seconds"], values["peakBytes"] / 1024 ** 2,
+                                                        "-" if rate is None else "{:,.0f}".format(rate)))
+
+def compare(results, first, second):
+    '''Prints how much faster the first scorer is than the second for each
+    size and stage.'''
+    bySize = {}
+    for result in results:
+        bySize.setdefault(result["size"], {})[result["scorer"]] = result
+    for size, scored in sorted(bySize.items()):
+        if first not in scored or second not in scored:
+            continue
+        print("\n" + first + " vs " + second + " - " + str(size) + " bytes (speed-up)")
+        for stage in stages + ["total"]:
+            a = scored[first]["total"] if stage == "total" else scored[first]["stages"][stage]
+            b = scored[second]["total"] if stage == "total" else scored[second]["stages"][stage]
+            if a["seconds"] > 0:
+                print("  {:<20}{:>10.2f}x".format(stage, b["seconds"] / a["seconds"]))
+
+def check_baseline(results, baseline, threshold):
+    '''Compares results against a saved baseline.
+
+    Returns:
+        List of messages, one for each stage which is more than threshold
+        (e.g. 0.2 for 20%) slower than in the baseline
+    '''
+    regressions = []
+    for result in results:
+        old = baseline.get(result_key(result))
+        if old is None:
+            continue
+        for stage in stages + ["total"]:
+            new = result["total"] if stage == "total" else result["stages"][stage]
+            before = old["total"] if stage == "total" else old["stages"].get(stage)
+            if before and new["seconds"] > before["seconds"] * (1 + threshold):
+                regressions.append("REGRESSION " + result_key(result) + " " + stage + ": " +
+                                   "{:.4f}s -> {:.4f}s".format(before["seconds"], new["seconds"]))
+    return regressions
+
+
+
+# ====== Main Sub-Routine ====== #
+
+def main(args):
+    '''Runs the benchmarks from the command line.
+
+    Returns:
+        Exit code - 1 if any regressions were found, otherwise 0
+    '''
+    parser = argparse.ArgumentParser(prog="Benchmark.py", description="Benchmark the TL;DR program stage by stage")
+    parser.add_argument("--sizes", nargs="+", default=["1KB", "100KB", "1MB"],
+                        help="text sizes, e.g. 1KB 10MB 100MB")
+    parser.add_argument("--scorers", nargs="+", default=["frequency"], choices=sorted(TLDR.scorers),
+                        help="scorers to run - with two, they are also compared")
+    parser.add_argument("-n", "--sentences", type=int, default=5, help="sentences in each summary")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs of each stage (best is kept)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic texts")
+    parser.add_argument("--baseline", help="baseline JSON file to check for regressions against")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slow-down counted as a regression (0.2 = 20%%)")
+    args = parser.parse_args(args)
+
+    results = []
+    for size in args.sizes:
+        for scorer in args.scorers:
+            result = benchmark(scorer, parse_size(size), args.sentences, args.repeat, args.seed)
+            print_result(result)
+            results.append(result)
+
+    if len(args.scorers) >= 2:
+        compare(results, args.scorers[1], args.scorers[0])
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = check_baseline(results, json.load(f), args.threshold)
+        print()
+        print("\n".join(regressions) if regressions else "No regressions against " + args.baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({result_key(result): result for result in results}, f, indent=2)
+    return 1 if regressions else 0
+
+
+
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
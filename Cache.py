@@ -0,0 +1,240 @@
+#   CACHE PROGRAM    #
+
+# =========================================================================== #
+'''
+Program for remembering results which have already been worked out, so they
+can be returned straight away when the same input is seen again. Holds a small
+in-memory cache in front of a larger one stored on disk. Comments are
+attempted to be written in accordance with PEP 8 Style Guide:
+http://legacy.python.org/dev/peps/pep-0008/#comments
+https://google.github.io/styleguide/pyguide.html
+'''
+# =========================================================================== #
+
+
+
+# ====== Imports (Python Native Modules and My Program Modules) ====== #
+
+from collections import OrderedDict
+import threading
+import hashlib
+import os
+
+
+
+# ====== Key Sub-Routine ====== #
+
+def make_key(*parts):
+    '''Hashes all of the parts together into one cache key.
+
+    Returns:
+        String of the SHA-256 hash in hexadecimal
+    '''
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8", "surrogatepass")
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+
+# ====== Cache Classes ====== #
+
+class LRU_Cache:
+    '''In-memory cache holding at most maxItems values.
+
+    The least recently used value is removed when the cache is full.
+
+    Attributes:
+        self.items: Keys and values, least recently used first
+        self.hits, self.misses, self.evictions: Counters for cache use
+    '''
+    def __init__(self, maxItems=256):
+        '''Inits the class. Assigns all the object wide variables.'''
+        self.maxItems = maxItems
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        '''Returns the value for the key, or None if it is not cached.'''
+        with self.lock:
+            if key not in self.items:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return self.items[key]
+
+    def put(self, key, value):
+        '''Adds a value, removing the least recently used ones if full.'''
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxItems:
+                self.items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        '''Removes every value.'''
+        with self.lock:
+            self.items.clear()
+
+    def stats(self):
+        '''Returns a dictionary of the counters.'''
+        return {"items": len(self.items), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+
+class Disk_Cache:
+    '''Cache holding values (bytes) as files in a folder, up to maxBytes in
+    total.
+
+    Each value is written to a temporary file and renamed into place, so other
+    processes sharing the folder never read half-written values. Reading a
+    value updates its modified time, and the least recently used files are
+    deleted when the folder grows past maxBytes. The folder is only looked at
+    when the cache is first used.
+
+    Attributes:
+        self.sizes: File names and sizes, least recently used first
+        self.hits, self.misses, self.evictions: Counters for cache use
+    '''
+    def __init__(self, folder, maxBytes=16 * 1024 * 1024):
+        '''Inits the class. Assigns all the object wide variables.'''
+        self.folder = folder
+        self.maxBytes = maxBytes
+        self.sizes = None
+        self.total = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load(self):
+        '''Lists the files already in the folder, oldest first.'''
+        self.sizes = OrderedDict()
+        self.total = 0
+        if not os.path.isdir(self.folder):
+            return
+        entries = [(f.stat(), f.name) for f in os.scandir(self.folder)
+                   if f.is_file() and f.name.endswith(".cache")]
+        for stat, name in sorted(entries, key=lambda entry: entry[0].st_mtime):
+            self.sizes[name] = stat.st_size
+            self.total += stat.st_size
+
+    def get(self, key):
+        '''Returns the value for the key, or None if it is not cached.'''
+        name = key + ".cache"
+        with self.lock:
+            if self.sizes is None:
+                self.load()
+            try:
+                path = os.path.join(self.folder, name)
+                with open(path, "rb") as f:
+                    value = f.read()
+                os.utime(path)
+            except OSError:
+                # Not cached, or removed by another process
+                self.misses += 1
+                return None
+            if name not in self.sizes:
+                self.total += len(value)
+            self.sizes[name] = len(value)
+            self.sizes.move_to_end(name)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        '''Writes a value, deleting the least recently used ones if the folder
+        is over maxBytes.'''
+        name = key + ".cache"
+        with self.lock:
+            if self.sizes is None:
+                self.load()
+            os.makedirs(self.folder, exist_ok=True)
+            path = os.path.join(self.folder, name)
+            temp = path + "." + str(os.getpid()) + "." + str(threading.get_ident()) + ".tmp"
+            with open(temp, "wb") as f:
+                f.write(value)
+            os.replace(temp, path)
+            self.total += len(value) - self.sizes.get(name, 0)
+            self.sizes[name] = len(value)
+            self.sizes.move_to_end(name)
+            while self.total > self.maxBytes and len(self.sizes) > 1:
+                oldest, size = self.sizes.popitem(last=False)
+                self.total -= size
+                self.evictions += 1
+                try:
+                    os.remove(os.path.join(self.folder, oldest))
+                except OSError:
+                    pass
+
+    def clear(self):
+        '''Deletes every cached file.'''
+        with self.lock:
+            self.load()
+            for name in self.sizes:
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass
+            self.sizes.clear()
+            self.total = 0
+
+    def stats(self):
+        '''Returns a dictionary of the counters.'''
+        return {"items": len(self.sizes or ()), "bytes": self.total, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+
+class Two_Tier_Cache:
+    '''In-memory LRU cache in front of a disk cache.
+
+    Values found on disk are copied into memory. Values are turned into bytes
+    for the disk with encode, and back again with decode.
+    '''
+    def __init__(self, memory, disk, encode, decode):
+        '''Inits the class. Assigns all the object wide variables.'''
+        self.memory = memory
+        self.disk = disk
+        self.encode = encode
+        self.decode = decode
+
+    def get(self, key):
+        '''Returns the value for the key, or None if neither tier has it.'''
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        data = self.disk.get(key)
+        if data is None:
+            return None
+        value = self.decode(data)
+        self.memory.put(key, value)
+        return value
+
+    def put(self, key, value):
+        '''Adds a value to both tiers.'''
+        self.memory.put(key, value)
+        self.disk.put(key, self.encode(value))
+
+    def clear(self):
+        '''Removes every value from both tiers.'''
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self):
+        '''Returns a dictionary of the counters of each tier.'''
+        return {"memory": self.memory.stats(), "disk": self.disk.stats()}
+
+
+
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    print("This file cannot be run as main...")
+    input()
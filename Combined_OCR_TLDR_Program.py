@@ -19,7 +19,14 @@ https://google.github.io/styleguide/pyguide.html
 import TLDR_Program as TLDR
 import OCR_Program as OCR
 import Encryption as E
+import IDF_Index as I
+import Allocator as A
+import Storage as D
 import Variables as v
+import multiprocessing
+import itertools
+import threading
+import queue
 import time
 import os
 import pickle
@@ -32,18 +39,22 @@ from PIL import ImageTk, Image
 # ====== Pre-Interface Processes ====== #
 
 def checkFiles():
-    '''Sub-routine for clearing any files older than the spefified length of
-    time. Default is 30 days, but may be changed by the user in the settings
-    tab.
+    '''Sub-routine for clearing any documents and files older than the
+    spefified length of time. Default is 30 days, but may be changed by the
+    user in the settings tab.
     '''
     # Initialising the current time and identifying the file directories
     now = time.time()
+    D.store().delete_older(now - v.settings["noOfDays"] * 8400)
     paths = ["Summaries", "OCR_Images", "OCR_Conversions"]
     # Gets a currently working directory (cwd) - file from which the program
     # is being run and appends the name of the folder within for checking.
-    # If file is older than the specified time, delete the file.
+    # If file is older than the specified time, delete the file. The folders
+    # only hold files saved before the document store was used.
     for i in paths:
         path = os.path.join(os.getcwd(), i)
+        if not os.path.isdir(path):
+            continue
         for f in os.listdir(path):
             f = os.path.join(path, f)
             if os.stat(f).st_mtime < now - v.settings["noOfDays"] * 8400:
@@ -51,6 +62,303 @@ def checkFiles():
                     os.remove(f)
 
 
+# ====== Background Jobs ====== #
+
+class Cancelled(Exception):
+    '''Raised inside a background job once it has been cancelled.'''
+    pass
+
+def run_job(function, args, messages, settings, job):
+    '''Runs a job away from the interface, sending ("progress", message) as
+    each stage starts and then either ("done", result) or ("error", message)
+    through the messages queue.
+
+    The function is given progress, check and commit. job is the
+    Background_Job (or a Worker_Job in the worker process). Once the job is
+    cancelled, the next progress message or call to check raises Cancelled,
+    stopping the job. commit runs the job's last step (e.g. saving) - it is
+    checked for cancelling in the same step as the job is marked as
+    committed, after which it can no longer be cancelled, so a job is never
+    both cancelled and saved.
+    '''
+    v.settings = settings
+    def check():
+        if job.is_cancelled():
+            raise Cancelled()
+    def progress(message):
+        check()
+        messages.put(("progress", message))
+    def commit(action):
+        with job.lock:
+            check()
+            job.set_committed()
+        return action()
+    try:
+        check()
+        messages.put(("done", function(*args, progress=progress, check=check, commit=commit)))
+    except Cancelled:
+        pass
+    except Exception as e:
+        messages.put(("error", str(e)))
+
+def convert_job(file, reConvert=False, progress=None, check=None, commit=None):
+    '''Converts one image in the worker process (see OCR_Program.convert
+    and OCR_Program.cleanup). The conversion is saved through commit.'''
+    function = OCR.cleanup if reConvert else OCR.convert
+    imageData = function(file, progress, commit)
+    OCR.wait_for_archives()
+    return imageData
+
+def convert_pages_job(file, progress=None, check=None, commit=None):
+    '''Converts a multi-page image in the worker process, sending each
+    page's text back as ("page", page number, text) as soon as it is read.
+    If cancelled, the conversion is closed at the next page, which saves the
+    pages read so far (see OCR_Program.convert_pages).'''
+    progress("Reading page 1")
+    pages = OCR.convert_pages(file)
+    try:
+        for pageNumber, text in pages:
+            progress(("page", pageNumber, text))
+            progress("Reading page " + str(pageNumber + 1))
+    finally:
+        pages.close()
+    OCR.wait_for_archives()
+
+def summary_job(session, title, summaryAmount, text, source=None, progress=None, check=None, commit=None):
+    '''Brings a TL;DR session up to date and summarises the text in a
+    background thread. If source is given (a stored document's id or an
+    encrypted file's path), the whole of it is read and summarised instead of
+    text - it is decrypted a chunk at a time, checking for cancelling between
+    chunks. The summary is saved through commit (see run_job).'''
+    if source is not None:
+        progress("Read document")
+        file = D.store().open(source) if isinstance(source, int) else open(source, "rb")
+        try:
+            pieces = []
+            for piece in E.read_stream(file):
+                check()
+                pieces.append(piece)
+        finally:
+            file.close()
+        text = "".join(pieces)
+    session.set_title(title)
+    session.summaryAmount = summaryAmount
+    summary = session.summarise(text, progress=progress, check=check, save=False)
+    progress("Save")
+    commit(session.save)
+    return summary
+
+class Worker_Job:
+    '''A job as seen from inside the worker process (see Job_Worker). It is
+    cancelled and committed through job numbers shared with the interface,
+    and tags the messages it sends back with its number.'''
+    def __init__(self, number, messages, lock, cancelledJobs, committedJob):
+        '''Inits the class. Assigns the object wide variables.'''
+        self.number = number
+        self.messages = messages
+        self.lock = lock
+        self.cancelledJobs = cancelledJobs
+        self.committedJob = committedJob
+
+    def put(self, message):
+        '''Sends a message back to the interface.'''
+        self.messages.put((self.number,) + message)
+
+    def is_cancelled(self):
+        '''Returns True once the interface has cancelled the job.'''
+        return self.cancelledJobs[self.number % len(self.cancelledJobs)] == self.number
+
+    def set_committed(self):
+        '''Marks the job as having started its last step (the caller holds
+        the lock).'''
+        self.committedJob.value = self.number
+
+def work(tasks, messages, lock, cancelledJobs, committedJob, finishedJob):
+    '''Main loop of the worker process - runs each job sent through tasks
+    in turn, until None is sent.'''
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        number, function, args, settings = task
+        job = Worker_Job(number, messages, lock, cancelledJobs, committedJob)
+        run_job(function, args, job, settings, job)
+        with lock:
+            finishedJob.value = number
+
+class Job_Worker:
+    '''One long-lived process which runs every process job in turn, so what
+    the jobs load (the OCR engine - with tesserocr, Tesseract's language data)
+    is kept for the next job.
+
+    Jobs are numbered in the order sent. The numbers of the jobs cancelled
+    (each in the slot of its number, as a cancelled job may still be
+    finishing its step when the next is cancelled), the job committed and the
+    job last finished are shared with the process, and changed under one
+    lock, so the interface and the worker always agree on whether a job was
+    cancelled or saved.
+
+    Attributes:
+        self.process: The worker process
+        self.tasks: Queue of (job number, function, args, settings) to run
+        self.messages: Queue of (job number, kind, payload) sent back
+        self.inboxes: Messages received for each running job, by job number
+    '''
+    def __init__(self):
+        '''Inits the class and starts the process.'''
+        # Spawned rather than forked, so the new process does not share the
+        # interface's threads or windows
+        context = multiprocessing.get_context("spawn")
+        self.tasks = context.Queue()
+        self.messages = context.Queue()
+        self.lock = context.Lock()
+        self.cancelledJobs = context.Array("q", 64, lock=False)
+        self.committedJob = context.Value("q", 0, lock=False)
+        self.finishedJob = context.Value("q", 0, lock=False)
+        self.numbers = itertools.count(1)
+        self.inboxes = {}
+        self.process = context.Process(target=work, args=(self.tasks, self.messages, self.lock, self.cancelledJobs,
+                                                          self.committedJob, self.finishedJob), daemon=True)
+        self.process.start()
+
+    def submit(self, function, args):
+        '''Sends a job to the process.
+
+        Returns:
+            Tuple of (job number, queue the job's messages are put in)
+        '''
+        number = next(self.numbers)
+        self.inboxes[number] = queue.Queue()
+        self.tasks.put((number, function, args, v.settings))
+        return number, self.inboxes[number]
+
+    def collect(self):
+        '''Moves the messages sent back into each job's inbox. Messages for
+        jobs no longer being watched (cancelled) are dropped.'''
+        while True:
+            try:
+                number, kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if number in self.inboxes:
+                self.inboxes[number].put((kind, payload))
+
+    def cancel(self, number):
+        '''Cancels a job, which stops at its next check (see run_job).
+
+        Returns:
+            True if the job was cancelled, False if it has already started
+            its last step or finished
+        '''
+        with self.lock:
+            if self.committedJob.value == number or self.finishedJob.value >= number:
+                return False
+            self.cancelledJobs[number % len(self.cancelledJobs)] = number
+        self.inboxes.pop(number, None)
+        return True
+
+    def forget(self, number):
+        '''Stops keeping messages for a job which has ended.'''
+        self.inboxes.pop(number, None)
+
+    def stop(self, timeout=30):
+        '''Lets the job in progress finish, then ends the process.'''
+        self.tasks.put(None)
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+# Started when the first process job is run, and again if it ever dies
+jobWorker = None
+
+def job_worker():
+    '''Returns the running Job_Worker, starting one if needed.'''
+    global jobWorker
+    if jobWorker is None or not jobWorker.process.is_alive():
+        jobWorker = Job_Worker()
+    return jobWorker
+
+class Background_Job:
+    '''A job run away from the interface, so the window keeps responding.
+
+    Jobs which may take a long time (OCR) are run by the worker process (see
+    Job_Worker). Jobs which need objects kept by the interface (the TL;DR
+    session) run in a thread instead. Either way a cancelled job stops at its
+    next check for cancelling (see run_job) - unless it has already started
+    its last step, when it can no longer be cancelled.
+
+    Attributes:
+        self.messages: Queue of messages sent back by the job
+        self.finished: True once the job has ended, for any reason
+        self.committed: True once a thread job has started its last step
+    '''
+    def __init__(self, function, args, useProcess=True):
+        '''Inits the class and starts the job.'''
+        self.useProcess = useProcess
+        self.finished = False
+        self.committed = False
+        self.lock = threading.Lock()
+        if useProcess:
+            self.worker = job_worker()
+            self.number, self.messages = self.worker.submit(function, args)
+        else:
+            self.cancelled = threading.Event()
+            self.messages = queue.Queue()
+            self.worker = threading.Thread(target=run_job, args=(function, args, self.messages, v.settings, self),
+                                           daemon=True)
+            self.worker.start()
+
+    def is_cancelled(self):
+        '''Returns True once a thread job has been cancelled.'''
+        return self.cancelled.is_set()
+
+    def set_committed(self):
+        '''Marks a thread job as having started its last step (the caller
+        holds the lock).'''
+        self.committed = True
+
+    def poll(self):
+        '''Returns every message sent since the last poll. Ends with
+        ("error", ...) if the job stopped without saying why.'''
+        if self.useProcess:
+            alive = self.worker.process.is_alive()
+            self.worker.collect()
+        else:
+            alive = self.worker.is_alive()
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                break
+        if any(kind in ("done", "error") for kind, payload in messages):
+            self.finished = True
+        elif not alive and not self.finished:
+            self.finished = True
+            messages.append(("error", "The job stopped unexpectedly"))
+        if self.finished and self.useProcess:
+            self.worker.forget(self.number)
+        return messages
+
+    def cancel(self):
+        '''Stops the job.
+
+        Returns:
+            True if the job was cancelled (it stops at its next check), False
+            if it had already started its last step and is left to finish
+        '''
+        if self.useProcess:
+            if not self.worker.cancel(self.number):
+                return False
+        else:
+            with self.lock:
+                if self.committed:
+                    return False
+                self.cancelled.set()
+        self.finished = True
+        return True
+
+
            
 # ====== Creating the Interface ====== #
 
@@ -64,11 +372,77 @@ class Page(tk.Frame):
     def __init__(self, *args, **kwargs):
         '''Inits Page with the tkinter frame'''
         tk.Frame.__init__(self, *args, **kwargs)
+        self.job = None
 
     def show(self):
         '''Performs the page lift operation'''
         self.lift()
 
+    # == Background Jobs == #
+
+    def add_job_widgets(self, frame):
+        '''Packs a label showing the running job's progress and a button for
+        cancelling it into the frame.'''
+        self.cancelButton = tk.Button(frame, text="Cancel", state="disabled", command=self.cancel_job)
+        self.cancelButton.pack(side="bottom")
+        self.statusLabel = tk.Label(frame, text="")
+        self.statusLabel.pack(side="bottom")
+
+    def start_job(self, function, args, onDone, useProcess=True):
+        '''Runs the function in the background (see Background_Job), checking
+        for progress every 100ms. onDone is called with the job's result.'''
+        if self.job is not None:
+            messagebox.showinfo("Busy", "Please wait for the current job to finish, or cancel it")
+            return
+        self.onDone = onDone
+        self.statusLabel.configure(text="Starting...")
+        self.cancelButton.configure(state="normal")
+        self.job = Background_Job(function, args, useProcess)
+        self.after(100, self.poll_job)
+
+    def poll_job(self):
+        '''Shows the job's progress, and its result or error once it ends.'''
+        if self.job is None:
+            return
+        job = self.job
+        for kind, payload in job.poll():
+            if kind == "progress":
+                self.show_progress(payload)
+            elif kind == "done":
+                self.end_job("Done")
+                self.onDone(payload)
+            elif kind == "error":
+                self.end_job("Failed")
+                self.job_failed(payload)
+        if not job.finished:
+            self.after(100, self.poll_job)
+
+    def show_progress(self, message):
+        '''Shows a progress message from the running job.'''
+        self.statusLabel.configure(text=str(message))
+
+    def job_failed(self, message):
+        '''Shows the error which stopped the job.'''
+        messagebox.showinfo("Error", "An unexpected error occured:\n"+'"'+str(message)+'"')
+
+    def end_job(self, status):
+        '''Tidies up once the job has ended.'''
+        self.job = None
+        self.statusLabel.configure(text=status)
+        self.cancelButton.configure(state="disabled")
+
+    def cancel_job(self):
+        '''Stops the running job, unless it is already saving, when it is
+        left to finish.'''
+        if self.job is not None and self.job.cancel():
+            self.end_job("Cancelled")
+            self.job_cancelled()
+
+    def job_cancelled(self):
+        '''Called after the job is cancelled, for pages to throw away
+        anything the job may have left part-done.'''
+        pass
+
 
 class Home_Page(Page):
     '''Page containing an introduction to the project.
@@ -168,7 +542,9 @@ class Settings_Page(Page):
 
     def reset(self):
         '''Resets the settings dictionary and removes settings.txt and all files
-        from the folders Settings, OCR_Images, and OCR_Conversions.
+        from the folders Settings, OCR_Images, and OCR_Conversions. Stored
+        documents are deleted, numbering starts again from 1 and the IDF index
+        is emptied.
         
         Raises:
             FileNotFoundError: The file settings.txt did not exist
@@ -176,11 +552,20 @@ class Settings_Page(Page):
         '''
         print("RESETTING...")
         v.settings = {"noOfDays":30, "noOfSummaries":1, "noOfOCRs":1}
+        TLDR.cache.clear()
+        OCR.cache.clear()
+        OCR.wait_for_archives()
+        D.store().clear()
+        A.reset()
+        # Numbering starts again, so old names must not count as indexed
+        I.clear()
         try:
             os.remove("Settings.txt")
             paths = ["Summaries", "OCR_Images", "OCR_Conversions"]
             for i in paths:
                 path = os.path.join(os.getcwd(), i)
+                if not os.path.isdir(path):
+                    continue
                 for f in os.listdir(path):
                     f = os.path.join(path, f)
                     if os.path.isfile(f):
@@ -220,6 +605,7 @@ class TLDR_Page(Page):
         # ===== Right Side of Page ===== #
         sTextBoxFrame = tk.Frame(self, width=70, height=100, padx=75, pady=50, bg="purple")
         sTextBoxFrame.pack(side="right", fill="both", expand=True)
+        self.add_job_widgets(sTextBoxFrame)
         var = tk.IntVar()
         self.noOfSentences = tk.Entry(sTextBoxFrame, textvariable=var)
         self.noOfSentences.pack(side="bottom")
@@ -227,6 +613,16 @@ class TLDR_Page(Page):
         getSummary.pack(side="bottom")      
         addFile = tk.Button(sTextBoxFrame, text="Add Text to Summarise", command=self.file_browser)
         addFile.pack(side="bottom")
+        pageFrame = tk.Frame(sTextBoxFrame, bg="purple")
+        pageFrame.pack(side="bottom")
+        self.previousButton = tk.Button(pageFrame, text="<", state="disabled",
+                                        command=lambda: self.show_page(self.page - 1))
+        self.previousButton.pack(side="left")
+        self.pageLabel = tk.Label(pageFrame, text="")
+        self.pageLabel.pack(side="left")
+        self.nextButton = tk.Button(pageFrame, text=">", state="disabled",
+                                    command=lambda: self.show_page(self.page + 1))
+        self.nextButton.pack(side="left")
         self.summaryBox = tk.Text(sTextBoxFrame, width=75, height=150, bg="pink")
         self.summaryBox.pack(side="top", expand=True)
 
@@ -240,14 +636,26 @@ class TLDR_Page(Page):
         self.mainBox = tk.Text(textBoxFrame, width=75, height=150, bg="light blue")
         self.mainBox.pack(side="bottom", fill="both", expand=True)
 
+        # Summary session kept between clicks so edits are summarised
+        # incrementally
+        self.session = None
+        # Document being paged through in self.mainBox (one chunk at a time)
+        # and where it came from
+        self.reader = None
+        self.source = None
+        self.page = 0
+
     def get_summary(self):
-        '''Calls External TLDR module to summarise text.
+        '''Calls External TLDR module to summarise text, in the background so
+        the window keeps responding.
         
         Attributes:
             title: Text extracted from self.titlebox
             text: Text extracted from self.mainBox
             summaryAmount: Integer extracted from self.noOfSentences
             summary: the returned summary of text from the TLDR module
+            self.session: TLDR summary session reused between clicks, so only
+                edited sentences are re-counted and re-scored
 
         Raises:
             TypeError: A non-integer was entered into self.noOfSentences
@@ -259,12 +667,18 @@ class TLDR_Page(Page):
         '''
         title = self.titleBox.get(1.0, "end-1c")
         text = self.mainBox.get(1.0, "end-1c")
+        # A file too long for one page is summarised whole, not just the
+        # page showing
+        source = None
+        if self.reader is not None and len(self.reader.chunks) > 1:
+            source = self.source
         try:
             summaryAmount = int(str(self.noOfSentences.get()))
             print(type(summaryAmount), summaryAmount)
-            summary = TLDR.summarise(title, text, summaryAmount)
-            self.summaryBox.delete(1.0, "end-1c")
-            self.summaryBox.insert(1.0, summary)
+            if self.session is None:
+                self.session = TLDR.Summary_Session(title, summaryAmount)
+            self.start_job(summary_job, (self.session, title, summaryAmount, text, source), self.show_summary,
+                           useProcess=False)
         except TypeError:
             errorBox = messagebox.showinfo("Type Error", "You must enter an integer")
         except (UnicodeEncodeError, UnicodeDecodeError) as e:
@@ -272,24 +686,95 @@ class TLDR_Page(Page):
         except Exception as e:
             errorBox = messagebox.showinfo("Error", "An unexpected error occured:\n"+'"'+str(e)+'"')
 
+    def show_summary(self, summary):
+        '''Shows the finished summary.'''
+        self.summaryBox.delete(1.0, "end-1c")
+        self.summaryBox.insert(1.0, summary)
+
+    def job_failed(self, message):
+        '''Throws away the session (it may be part-updated) and shows the
+        error.'''
+        self.session = None
+        Page.job_failed(self, message)
+
+    def job_cancelled(self):
+        '''Throws away the session, which may be part-updated.'''
+        self.session = None
+
     def file_browser(self):
-        '''Opens a tkinter File Browser to select .txt files for summarising.
-        
-        Attributes:
-            self.filename: Path to selected file from file browser
-            text: Text from self.filename
+        '''Opens a list of the stored conversions and summaries, newest
+        first, to select one for summarising. "Other File..." opens a tkinter
+        File Browser instead, for encrypted .txt files kept outside the
+        document store.
 
         Raises:
             Exception: Any error flagged and returned with error message
         '''
-        self.filename = askopenfilename(initialdir='OCR_Conversions', filetypes=[('Text files', '*.txt')])
         try:
-            with open(self.filename, "r", encoding="utf-8") as f:
-                text = f.read()
-                self.mainBox.delete(1.0, "end-1c")
-                self.mainBox.insert(1.0, E.decrypt(text))
+            documents = D.store().documents(["conversion", "summary"])
         except Exception as e:
             errorBox = messagebox.showinfo("Error", "An unexpected error occured:\n"+'"'+str(e)+'"')
+            return
+        window = tk.Toplevel(self)
+        window.title("Stored Documents")
+        documentList = tk.Listbox(window, width=60, height=20)
+        documentList.pack(side="top", fill="both", expand=True)
+        for document in documents:
+            documentList.insert("end", document["name"] + "  (" + str(document["text_size"]) + " characters)")
+
+        def open_selected(event=None):
+            selection = documentList.curselection()
+            if selection:
+                window.destroy()
+                self.open_document(documents[selection[0]]["id"])
+
+        def open_other():
+            window.destroy()
+            filename = askopenfilename(initialdir='OCR_Conversions', filetypes=[('Text files', '*.txt')])
+            if filename:
+                self.open_document(filename)
+
+        documentList.bind("<Double-Button-1>", open_selected)
+        openButton = tk.Button(window, text="Open", command=open_selected)
+        openButton.pack(side="left")
+        otherButton = tk.Button(window, text="Other File...", command=open_other)
+        otherButton.pack(side="right")
+
+    def open_document(self, source):
+        '''Opens a stored document (by id) or an encrypted file (by path).
+        Only the first page (chunk) is read and shown - the arrow buttons move
+        between pages.
+
+        Attributes:
+            self.source: The document's id or the file's path
+            self.reader: Reader for the document, kept open for paging
+        '''
+        try:
+            reader = D.store().reader(source) if isinstance(source, int) else E.Encrypted_Reader(source)
+        except Exception as e:
+            errorBox = messagebox.showinfo("Error", "An unexpected error occured:\n"+'"'+str(e)+'"')
+            return
+        if self.reader is not None:
+            self.reader.close()
+        self.source = source
+        self.reader = reader
+        self.session = None
+        self.show_page(0)
+
+    def show_page(self, page):
+        '''Reads, decrypts and shows one page of the open file.'''
+        pages = max(len(self.reader.chunks), 1)
+        try:
+            text = self.reader.read_chunk(page) if self.reader.chunks else ""
+        except Exception as e:
+            errorBox = messagebox.showinfo("Error", "An unexpected error occured:\n"+'"'+str(e)+'"')
+            return
+        self.page = page
+        self.mainBox.delete(1.0, "end-1c")
+        self.mainBox.insert(1.0, text)
+        self.pageLabel.configure(text="Page " + str(page + 1) + " of " + str(pages))
+        self.previousButton.configure(state="normal" if page > 0 else "disabled")
+        self.nextButton.configure(state="normal" if page < pages - 1 else "disabled")
        
 
 class OCR_Page(Page):
@@ -328,6 +813,7 @@ class OCR_Page(Page):
         # ===== Left of Page ===== #
         leftFrame = tk.Frame(mainFrame, width=70, height=500, padx=75, pady=50, bg="blue")
         leftFrame.pack(side="left", fill="both", expand=True)
+        self.add_job_widgets(leftFrame)
         browsebutton = tk.Button(leftFrame, text="BrowseFiles", command=self.file_browser)
         browsebutton.pack(side="top")
         self.imageLabel = tk.Label(leftFrame, width=300, height=20, padx=50, pady=50, bg="red")
@@ -348,7 +834,7 @@ class OCR_Page(Page):
         Raises:
             Exception: Any error flagged and returned with error message
         '''
-        self.filename = askopenfilename(initialdir='C:/users/Liam/Pictures', filetypes=[("Image Formats", '*.jpg;*.jpeg;*.gif;*.png;*.bmp')])
+        self.filename = askopenfilename(initialdir='C:/users/Liam/Pictures', filetypes=[("Image Formats", '*.jpg;*.jpeg;*.gif;*.png;*.bmp;*.tif;*.tiff')])
         try:
             img = ImageTk.PhotoImage(Image.open(self.filename))
             w = img.width()
@@ -361,7 +847,9 @@ class OCR_Page(Page):
             errorBox = messagebox.showinfo("Error", "An unexpected error occured:\n"+'"'+str(e)+'"')
 
     def convert(self):
-        '''Calls the OCR module to convert the image to text.
+        '''Calls the OCR module to convert the image to text, in a background
+        process so the window keeps responding. Multi-page images (e.g. TIFF
+        documents) are shown page by page as each is read.
         
         Attributes:
             text: Returned text from OCR conversion
@@ -372,19 +860,19 @@ class OCR_Page(Page):
             Exception: Any other error flagged and returned with error message
         '''
         try:
-            imageData = OCR.convert(self.filename)
-            self.filename = imageData[1]
-            text = imageData[0]
-            print(self.filename)
-            self.outputBox.delete(1.0, "end-1c")
-            self.outputBox.insert(1.0, text)
+            if OCR.page_count(self.filename) > 1:
+                self.outputBox.delete(1.0, "end-1c")
+                self.start_job(convert_pages_job, (self.filename,), lambda result: None)
+                return
+            self.start_job(convert_job, (self.filename, False), self.show_conversion)
         except UnicodeEncodeError as e:
             errorBox = messagebox.showinfo("Unicode Encode/Decode Error", "An error occured:\n"+'"'+str(e)+'"')
         except Exception as e:
             errorBox = messagebox.showinfo("Error", "An unexpected error occured:\n"+'"'+str(e)+'"')
 
     def re_convert(self):
-        '''Calls the OCR module, starting with the cleanup process.
+        '''Calls the OCR module, starting with the cleanup process, in a
+        background process.
         
         Attributes:
             text: Returned text from OCR conversion
@@ -395,14 +883,34 @@ class OCR_Page(Page):
             Exception: Any other error flagged and returned with error message
         '''
         try:
-            imageData = OCR.cleanup(self.filename)
-            self.outputBox.delete(1.0, "end-1c")
-            self.outputBox.insert(1.0, imageData[0])
+            self.start_job(convert_job, (self.filename, True), self.show_reconversion)
         except UnicodeEncodeError as e:
             errorBox = messagebox.showinfo("Unicode Encode/Decode Error", "An error occured:\n"+'"'+str(e)+'"')
         except Exception as e:
             errorBox = messagebox.showinfo("Error", "An unexpected error occured:\n"+'"'+str(e)+'"')
 
+    def show_conversion(self, imageData):
+        '''Shows the converted text. The image stays selected, so it can be
+        re-converted.'''
+        text = imageData[0]
+        print(imageData[1])
+        self.outputBox.delete(1.0, "end-1c")
+        self.outputBox.insert(1.0, text)
+
+    def show_reconversion(self, imageData):
+        '''Shows the re-converted text.'''
+        self.outputBox.delete(1.0, "end-1c")
+        self.outputBox.insert(1.0, imageData[0])
+
+    def show_progress(self, message):
+        '''Adds each page of a multi-page image to the output as it is read,
+        otherwise shows the progress message.'''
+        if isinstance(message, tuple) and message[0] == "page":
+            pageNumber, text = message[1], message[2]
+            self.outputBox.insert("end", ("\n\n" if pageNumber > 1 else "") + text)
+        else:
+            Page.show_progress(self, message)
+
 class MainWindow(tk.Frame):
     '''Main class for changing display page - Top level window.
 
@@ -472,3 +980,5 @@ if __name__ == "__main__":
     main.pack(side="top", fill="both", expand=True)
     root.wm_geometry("1000x700")
     root.mainloop()
+    if jobWorker is not None:
+        jobWorker.stop()
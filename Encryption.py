@@ -5,8 +5,10 @@
 '''
 Program for encrypting any files saved by the main program when writing to files
 in any of the filders. Symmetric (private) key encryption method employed
-because of speed of use. Comments are attempted to be written in accordance with 
-PEP 8 Style Guide: 
+because of speed of use. Files are written in a chunked binary format (version
+3) with a fixed header and a chunk index at the end, so any part of a file can
+be read on its own. Files in the older formats are still read. Comments
+are attempted to be written in accordance with PEP 8 Style Guide: 
 http://legacy.python.org/dev/peps/pep-0008/#comments
 https://google.github.io/styleguide/pyguide.html
 '''
@@ -16,11 +18,87 @@ https://google.github.io/styleguide/pyguide.html
 
 # ====== Imports (Python Native Modules and My Program Modules) ====== #
 
+from concurrent.futures import ProcessPoolExecutor
 from base64 import b64encode
+import itertools
+import threading
+import argparse
+import hashlib
+import codecs
 import random
+import struct
+import string
+import bisect
+import time
+import io
 import sys
 import os
 
+# NumPy is optional - without it the characters are shifted one at a time
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+
+# ====== Variable definitions ====== #
+
+# Texts shorter than this are shifted one character at a time even with NumPy,
+# as setting up the arrays would take longer
+vectorMinimum = 64
+
+# Characters (or bytes, for binary files) read or written at a time when
+# streaming files
+chunkSize = 65536
+
+# Header of the binary format: magic, format version, flags (none yet, 0) and
+# a random nonce, which gives every file a different keystream. Files without
+# the magic are in the original text format (version 1)
+header = struct.Struct("<4sBB2x16s")
+magic = b"OCTE"
+version = 3
+
+# Formats which can be read: 1 (text), 2 (binary) and 3 (chunked binary)
+versions = (1, 2, 3)
+
+# Bytes of keystream made from each hash. Every block is made on its own, so
+# any part of a file can be decrypted without the parts before it. Version 3
+# files are cut into chunks of at most this many bytes
+blockSize = 65536
+
+# After the chunks of a version 3 file comes an index entry for each chunk
+# (position in the file, bytes, characters), then a footer giving where the
+# index starts and the number of chunks
+indexEntry = struct.Struct("<QII")
+footer = struct.Struct("<QQ4s")
+footerMagic = b"OCTI"
+
+# Folders of encrypted files rewritten by the migrate command
+migrateFolders = ["OCR_Conversions", "Summaries"]
+
+
+
+# ====== Shift Sub-Routine ====== #
+
+def shift(text, key, modulo, direction=1, start=0):
+    '''Adds (direction 1) or takes away (direction -1) the code point of
+    the key character key[(start + i) % len(key)] to the code point of each
+    character text[i], modulo modulo. Both layers of the cipher are made of
+    this step - with NumPy it is done for the whole text at once.
+
+    Returns:
+        String of the shifted characters
+    '''
+    if np is None or len(text) < vectorMinimum:
+        return "".join([chr((ord(text[i]) + direction * ord(key[(start + i) % len(key)])) % modulo)
+                        for i in range(len(text))])
+    codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32).astype(np.int32)
+    keyCodes = np.frombuffer(key.encode("utf-32-le", "surrogatepass"), dtype=np.uint32).astype(np.int32)
+    stream = np.resize(np.roll(keyCodes, -(start % len(key))), len(codes))
+    # Every result is below modulo (at most 255), so fits in one byte
+    return np.mod(codes + direction * stream, modulo).astype(np.uint8).tobytes().decode("latin-1")
+
 
 
 # ====== Encryption Algorithm ====== #        
@@ -50,11 +128,7 @@ class Encryption:
         '''
         self.generate_key()
         modulo = random.randint(127, 255)
-        list(message)
-        for i in range(len(message)):
-            key_ = ord(self.key[i % len(self.key)])
-            self.cipherText.append(chr((ord(message[i]) + key_) % int(modulo)))
-        self.cipherText = str(self.key)+"//%%//"+str(modulo)+"//%%//"+str((''.join(self.cipherText)))
+        self.cipherText = str(self.key)+"//%%//"+str(modulo)+"//%%//"+shift(message, self.key, int(modulo))
         return self.password_encrypt()
 
     def password_encrypt(self):
@@ -68,12 +142,8 @@ class Encryption:
         Returns:
             String containing the encrypted key, modulus and message
         '''
-        toReturn = []
-        for i in range(len(self.cipherText)):
-            key_ = ord(self.password[i % len(self.password)])
-            # MOD 255 because it's the same as bitmask 11111111
-            toReturn.append(chr((ord(self.cipherText[i]) + key_) % 255))
-        return "".join(toReturn)
+        # MOD 255 because it's the same as bitmask 11111111
+        return shift(self.cipherText, self.password, 255)
 
     # == Decryption of Message == #
     
@@ -85,11 +155,8 @@ class Encryption:
             key_: The changing encryption 'key' based on the symmetric key
         '''
         modulo, message = self.password_decrypt(message)
-        self.plainText = []
-        for i in range(len(message)):
-            key_ = ord(self.key[i % len(self.key)])
-            self.plainText.append(chr((ord(message[i]) - key_) % int(modulo)))
-        return ''.join(self.plainText)
+        self.plainText = shift(message, self.key, int(modulo), -1)
+        return self.plainText
 
     def password_decrypt(self, message):
         '''Removes second layer of encryption to identify the key, modulus and
@@ -98,17 +165,553 @@ class Encryption:
         Returns:
             Returns the identified modulus and message to the decrypt function
         '''
-        self.cipherText = []
-        for i in range(len(message)):
-            key_ = ord(self.password[i % len(self.password)])
-            self.cipherText.append(chr((ord(message[i]) - key_) % 255))
-
-        self.cipherText = "".join(self.cipherText)
+        self.cipherText = shift(message, self.password, 255, -1)
         self.key, modulo, message = self.cipherText.split("//%%//")
         return modulo, message
             
 
                                         
+# ====== Streaming Encryption ====== #
+
+class Encrypted_Writer:
+    '''Writes an encrypted file a piece at a time, so long documents never
+    have to be held in memory whole.
+
+    Both layers of the cipher only depend on each character's position, so
+    the file is exactly what encrypt() would give for all of the pieces
+    joined together (with the same key and modulo), and decrypt() reads it as
+    normal.
+
+    Attributes:
+        self.file: Open text file to write to (opened with newline="")
+        self.length: Number of message characters written so far
+        self.position: Number of first-layer characters written so far
+    '''
+    def __init__(self, file):
+        '''Inits the class, writing the key and modulus to the file.'''
+        self.E = Encryption()
+        self.E.generate_key()
+        self.modulo = random.randint(127, 255)
+        self.file = file
+        self.length = 0
+        self.position = 0
+        self.write_layer(str(self.E.key)+"//%%//"+str(self.modulo)+"//%%//")
+
+    def write(self, message):
+        '''Encrypts and writes the next piece of the message.'''
+        cipherText = shift(message, self.E.key, self.modulo, 1, self.length)
+        self.length += len(message)
+        self.write_layer(cipherText)
+
+    def write_layer(self, cipherText):
+        '''Applies the second (password) layer and writes to the file.'''
+        toWrite = shift(cipherText, self.E.password, 255, 1, self.position)
+        self.position += len(cipherText)
+        self.file.write(toWrite)
+
+
+
+def encrypt_stream(source, target, size=chunkSize):
+    '''Encrypts a text file object into another, size characters at a
+    time (see Encrypted_Writer). The target should be opened with newline="".'''
+    writer = Encrypted_Writer(target)
+    while True:
+        chunk = source.read(size)
+        if not chunk:
+            break
+        writer.write(chunk)
+
+def decrypt_stream(file, size=chunkSize):
+    '''Decrypts an encrypted file object (opened with newline="") size
+    characters at a time, so the whole text is never held in memory.
+
+    Yields:
+        Strings of the decrypted text, in order
+
+    Raises:
+        ValueError: The file does not start with a key and modulus
+    '''
+    password = Encryption().password
+    position = 0
+    length = 0
+    header = ""
+    key = None
+    while True:
+        chunk = file.read(size)
+        if not chunk:
+            break
+        cipherText = shift(chunk, password, 255, -1, position)
+        position += len(chunk)
+        if key is None:
+            # The key and modulus come first, each followed by //%%//
+            header += cipherText
+            parts = header.split("//%%//", 2)
+            if len(parts) < 3:
+                if len(header) > 1024:
+                    raise ValueError("Not an encrypted file")
+                continue
+            key, modulo, cipherText = parts[0], int(parts[1]), parts[2]
+        yield shift(cipherText, key, modulo, -1, length)
+        length += len(cipherText)
+    if key is None:
+        raise ValueError("Not an encrypted file")
+
+
+
+# ====== Binary Format ====== #
+
+# Every file key is derived from this, which is made from the permanent password
+masterKey = hashlib.sha256(Encryption().password.encode("utf-8")).digest()
+
+def file_key(nonce):
+    '''Derives the key for one file from its nonce.'''
+    return hashlib.blake2b(nonce, key=masterKey, digest_size=32).digest()
+
+def keystream(fileKey, offset, length):
+    '''Makes length bytes of the file's keystream, starting offset bytes in.
+    Block i of the keystream is the SHAKE-256 output of the file key and i.
+
+    Returns:
+        Bytes of the keystream
+    '''
+    if length <= 0:
+        return b""
+    first = offset // blockSize
+    last = (offset + length - 1) // blockSize
+    stream = b"".join([hashlib.shake_256(fileKey + i.to_bytes(8, "little")).digest(blockSize)
+                       for i in range(first, last + 1)])
+    start = offset - first * blockSize
+    return stream[start:start + length]
+
+def xor(data, stream):
+    '''XORs two byte strings of the same length, as two big integers (much
+    faster than a byte at a time, with or without NumPy).'''
+    return (int.from_bytes(data, "little") ^ int.from_bytes(stream, "little")).to_bytes(len(data), "little")
+
+def format_version(data):
+    '''Tells which format encrypted data (or the start of it) is in.
+
+    Returns:
+        Integer format version - 1 for the original text format
+    '''
+    if len(data) >= header.size and bytes(data[:len(magic)]) == magic:
+        return data[len(magic)]
+    return 1
+
+def chunk_cut(data, start=0):
+    '''Finds how many bytes of data, from start, go in the next chunk - at
+    most blockSize, without splitting a UTF-8 character.'''
+    cut = start + blockSize
+    if cut >= len(data):
+        return len(data) - start
+    # Continuation bytes of a character start with the bits 10
+    while (data[cut] & 0xC0) == 0x80:
+        cut -= 1
+    return cut - start
+
+def encrypt_bytes(message):
+    '''Encrypts the text in the chunked format. Unlike the text format, any
+    character is kept exactly, as the UTF-8 bytes are encrypted.
+
+    Returns:
+        Bytes of the whole encrypted file
+    '''
+    file = io.BytesIO()
+    writer = Stream_Writer(file)
+    writer.write(message)
+    writer.close()
+    return file.getvalue()
+
+def decrypt_bytes(data):
+    '''Decrypts data in any format, telling them apart by the header.
+
+    Returns:
+        String of the decrypted text
+
+    Raises:
+        ValueError: The data is not in a format this program can read
+    '''
+    if format_version(data) == 1:
+        return decrypt(bytes(data).decode("utf-8"))
+    return Encrypted_Reader(io.BytesIO(bytes(data))).read()
+
+def read_file(path):
+    '''Reads and decrypts an encrypted file in any format.'''
+    with open(path, "rb") as f:
+        return decrypt_bytes(f.read())
+
+def write_file(path, message):
+    '''Encrypts the text and writes it to path in the chunked format.'''
+    with open(path, "wb") as f:
+        f.write(encrypt_bytes(message))
+
+
+class Stream_Writer:
+    '''Writes a file in the chunked format a piece at a time, so long
+    documents never have to be held in memory whole.
+
+    The text is cut into chunks of at most blockSize bytes (whole characters
+    only), and chunk i is encrypted with block i of the keystream, so every
+    chunk can be decrypted on its own. close() adds the chunk index and the
+    footer once all of the text is written.
+
+    Attributes:
+        self.file: Open binary file to write to
+        self.buffer: Bytes of text not yet written as a chunk
+        self.chunks: (position in the file, bytes, characters) of each chunk
+            written so far
+    '''
+    def __init__(self, file):
+        '''Inits the class, writing the header to the file.'''
+        nonce = os.urandom(16)
+        self.key = file_key(nonce)
+        self.file = file
+        self.buffer = bytearray()
+        self.chunks = []
+        self.position = header.size
+        file.write(header.pack(magic, version, 0, nonce))
+
+    def write(self, message):
+        '''Adds the next piece of the text, writing every chunk filled.'''
+        self.buffer += message.encode("utf-8", "surrogatepass")
+        start = 0
+        while len(self.buffer) - start > blockSize:
+            size = chunk_cut(self.buffer, start)
+            self.write_chunk(bytes(self.buffer[start:start + size]))
+            start += size
+        del self.buffer[:start]
+
+    def write_chunk(self, data):
+        '''Encrypts and writes one chunk.'''
+        characters = len(data.decode("utf-8", "surrogatepass"))
+        self.file.write(xor(data, keystream(self.key, len(self.chunks) * blockSize, len(data))))
+        self.chunks.append((self.position, len(data), characters))
+        self.position += len(data)
+
+    def close(self):
+        '''Writes the last chunk, the chunk index and the footer. The file
+        itself is left open.'''
+        if self.buffer:
+            self.write_chunk(bytes(self.buffer))
+            self.buffer.clear()
+        self.file.write(b"".join([indexEntry.pack(*chunk) for chunk in self.chunks]))
+        self.file.write(footer.pack(self.position, len(self.chunks), footerMagic))
+
+
+class Encrypted_Reader:
+    '''Reads an encrypted file in any format.
+
+    Files in the chunked format are read a chunk at a time - only the chunks
+    holding the characters asked for are read and decrypted, so memory use
+    does not grow with the size of the file. Files in older formats are
+    decrypted whole when opened and treated as a single chunk.
+
+    Attributes:
+        self.version: Format version of the file
+        self.chunks: (position in the file, bytes, characters) of each chunk
+        self.starts: Character position each chunk starts at, then the
+            number of characters in the whole text
+        self.length: Number of characters in the whole text
+    '''
+    def __init__(self, file, ownFile=None):
+        '''Inits the class, reading the header and the chunk index. file is
+        a path or an open binary file, which is closed with the reader if
+        ownFile is True (always, for a path).
+
+        Raises:
+            ValueError: The file is not in a format this program can read
+        '''
+        self.ownFile = isinstance(file, str) or bool(ownFile)
+        self.file = open(file, "rb") if isinstance(file, str) else file
+        self.lock = threading.Lock()
+        self.text = None
+        try:
+            start = self.file.read(header.size)
+            self.version = format_version(start)
+            if self.version == version:
+                self.key = file_key(header.unpack(start)[3])
+                self.chunks = self.read_index()
+            elif self.version in versions:
+                self.file.seek(0)
+                self.text = decrypt_whole(self.file.read())
+                self.chunks = [(0, 0, len(self.text))]
+            else:
+                raise ValueError("Unsupported encrypted file version: " + str(self.version))
+        except Exception:
+            self.close()
+            raise
+        self.starts = list(itertools.accumulate([0] + [chunk[2] for chunk in self.chunks]))
+        self.length = self.starts[-1]
+
+    def read_index(self):
+        '''Reads the footer and the chunk index from the end of the file.
+
+        Returns:
+            List of (position in the file, bytes, characters) of each chunk
+
+        Raises:
+            ValueError: The file has no index (it was not finished)
+        '''
+        self.file.seek(0, 2)
+        end = self.file.tell()
+        if end >= header.size + footer.size:
+            self.file.seek(end - footer.size)
+            indexStart, count, endMagic = footer.unpack(self.file.read(footer.size))
+            if endMagic == footerMagic and indexStart + count * indexEntry.size == end - footer.size:
+                self.file.seek(indexStart)
+                return list(indexEntry.iter_unpack(self.file.read(count * indexEntry.size)))
+        raise ValueError("Encrypted file is incomplete (no chunk index)")
+
+    def read_chunk(self, i):
+        '''Reads and decrypts chunk i. Can be called from several threads at
+        once.'''
+        if self.text is not None:
+            return self.text
+        position, size, characters = self.chunks[i]
+        with self.lock:
+            self.file.seek(position)
+            data = self.file.read(size)
+        return xor(data, keystream(self.key, i * blockSize, size)).decode("utf-8", "surrogatepass")
+
+    def read(self, start=0, count=None):
+        '''Reads count characters of the text from character start (to the
+        end if count is None), decrypting only the chunks holding them.'''
+        start = max(start, 0)
+        end = self.length if count is None else min(start + count, self.length)
+        if start >= end:
+            return ""
+        first = bisect.bisect_right(self.starts, start) - 1
+        last = bisect.bisect_right(self.starts, end - 1) - 1
+        text = "".join([self.read_chunk(i) for i in range(first, last + 1)])
+        offset = self.starts[first]
+        return text[start - offset:end - offset]
+
+    def chunk_texts(self):
+        '''Yields the text of each chunk in order.'''
+        for i in range(len(self.chunks)):
+            yield self.read_chunk(i)
+
+    def close(self):
+        '''Closes the file, if it belongs to the reader.'''
+        if self.ownFile:
+            self.file.close()
+
+
+def decrypt_whole(data):
+    '''Decrypts a whole file in the text format or binary format version 2
+    (which has no chunks).'''
+    fileVersion = format_version(data)
+    if fileVersion == 1:
+        return decrypt(bytes(data).decode("utf-8"))
+    body = bytes(data[header.size:])
+    key = file_key(header.unpack_from(data, 0)[3])
+    return xor(body, keystream(key, 0, len(body))).decode("utf-8", "surrogatepass")
+
+def decrypt_chunks(job):
+    '''Decrypts a run of chunks of a file in a worker process.
+
+    Args:
+        job: Tuple of (path, first chunk, chunk after the last)
+    '''
+    path, first, last = job
+    reader = Encrypted_Reader(path)
+    try:
+        return "".join([reader.read_chunk(i) for i in range(first, last)])
+    finally:
+        reader.close()
+
+def read_parallel(path, workers=None):
+    '''Reads and decrypts a whole file across a pool of worker processes,
+    each decrypting an equal run of the chunks. Files in older formats, or
+    too small to be worth splitting, are read in this process.'''
+    workers = workers or os.cpu_count() or 1
+    reader = Encrypted_Reader(path)
+    try:
+        count = len(reader.chunks)
+        if reader.text is not None or workers < 2 or count < 2 * workers:
+            return reader.read()
+    finally:
+        reader.close()
+    step = -(-count // workers)
+    with ProcessPoolExecutor(workers) as pool:
+        return "".join(pool.map(decrypt_chunks, [(path, i, min(i + step, count)) for i in range(0, count, step)]))
+
+def read_stream(file, size=chunkSize):
+    '''Decrypts an encrypted binary file object in any format a piece at a
+    time, so the whole text is never held in memory.
+
+    Yields:
+        Strings of the decrypted text, in order
+
+    Raises:
+        ValueError: The file is not an encrypted file this program can read
+    '''
+    start = file.read(header.size)
+    fileVersion = format_version(start)
+    file.seek(0)
+    if fileVersion == 1:
+        yield from decrypt_stream(codecs.getreader("utf-8")(file), size)
+        return
+    if fileVersion == version:
+        yield from Encrypted_Reader(file).chunk_texts()
+        return
+    if fileVersion not in versions:
+        raise ValueError("Unsupported encrypted file version: " + str(fileVersion))
+    # Version 2 is one keystream from the end of the header onwards
+    file.seek(header.size)
+    key = file_key(header.unpack(start)[3])
+    decoder = codecs.getincrementaldecoder("utf-8")("surrogatepass")
+    position = 0
+    while True:
+        data = file.read(size)
+        if not data:
+            break
+        yield decoder.decode(xor(data, keystream(key, position, len(data))))
+        position += len(data)
+    yield decoder.decode(b"", True)
+
+
+
+# ====== Migration ====== #
+
+def migrate_file(path):
+    '''Rewrites a file in an older format in the current one. The new file
+    is renamed into place and keeps the modified time of the old one (old
+    files are deleted by age).
+
+    Returns:
+        True if the file was rewritten, False if it was already current
+    '''
+    with open(path, "rb") as f:
+        data = f.read()
+    if format_version(data) == version:
+        return False
+    text = decrypt_bytes(data)
+    stat = os.stat(path)
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(encrypt_bytes(text))
+    os.utime(temp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(temp, path)
+    return True
+
+def migrate_job(path):
+    '''Runs migrate_file in a worker process.
+
+    Returns:
+        Tuple of (path, "migrated", "current" or the error message)
+    '''
+    try:
+        return path, ("migrated" if migrate_file(path) else "current")
+    except Exception as e:
+        return path, str(e)
+
+def migrate(folders=migrateFolders, workers=None):
+    '''Rewrites every file in the folders which is still in an older format,
+    across a pool of worker processes.
+
+    Returns:
+        Dictionary of the number of files "migrated", already "current" and
+        "failed"
+    '''
+    paths = [os.path.join(folder, name) for folder in folders if os.path.isdir(folder)
+             for name in sorted(os.listdir(folder)) if os.path.isfile(os.path.join(folder, name))]
+    counts = {"migrated": 0, "current": 0, "failed": 0}
+    if not paths:
+        return counts
+    with ProcessPoolExecutor(workers) as pool:
+        for path, result in pool.map(migrate_job, paths, chunksize=16):
+            if result in counts:
+                counts[result] += 1
+            else:
+                counts["failed"] += 1
+                print("FAILED " + path + ": " + result)
+    return counts
+
+
+
+# ====== Benchmark ====== #
+
+def make_text(size, seed=0):
+    '''Builds a text of size characters of made-up words. The text format
+    changes characters past its modulo, so only ASCII is used.'''
+    rng = random.Random(seed)
+    words = ["".join(rng.choice(string.ascii_lowercase) for i in range(rng.randint(1, 10))) for j in range(1000)]
+    parts = []
+    length = 0
+    while length < size:
+        sentence = " ".join(rng.choice(words) for i in range(rng.randint(5, 25))).capitalize() + ". "
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)[:size]
+
+def time_best(function, argument, repeat):
+    '''Returns (result, best seconds of repeat runs) of function(argument).'''
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = function(argument)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return result, best
+
+def benchmark(size, repeat=3, seed=0):
+    '''Times encrypting and decrypting a text of size characters with the
+    text (legacy) format and the binary format.
+
+    Returns:
+        Dictionary of {format: {"encrypt": seconds, "decrypt": seconds}}
+
+    Raises:
+        ValueError: A format did not decrypt the text back to the original
+    '''
+    text = make_text(size, seed)
+    formats = {"legacy": (encrypt, decrypt), "binary": (encrypt_bytes, decrypt_bytes)}
+    results = {}
+    for name, (encryptFunction, decryptFunction) in formats.items():
+        encrypted, encryptTime = time_best(encryptFunction, text, repeat)
+        decrypted, decryptTime = time_best(decryptFunction, encrypted, repeat)
+        if decrypted != text:
+            raise ValueError(name + " format did not decrypt back to the original text")
+        results[name] = {"encrypt": encryptTime, "decrypt": decryptTime}
+    return results
+
+
+
+# ====== Command Line ====== #
+
+def main(args):
+    '''Command for migrating stored files to the current format, or for
+    benchmarking the binary format against the text format.'''
+    parser = argparse.ArgumentParser(prog="Encryption.py", description="Encrypted file tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrateParser = commands.add_parser("migrate", help="rewrite files in older formats in the current format")
+    migrateParser.add_argument("folders", nargs="*", default=migrateFolders, help="folders of encrypted files")
+    migrateParser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    benchmarkParser = commands.add_parser("benchmark", help="time the binary format against the text format")
+    benchmarkParser.add_argument("--sizes", nargs="+", type=float, default=[0.01, 1, 10],
+                                 help="sizes of the test texts in MB")
+    benchmarkParser.add_argument("--repeat", type=int, default=3, help="timed runs of each (best is kept)")
+    args = parser.parse_args(args)
+
+    if args.command == "migrate":
+        start = time.perf_counter()
+        counts = migrate(args.folders, args.workers)
+        print(str(counts["migrated"]) + " files migrated, " + str(counts["current"]) + " already current, " +
+              str(counts["failed"]) + " failed in {:.2f} seconds".format(time.perf_counter() - start))
+        return 0 if counts["failed"] == 0 else 1
+
+    for size in args.sizes:
+        characters = int(size * 1024 * 1024)
+        results = benchmark(characters, max(args.repeat, 1))
+        for step in ("encrypt", "decrypt"):
+            legacy, binary = results["legacy"][step], results["binary"][step]
+            print("{:>8.2f}MB {}: legacy {:.4f}s ({:.1f} MB/s), binary {:.4f}s ({:.1f} MB/s), {:.1f}x faster".format(
+                size, step, legacy, size / legacy, binary, size / binary, legacy / binary))
+    return 0
+
+
+
 # ====== Encrypt Request ====== #
 
 def encrypt(message):
@@ -128,6 +731,8 @@ def decrypt(message):
 # ====== Python Boiler Plate ====== #
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main(sys.argv[1:]))
     try:
         message = str(input("Please enter the message you wish to have encrypted: "))
         E = Encryption()
@@ -0,0 +1,353 @@
+#   IDF INDEX PROGRAM    #
+
+# =========================================================================== #
+'''
+Program for counting how many stored documents (OCR conversions and summaries)
+each word appears in, so that words common to every document can be given
+less weight when summarising (TF-IDF). The counts are kept in one binary file
+laid out as a hash table, which is memory-mapped rather than loaded - every
+process using it shares the same copy and each look-up only reads a few
+bytes. Processes which change the index take turns, holding a lock file while
+they write. Comments are attempted to be written in accordance with PEP 8 Style
+Guide:
+http://legacy.python.org/dev/peps/pep-0008/#comments
+https://google.github.io/styleguide/pyguide.html
+'''
+# =========================================================================== #
+
+
+
+# ====== Imports (Python Native Modules and My Program Modules) ====== #
+
+import Normaliser as N
+import Encryption as E
+import Allocator as A
+import Storage as D
+import hashlib
+import struct
+import math
+import mmap
+import sys
+import os
+
+
+
+# ====== File Layout ====== #
+
+# Header: magic, format version, number of documents, number of slots
+header = struct.Struct("<4sIQQ")
+magic = b"IDFX"
+version = 1
+
+# Slot: 64-bit hash of the word (0 means empty) and its document frequency
+slot = struct.Struct("<QI")
+
+# Default location of the index and the list of files already counted in it
+indexPath = "IDF_Index.bin"
+lockSuffix = ".lock"
+folders = ["OCR_Conversions", "Summaries"]
+
+# The table is doubled in size once it is this full, to keep look-ups short
+maxLoad = 0.6
+
+
+
+# ====== Main IDF Index Class ====== #
+
+class IDF_Index:
+    '''Document frequency index stored in a memory-mapped hash table.
+
+    Words are stored as 64-bit hashes with open addressing (linear probing), so
+    a look-up is a hash and usually a single slot read. Documents can be added
+    at any time; the frequencies are updated in place and the table is
+    rebuilt at double the size when it gets too full. Documents are only added
+    while holding the index's lock (see lock), as other processes may be
+    adding to it at the same time.
+
+    Attributes:
+        self.path: Location of the index file
+        self.documents: Number of documents counted
+        self.capacity: Number of slots in the table
+        self.used: Number of slots holding a word
+    '''
+    def __init__(self, path=indexPath, writable=False):
+        '''Inits the class, opening (or creating, if writable) the index.'''
+        self.path = path
+        self.writable = writable
+        self.manifestPath = path + ".txt"
+        self.map = None
+        self.heldLock = None
+        if writable and not os.path.exists(path):
+            self.lock()
+            self.unlock()
+        else:
+            self.open()
+
+    def lock(self):
+        '''Takes the index's lock, waiting while another process writes to
+        it, then maps the file again - another process may have added to it
+        or replaced it since it was opened. Creates the index if there is none
+        yet.'''
+        self.heldLock = A.acquire_lock(self.path + lockSuffix, timeout=None)
+        try:
+            if not os.path.exists(self.path):
+                self.create(self.path, 1024, 0, [])
+            self.open()
+        except Exception:
+            self.unlock()
+            raise
+
+    def unlock(self):
+        '''Writes the changes to the file and lets go of the lock.'''
+        try:
+            if self.map is not None:
+                self.map.flush()
+        finally:
+            A.release_lock(self.heldLock)
+            self.heldLock = None
+
+    def open(self):
+        '''Memory-maps the index file and reads its header.
+
+        Raises:
+            ValueError: The file is not an IDF index
+        '''
+        self.close()
+        with open(self.path, "r+b" if self.writable else "rb") as f:
+            access = mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ
+            self.map = mmap.mmap(f.fileno(), 0, access=access)
+        fileMagic, fileVersion, self.documents, self.capacity = header.unpack_from(self.map, 0)
+        if fileMagic != magic or fileVersion != version:
+            self.close()
+            raise ValueError(self.path + " is not an IDF index")
+        self.used = None
+        self.modified = file_version(self.path)
+
+    def close(self):
+        '''Unmaps the index file.'''
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def create(self, path, capacity, documents, entries):
+        '''Writes a new index file with the given (hash, frequency) entries.'''
+        table = bytearray(capacity * slot.size)
+        for h, frequency in entries:
+            i = h % capacity
+            while slot.unpack_from(table, i * slot.size)[0] != 0:
+                i = (i + 1) % capacity
+            slot.pack_into(table, i * slot.size, h, frequency)
+        temp = path + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(header.pack(magic, version, documents, capacity))
+            f.write(table)
+        os.replace(temp, path)
+
+    def find(self, h):
+        '''Finds the slot holding the hash, or the empty slot where it would go.
+
+        Returns:
+            Tuple of (slot number, stored hash, document frequency)
+        '''
+        i = h % self.capacity
+        while True:
+            stored, frequency = slot.unpack_from(self.map, header.size + i * slot.size)
+            if stored == h or stored == 0:
+                return i, stored, frequency
+            i = (i + 1) % self.capacity
+
+    def frequency(self, word):
+        '''Returns the number of documents the word appears in.'''
+        return self.find(word_hash(word))[2]
+
+    def idf(self, word):
+        '''Returns the smoothed inverse document frequency of the word.'''
+        return math.log((1 + self.documents) / (1 + self.frequency(word))) + 1
+
+    def entries(self):
+        '''Yields (hash, frequency) for every word in the table.'''
+        for i in range(self.capacity):
+            stored, frequency = slot.unpack_from(self.map, header.size + i * slot.size)
+            if stored != 0:
+                yield stored, frequency
+
+    def add_document(self, text):
+        '''Counts each different word of the text once.'''
+        self.add_words(set(N.split_words(N.normalise(text.lower()))))
+
+    def add_words(self, words):
+        '''Counts a document made up of the set of different words.'''
+        if self.used is None:
+            self.used = sum(1 for entry in self.entries())
+        words.discard("")
+        if (self.used + len(words)) > self.capacity * maxLoad:
+            self.grow(self.used + len(words))
+        for word in words:
+            h = word_hash(word)
+            i, stored, frequency = self.find(h)
+            if stored == 0:
+                self.used += 1
+            slot.pack_into(self.map, header.size + i * slot.size, h, frequency + 1)
+        self.documents += 1
+        header.pack_into(self.map, 0, magic, version, self.documents, self.capacity)
+
+    def grow(self, needed):
+        '''Rebuilds the table with enough slots for needed words.'''
+        capacity = self.capacity
+        while needed > capacity * maxLoad:
+            capacity *= 2
+        entries = list(self.entries())
+        self.close()
+        self.create(self.path, capacity, self.documents, entries)
+        self.open()
+        self.used = len(entries)
+
+    def indexed(self):
+        '''Returns the set of file names already counted in the index.'''
+        try:
+            with open(self.manifestPath, "r", encoding="utf-8") as f:
+                return set(f.read().splitlines())
+        except FileNotFoundError:
+            return set()
+
+    def update(self, folders=folders, store=None):
+        '''Counts any conversions and summaries in the document store, and
+        any encrypted files in the folders, which are not already in the
+        index. Stored documents are listed in the index by name.
+
+        Returns:
+            Number of documents added
+        '''
+        self.lock()
+        try:
+            return self.add_new(folders, store or D.store())
+        finally:
+            self.unlock()
+
+    def add_new(self, folders, store):
+        '''Counts the documents update finds (the caller holds the lock).'''
+        indexed = self.indexed()
+        added = 0
+        with open(self.manifestPath, "a", encoding="utf-8") as manifest:
+            for document in store.documents(["conversion", "summary"]):
+                if document["name"] in indexed:
+                    continue
+                file = store.open(document["id"])
+                try:
+                    self.add_words(file_words(file))
+                finally:
+                    file.close()
+                manifest.write(document["name"] + "\n")
+                added += 1
+            for folder in folders:
+                if not os.path.isdir(folder):
+                    continue
+                for name in sorted(os.listdir(folder)):
+                    path = os.path.join(folder, name)
+                    if path in indexed or not os.path.isfile(path):
+                        continue
+                    with open(path, "rb") as f:
+                        self.add_words(file_words(f))
+                    manifest.write(path + "\n")
+                    added += 1
+        return added
+
+    def add_file(self, path, text):
+        '''Counts a newly saved file (or stored document, by name), unless
+        it is already in the index.'''
+        self.lock()
+        try:
+            if path in self.indexed():
+                return
+            self.add_document(text)
+            self.map.flush()
+            with open(self.manifestPath, "a", encoding="utf-8") as manifest:
+                manifest.write(path + "\n")
+        finally:
+            self.unlock()
+
+    def clear(self):
+        '''Empties the index and its list of counted files.'''
+        self.lock()
+        try:
+            self.close()
+            self.create(self.path, 1024, 0, [])
+            with open(self.manifestPath, "w", encoding="utf-8"):
+                pass
+            self.open()
+        finally:
+            self.unlock()
+
+
+
+# ====== Sub-Routines ====== #
+
+def word_hash(word):
+    '''64-bit hash of a word which is never 0 (0 marks an empty slot).'''
+    h = int.from_bytes(hashlib.blake2b(word.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little")
+    return h or 1
+
+def file_words(file):
+    '''Finds the set of different words in an open encrypted file,
+    decrypting it a chunk at a time. A word cut between two chunks is joined
+    back up.'''
+    words = set()
+    partial = ""
+    for text in E.read_stream(file):
+        pieces = N.split_words(partial + N.normalise(text.lower()))
+        partial = pieces.pop()
+        words.update(pieces)
+    words.add(partial)
+    return words
+
+def file_version(path):
+    '''Identifies the current contents of a file - changes when the file is
+    written to or replaced.'''
+    stat = os.stat(path)
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+openIndex = None
+
+def open_index(path=indexPath):
+    '''Returns the shared read-only index for this process, opening it again
+    if the file has been changed since it was last opened.
+
+    Raises:
+        FileNotFoundError: The index has not been built yet
+    '''
+    global openIndex
+    if openIndex is None or openIndex.path != path:
+        openIndex = IDF_Index(path)
+    elif file_version(path) != openIndex.modified:
+        openIndex.open()
+    return openIndex
+
+def add_file(path, text, indexFile=indexPath):
+    '''Adds a newly saved file to the index, if the index has been built.'''
+    if os.path.exists(indexFile):
+        index = IDF_Index(indexFile, writable=True)
+        try:
+            index.add_file(path, text)
+        finally:
+            index.close()
+
+def clear(indexFile=indexPath):
+    '''Empties the index, if it has been built (used when every stored
+    document is deleted and numbering starts again).'''
+    if os.path.exists(indexFile):
+        index = IDF_Index(indexFile, writable=True)
+        try:
+            index.clear()
+        finally:
+            index.close()
+
+
+
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    # Builds the index, or adds any new files to it
+    index = IDF_Index(sys.argv[1] if len(sys.argv) > 1 else indexPath, writable=True)
+    added = index.update()
+    print(str(added) + " documents added - " + str(index.documents) + " documents in the index")
+    index.close()
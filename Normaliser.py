@@ -0,0 +1,132 @@
+#   NORMALISER PROGRAM    #
+
+# =========================================================================== #
+'''
+Program for cleaning text and splitting it into sentences and words. Shared by
+the TLDR and OCR programs so that text is treated the same way everywhere. The
+tables are built once, from Variables, when the module is first imported.
+Comments are attempted to be written in accordance with PEP 8 Style Guide:
+http://legacy.python.org/dev/peps/pep-0008/#comments
+https://google.github.io/styleguide/pyguide.html
+'''
+# =========================================================================== #
+
+
+
+# ====== Imports (Python Native Modules and My Program Modules) ====== #
+
+import Variables as v
+import re
+
+
+
+# ====== Tables ====== #
+
+# Sets of the variable lists for fast membership tests
+characters = frozenset(v.alphabet)
+stopWords = frozenset(v.notAcceptedWords)
+
+# Matches any character which is not in v.alphabet
+notInAlphabet = re.compile("[^" + re.escape("".join(v.alphabet)) + "]")
+
+# Every line boundary recognised by str.splitlines, with \r\n counted as one
+lineBreaks = re.compile("\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+# A word (letters, numbers and apostrophes) of lower case text
+wordPattern = re.compile("[a-z0-9']+")
+
+# Words counted as read correctly by quality() - loaded the first time it is
+# used in each process (see load_words). dictionaryLoaded is True if a word
+# list from v.dictionaryFiles was added to them
+wordSet = None
+dictionaryLoaded = False
+
+
+
+# ====== Normalising Sub-Routines ====== #
+
+def normalise(text):
+    '''Removes every character that is not in v.alphabet from the text.
+
+    Returns:
+        String containing only letters, numbers and spaces
+    '''
+    return notInAlphabet.sub("", text)
+
+def normalise_many(sentences):
+    '''Normalises a list of sentences in one call.
+
+    Returns:
+        List of the sentences with only letters, numbers and spaces left
+    '''
+    remove = notInAlphabet.sub
+    return [remove("", sentence) for sentence in sentences]
+
+def split_sentences(text):
+    '''Joins the lines of the text with spaces and splits it into sentences
+    at each full stop followed by a space.
+
+    Returns:
+        List of sentences containing all their punctuation marks
+    '''
+    return " ".join(text.splitlines()).split(". ")
+
+def split_words(sentence):
+    '''Splits a normalised sentence into its words.
+
+    Returns:
+        List of words - repeated spaces give empty words, as they always have
+    '''
+    return sentence.split(" ")
+
+
+
+# ====== Quality Sub-Routines ====== #
+
+def load_words():
+    '''Builds the set of known words from v.notAcceptedWords,
+    v.commonWords and any of v.dictionaryFiles which exist.
+
+    Returns:
+        Frozen set of lower case words
+    '''
+    global wordSet, dictionaryLoaded
+    words = set(v.notAcceptedWords)
+    words.update(v.commonWords)
+    dictionaryLoaded = False
+    for path in v.dictionaryFiles:
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                words.update(line.strip().lower() for line in f)
+            dictionaryLoaded = True
+        except OSError:
+            pass
+    wordSet = frozenset(words)
+    return wordSet
+
+def quality(text):
+    '''Scores how much of a text was read correctly, as the share of its
+    words which are known words (or numbers). The text is split into words
+    once and each word is checked against the word set in a single pass.
+
+    Returns:
+        Float from 0 (no words recognised, or no words at all) to 1
+    '''
+    words = wordSet if wordSet is not None else load_words()
+    known = 0
+    total = 0
+    for token in wordPattern.findall(text.lower()):
+        token = token.strip("'")
+        if token:
+            total += 1
+            if token in words or token.isdigit():
+                known += 1
+    return known / total if total else 0.0
+
+
+
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    print("This file cannot be run as main...")
+    input()
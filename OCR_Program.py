@@ -16,15 +16,336 @@ https://google.github.io/styleguide/pyguide.html
 # ====== Imports (Python Native Modules and My Program Modules) ====== #
 
 from PIL import ImageFilter, Image
+import Normaliser as N
 import Encryption as E
+import IDF_Index as I
+import Preprocess as P
+import Allocator as A
+import Storage as D
+import Cache as C
 import Variables as v
-import pytesseract
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from collections import Counter, deque
+import threading
+import argparse
+import itertools
+import tempfile
+import hashlib
 import time
 import sys
+import io
 import os
 
 
 
+# ====== Variable definitions ====== #
+
+# Format of the copy of each image kept in the document store - "PNG"
+# (lossless) or "original" (the input file's bytes, unchanged)
+archiveFormat = "PNG"
+
+# Archive copies are written by one background thread once a conversion has
+# finished. Names still being written are kept in pending until they are done
+archiver = ThreadPoolExecutor(max_workers=1)
+pending = {}
+
+# Image modes a PNG can hold - others are converted before archiving
+pngModes = {"1", "L", "LA", "I", "I;16", "P", "RGB", "RGBA"}
+
+# Images taller than tileHeight rows are read in strips of at most that many
+# rows, several at once - this also caps the size of each image tesseract is
+# given. Strips cut through a line of text overlap by tileOverlap rows
+tileHeight = 2048
+tileOverlap = 32
+
+# How an image is read when the first attempt finds no text. "retry" runs the
+# clean-up pipelines (Preprocess.retries) one after another. "race" reads the
+# image with Preprocess.variants, raceWidth at a time, and stops as soon as one
+# reaches confidenceThreshold (0 to 100), keeping the most confident. raceWidth
+# is kept below the number of variants so the later (slower) variants are
+# never started once an earlier one is confident - batch workers read one at a
+# time, as the other workers are already using every CPU
+strategy = "retry"
+confidenceThreshold = 80.0
+raceWidth = 2
+
+# Share of known words (see Normaliser.quality) at which an attempt is
+# accepted straight away - with a word list (see Variables.dictionaryFiles),
+# and with only the built-in common words, which cover much less of a normal
+# text (a correctly read technical sentence can score under 0.1). Below it,
+# clean-up attempts carry on only while the quality keeps improving, and the
+# best attempt with any known words is used
+minimumQuality = 0.5
+builtInQuality = 0.35
+
+# Text already read from images, stored encrypted and keyed by the image's
+# pixels, the clean-up pipelines and the engine version (see OCR.cache_key).
+# pixelBytesSkipped counts the decoded pixel bytes of images found in the cache,
+# which were not recognised again
+cache = C.Disk_Cache("OCR_Cache", 64 * 1024 * 1024)
+pixelBytesSkipped = 0
+
+
+
+# ====== Engine Classes ====== #
+
+class Engine:
+    '''Base class for the engines which read text from images.
+
+    Engines take a PIL image held in memory and return its text. Each has a
+    version, which changes whenever the engine might read the same image
+    differently.
+    '''
+    name = "engine"
+
+    def recognise(self, image):
+        '''Reads the text from an image.
+
+        Returns:
+            String of the text found
+        '''
+        raise NotImplementedError
+
+    def recognise_with_confidence(self, image):
+        '''Reads the text from an image along with how sure the engine is of
+        it. Engines which cannot tell give None.
+
+        Returns:
+            Tuple of (text, mean word confidence from 0 to 100, or None)
+        '''
+        return self.recognise(image), None
+
+    def version(self):
+        '''Returns a string identifying the engine and its settings.'''
+        return self.name
+
+    def parallel(self):
+        '''Returns how many images the engine can usefully read at once.'''
+        return os.cpu_count() or 1
+
+    def recognise_many(self, images, withConfidence=False):
+        '''Reads the text from several images at once, on parallel() threads.
+        Images may be a generator - only as many images as are being read
+        are taken from it at a time.
+
+        Returns:
+            List of the text of each image, in the order given - or of (text,
+            confidence) tuples if withConfidence is True
+        '''
+        threads = self.parallel()
+        read = self.recognise_with_confidence if withConfidence else self.recognise
+        texts = []
+        with ThreadPoolExecutor(threads) as pool:
+            running = deque()
+            for image in images:
+                running.append(pool.submit(read, image))
+                if len(running) >= threads:
+                    texts.append(running.popleft().result())
+            texts.extend(future.result() for future in running)
+        return texts
+
+    def close(self):
+        '''Stops any worker processes the engine has started.'''
+        pass
+
+
+class Tesseract_Engine(Engine):
+    '''Engine using Tesseract.
+
+    If tesserocr is installed, Tesseract's language data is loaded once for
+    each thread reading an image and kept for later images, instead of
+    starting the tesseract program for every image. The batch workers and the
+    pipeline's workers are long-lived processes, so each keeps its own loaded
+    copy. Otherwise (or when extra options are given, which only the
+    tesseract program takes) each image is read by pytesseract, which starts
+    the tesseract program every time. See backend.
+
+    Attributes:
+        self.config: Extra options passed to tesseract
+        self.apis: tesserocr APIs already loaded and not in use
+    '''
+    name = "tesseract"
+
+    def __init__(self, config=""):
+        '''Inits the class. Assigns the object wide variables.'''
+        self.config = config
+        self.apis = []
+        self.lock = threading.Lock()
+        self.engineVersion = None
+
+    def take_api(self):
+        '''Takes a loaded tesserocr API which no other thread is using,
+        loading a new one if there are none free.
+
+        Returns:
+            The API, or None if pytesseract has to be used instead
+        '''
+        if self.backend() != "tesserocr":
+            return None
+        with self.lock:
+            if self.apis:
+                return self.apis.pop()
+        return tesserocr.PyTessBaseAPI()
+
+    def give_back_api(self, api):
+        '''Keeps an API taken by take_api for the next image.'''
+        with self.lock:
+            self.apis.append(api)
+
+    def recognise(self, image):
+        '''Reads the text from an image.'''
+        api = self.take_api()
+        if api is None:
+            return load_pytesseract().image_to_string(image, config=self.config)
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            self.give_back_api(api)
+
+    def recognise_with_confidence(self, image):
+        '''Reads the text and its mean word confidence from an image.'''
+        api = self.take_api()
+        if api is None:
+            tesseract = load_pytesseract()
+            return text_and_confidence(tesseract.image_to_data(image, config=self.config,
+                                                               output_type=tesseract.Output.DICT))
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text(), float(api.MeanTextConf())
+        finally:
+            self.give_back_api(api)
+
+    def backend(self):
+        '''Returns "tesserocr" if images are read by a loaded copy of
+        Tesseract kept in this process, or "pytesseract" if the tesseract
+        program is started for each image.'''
+        return "pytesseract" if self.config or not load_tesserocr() else "tesserocr"
+
+    def version(self):
+        '''Returns the tesseract version, the backend reading the images
+        (they can give slightly different text) and the options used.'''
+        if self.engineVersion is None:
+            try:
+                if self.backend() == "tesserocr":
+                    self.engineVersion = tesserocr.tesseract_version().splitlines()[0]
+                else:
+                    self.engineVersion = "tesseract " + str(load_pytesseract().get_tesseract_version())
+            except Exception:
+                self.engineVersion = "tesseract unknown"
+        return self.engineVersion + " " + self.backend() + " " + self.config
+
+    def close(self):
+        '''Frees the loaded tesserocr APIs.'''
+        with self.lock:
+            apis, self.apis = self.apis, []
+        for api in apis:
+            api.End()
+
+
+class Stub_Engine(Engine):
+    '''Engine which does not read the image at all, for testing on machines
+    without tesseract.
+
+    Returns the text it was given, or if none, words picked by a digest of the
+    pixels - the same image always gives the same text - with a fixed
+    confidence. A delay (in seconds) can be added to each image to stand in
+    for the time a real engine takes.
+    '''
+    name = "stub"
+
+    def __init__(self, text=None, delay=0, confidence=90.0):
+        '''Inits the class. Assigns the object wide variables.'''
+        self.text = text
+        self.delay = delay
+        self.confidence = confidence
+
+    def recognise_with_confidence(self, image):
+        '''Returns the stub text for the image and the fixed confidence.'''
+        return self.recognise(image), self.confidence
+
+    def recognise(self, image):
+        '''Returns the stub text for the image.'''
+        if self.delay:
+            time.sleep(self.delay)
+        if self.text is not None:
+            return self.text
+        digest = hashlib.blake2b(image.mode.encode() + str(image.size).encode() + image.tobytes(), digest_size=8)
+        return " ".join(v.commonWords[byte % len(v.commonWords)] for byte in digest.digest()).capitalize()
+
+    def version(self):
+        '''Returns the engine name and the fixed text, if any.'''
+        return self.name + " " + repr(self.text)
+
+# Engines which can be chosen by name (e.g. for batch conversions)
+engines = {"tesseract": Tesseract_Engine, "stub": Stub_Engine}
+
+# Engine used when an OCR object is not given one
+defaultEngine = Tesseract_Engine()
+
+# pytesseract and tesserocr, imported the first time Tesseract is used so that
+# the program (e.g. with the stub engine) runs on machines without them.
+# tesserocr is False once it is found not to be installed
+pytesseract = None
+tesserocr = None
+
+def load_pytesseract():
+    '''Imports pytesseract, the first time it is needed.
+
+    Returns:
+        The pytesseract module
+
+    Raises:
+        ImportError: pytesseract is not installed
+    '''
+    global pytesseract
+    if pytesseract is None:
+        import pytesseract as module
+        pytesseract = module
+    return pytesseract
+
+def load_tesserocr():
+    '''Imports tesserocr, the first time it is needed.
+
+    Returns:
+        True if tesserocr is installed
+    '''
+    global tesserocr
+    if tesserocr is None:
+        try:
+            import tesserocr as module
+            tesserocr = module
+        except ImportError:
+            tesserocr = False
+    return tesserocr is not False
+
+def text_and_confidence(data):
+    '''Rebuilds the text from pytesseract's image_to_data output, with a
+    line for each line of words and a blank line between paragraphs.
+
+    Returns:
+        Tuple of (text, mean confidence of the words, or 0 if there are none)
+    '''
+    lines = []
+    confidences = []
+    lastLine = None
+    for i, word in enumerate(data["text"]):
+        confidence = float(data["conf"][i])
+        if confidence < 0 or not word.strip():
+            continue
+        line = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if lastLine is None or line != lastLine:
+            if lastLine is not None and line[:2] != lastLine[:2]:
+                lines.append("")
+            lines.append(word)
+        else:
+            lines[-1] += " " + word
+        lastLine = line
+        confidences.append(confidence)
+    return "\n".join(lines), (sum(confidences) / len(confidences) if confidences else 0.0)
+
+
+
 # ====== Main OCR Class ====== #
 
 class OCR:
@@ -32,122 +353,738 @@ class OCR:
 
     Class within which all the OCR tools reside. Receives image input and first
     tries to identify text within the image. If no text is found, the 
-    'image clean-up' process is called, converting the image to black and white
-    and enlarging in small incriments. The conversion is then re-tried.
+    'image clean-up' process is called, running the next of the preprocessing
+    pipelines (Preprocess.retries) on the original image held in memory. The
+    conversion is then re-tried.
+
+    The image is decoded once and passed straight to tesseract - nothing is
+    written until the conversion has finished, when the archive copy is added
+    to the document store in the background.
+
+    Attributes:
+        self.file: Location of the image, or None if given in memory
+        self.data: The image file's bytes, if known
+        self.image: The decoded input image, loaded once
+        self.engine: Engine used to read the text
+        self.strategy: "retry" or "race" (see strategy above)
+        self.variant: Which attempt or variant the text came from
+        self.confidence: The engine's confidence in the text (race only)
+        self.quality: Share of the text's words which are known words
+        self.timings: Stage timings of each clean-up, as (stage, seconds) lists
     '''
-    def __init__(self, file):
-        '''Inits the class. Assigns the object wide variables.'''
+    def __init__(self, file, OCRNumber=None, engine=None, progress=None):
+        '''Inits the class. Assigns the object wide variables. The file may
+        be a location, the bytes of an image file or a PIL image.
+
+        Args:
+            OCRNumber: Number already reserved for this conversion (by
+                convert_many). If None, the next number is taken from the
+                allocator when the conversion is saved (see take_number).
+            engine: Engine to use instead of defaultEngine
+            progress: Function called with a message as each stage starts
+                (e.g. "Preprocess attempt 2"), or None
+        '''
+        self.progress = progress
         self.tries = 0
-        self.OCRNumber = str(v.settings["noOfOCRs"])
-        self.completeName = ("OCR_#"+self.OCRNumber+"_"+v.date)
-        self.file = file
+        self.OCRNumber = None
+        self.completeName = None
+        if OCRNumber is not None:
+            self.take_number(OCRNumber)
+        self.engine = engine if engine is not None else defaultEngine
+        self.file = None
+        self.data = None
+        self.image = None
+        self.sourceHash = None
+        if isinstance(file, Image.Image):
+            self.image = file
+        elif isinstance(file, (bytes, bytearray, memoryview)):
+            self.data = bytes(file)
+        else:
+            self.file = file
+        self.imageText = ""
+        self.strategy = strategy
+        self.variant = None
+        self.confidence = None
+        self.quality = 0.0
+        self.timings = []
+
+    def load(self):
+        '''Reads and decodes the image into memory, where it is kept for
+        every attempt.'''
+        self.report("Decode image")
+        if self.data is None:
+            with open(self.file, "rb") as f:
+                self.data = f.read()
+        self.image = Image.open(io.BytesIO(self.data))
+        self.image.load()
+
+    def archive(self):
+        '''Queues the archive copy of the image to be encoded and added to the
+        document store in the background.
 
-    def convert(self):
+        Returns:
+            The name the copy is stored under
+        '''
+        if archiveFormat == "original" and self.data is not None:
+            extension = (self.image.format or "img").lower().replace("jpeg", "jpg")
+            image, data = None, self.data
+        else:
+            extension = "png"
+            image, data = self.image, None
+        if self.OCRNumber is None:
+            self.take_number()
+        name = self.completeName+"."+extension
+        queue_archive(name, write_archive, int(self.OCRNumber), name, image, data, self.source_hash())
+        return name
+
+    def convert(self, commit=None):
+        '''Reads the text from the image (see read), and if any was found
+        saves it and archives the image. An image read before (found in the
+        cache) whose conversion is still stored uses that conversion instead.
+
+        Args:
+            commit: Function the save is passed to, e.g. to check the job has
+                not been cancelled first (see the main program's run_job), or
+                None to save straight away
+
+        Returns:
+            A list containing the image text and the name of the image's
+            archive copy (None if no text was found)
+        '''
+        if not self.read():
+            return [self.imageText, None]
+        if self.variant == "cached":
+            existing = self.find_existing()
+            if existing is not None:
+                # A repeat scan - the stored conversion is used, not saved again
+                return [self.imageText, existing]
+        self.report("Save")
+        if commit is None:
+            self.save()
+        else:
+            commit(self.save)
+        self.report("Archive image")
+        return [self.imageText, self.archive()]
+
+    def report(self, message):
+        '''Passes a progress message on to self.progress, if there is one.'''
+        if self.progress is not None:
+            self.progress(message)
+
+    def read(self):
         '''Attempts to read the text from the image. If unsuccessful, the
-        cleaupprocess is employed to improve readability.
+        cleaupprocess is employed to improve readability. If the same image has
+        already been read with the same settings, the cached text is used.
 
         Returns:
-            A list containing the image text and the file location of the image
+            True if text was found (it is left in self.imageText)
+
+        Each attempt is scored by Normaliser.quality. Attempts stop at the first
+        to reach quality_threshold(), or at the first which is no better than
+        the best before it once any known words have been found - cleaning up
+        an image which is already read well rarely helps, and costs the most.
 
         Raises:
             Exception: Any error causes the program to either clean-up image
                 and retry (up to 5 times) or return a failure
         '''
-        im = Image.open(self.file)
-        im.save(os.path.join('OCR_Images', self.completeName+".jpeg"), 'JPEG', quality=90)
-        self.file = "OCR_Images/"+self.completeName+".jpeg"
+        global pixelBytesSkipped
+        if self.image is None:
+            self.load()
+        key = self.cache_key()
+        cached = cache.get(key)
+        if cached is not None:
+            # Already read - the retries are skipped
+            self.imageText = E.decrypt_bytes(cached)
+            self.variant = "cached"
+            self.report("Found in cache")
+            self.quality = N.quality(self.imageText)
+            pixelBytesSkipped += self.pixelBytes
+            return True
+        if self.strategy == "race" and self.tries == 0:
+            self.report("Recognise " + str(len(P.variants)) + " variants")
+            if self.race():
+                cache.put(key, E.encrypt_bytes(self.imageText))
+                return True
+            # No variant found any text - the raw image has been tried
+            self.tries = 1
+        # Best (quality, text, attempt) so far, used if no attempt reaches
+        # the threshold
+        best = None
+        threshold = quality_threshold()
         while self.tries < 6:
             try:
-                self.imageText = pytesseract.image_to_string(Image.open(self.file))
-                if self.spellcheck():
-                    self.save()
+                if self.tries > 0:
+                    self.report("Preprocess attempt " + str(self.tries + 1))
+                image = self.cleanup() if self.tries > 0 else self.image
+                self.report("Recognise attempt " + str(self.tries + 1))
+                text = self.recognise(image)
+                score = N.quality(text)
+                if best is not None and best[0] > 0 and score <= best[0]:
+                    # Stopped improving
+                    break
+                if best is None or score > best[0]:
+                    best = (score, text, "retry " + str(self.tries) if self.tries else "raw")
+                if score >= threshold:
                     break
                 else:
                     self.tries += 1
-                    self.cleanup()
             except Exception as e:
                 self.tries += 1
                 print(str(e))
-                self.cleanup()
-        return [self.imageText, self.file]
+        if best is None:
+            return False
+        self.quality, self.imageText, self.variant = best
+        if self.quality == 0:
+            return False
+        cache.put(key, E.encrypt_bytes(self.imageText))
+        return True
+
+    def cache_key(self):
+        '''Builds the cache key for this conversion from a hash of the
+        decoded pixels, the clean-up pipelines still to be tried and the
+        engine version - if any of them change, the image is read again.'''
+        pixels = self.image.tobytes()
+        self.pixelBytes = len(pixels)
+        pipelines = [pipeline.key for pipeline in P.retries[max(self.tries - 1, 0):]]
+        if self.strategy == "race":
+            pipelines += [name + ":" + pipeline.key for name, pipeline in P.variants]
+            pipelines.append(str(confidenceThreshold))
+        return C.make_key(hashlib.sha256(pixels).digest(), self.image.mode, str(self.image.size),
+                          str(self.tries), self.strategy, "|".join(pipelines),
+                          str((tileHeight, tileOverlap)), self.engine.version())
+
+    def recognise(self, image):
+        '''Reads the text from an image in memory. Tall images are cut into
+        strips between lines of text (see Preprocess.find_cuts), which are read
+        in parallel and joined back together from the top down.'''
+        if image.height <= tileHeight:
+            return self.engine.recognise(image)
+        cuts = P.find_cuts(image, tileHeight, tileOverlap)
+        strips = (image.crop((0, top, image.width, bottom)) for top, bottom in cuts)
+        return stitch(self.engine.recognise_many(strips))
+
+    def recognise_with_confidence(self, image):
+        '''Reads the text from an image in memory with the engine's
+        confidence in it. Tall images are read in strips (as in recognise), and
+        the confidence is the mean of the strips' weighted by their text.
+
+        Returns:
+            Tuple of (text, confidence from 0 to 100, or None)
+        '''
+        if image.height <= tileHeight:
+            return self.engine.recognise_with_confidence(image)
+        cuts = P.find_cuts(image, tileHeight, tileOverlap)
+        strips = (image.crop((0, top, image.width, bottom)) for top, bottom in cuts)
+        results = self.engine.recognise_many(strips, withConfidence=True)
+        weights = [len(text.strip()) for text, confidence in results]
+        if None in (confidence for text, confidence in results) or not sum(weights):
+            confidence = None
+        else:
+            confidence = sum(weight * confidence for weight, (text, confidence) in zip(weights, results)) / sum(weights)
+        return stitch(text for text, confidence in results), confidence
+
+    def read_variant(self, pipeline):
+        '''Runs a preprocessing variant and reads the result (run on one of
+        the race's threads).
+
+        Returns:
+            Tuple of (text, confidence, stage timings)
+        '''
+        timings = []
+        text, confidence = self.recognise_with_confidence(pipeline.run(self.image, timings))
+        return text, confidence, timings
+
+    def race(self):
+        '''Reads the image with Preprocess.variants in order, raceWidth at a
+        time. Each variant is only started once a read finishes, so as soon as
+        a variant with text reaches confidenceThreshold it is used and the
+        rest are never started (ones already being read are left to finish,
+        and ignored). Otherwise the most confident variant with text is used.
+
+        Returns:
+            True if text was found - the chosen variant and its confidence are
+            left in self.variant and self.confidence
+        '''
+        width = max(1, min(raceWidth, len(P.variants) - 1, os.cpu_count() or 1))
+        variants = iter(P.variants)
+        pool = ThreadPoolExecutor(width)
+        running = {}
+        best = None
+        confident = False
+        try:
+            while not confident:
+                for name, pipeline in itertools.islice(variants, width - len(running)):
+                    running[pool.submit(self.read_variant, pipeline)] = name
+                if not running:
+                    break
+                done = wait(running, return_when=FIRST_COMPLETED)[0]
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        text, confidence, timings = future.result()
+                    except Exception as e:
+                        print(str(e))
+                        continue
+                    self.timings.append(timings)
+                    textQuality = N.quality(text)
+                    if textQuality == 0:
+                        continue
+                    score = confidence if confidence is not None else -1
+                    if best is None or score > best[2]:
+                        best = (name, text, score, confidence, textQuality)
+                    if score >= confidenceThreshold:
+                        confident = True
+        finally:
+            pool.shutdown(wait=False)
+        if best is None:
+            return False
+        self.variant, self.imageText, score, self.confidence, self.quality = best
+        return True
 
     def cleanup(self):
-        '''Removes image noise and improves image readability.'''
-        im = Image.open(self.file).convert("L")
-        width, height = im.size
-        x, y = im.size
-        # Smaller iterations for upscaling provide better quality. LANCZOS used
-        # (new name for anti-aliasing in PIL)
-        while width < (x * 2) and height < (y * 2):
-            im = im.resize((width + 20, height + 20), Image.LANCZOS)
-            im.save(os.path.join('OCR_Images', self.completeName+".jpeg"), 'JPEG', quality=90)
-        self.file = "OCR_Images/"+self.completeName+".jpeg"
-        # Identifies whether the script is being called from convert
-        # or externally
-        if self.tries > 0:
-            return self.convert()
-
-    def spellcheck(self):
-        '''Checks to see whether there are any commonly appearing words in
-        the converted text.
+        '''Removes image noise and improves image readability.
+
+        Each retry runs the next (stronger) pipeline on the original image, so
+        nothing is written to disk and no quality is lost between attempts.
+
+        Returns:
+            The cleaned-up image
+        '''
+        pipeline = P.retries[min(self.tries, len(P.retries)) - 1]
+        timings = []
+        image = pipeline.run(self.image, timings)
+        self.timings.append(timings)
+        return image
+
+    def spellcheck(self, text=None):
+        '''Checks whether enough of the converted text (or text, if given)
+        is made of known words - see Normaliser.quality.
 
         Returns:
             A boolean value - True for success, False for failure.
         '''
-        text = self.imageText
-        for character in text:
-            if character not in v.alphabet:
-                text = text.replace(character, "")
-
-        bool = False
-        text.split(" ")
-        for word in text:
-            if word in v.alphabet:
-                bool = True
-                break
-        return bool
+        return N.quality(self.imageText if text is None else text) >= quality_threshold()
+
+    def take_number(self, OCRNumber=None):
+        '''Numbers and names the conversion, taking the next number from the
+        allocator if none is given. Called when the conversion is first kept,
+        so conversions which fail or are found in the cache use no number up.'''
+        if OCRNumber is None:
+            OCRNumber = A.take("noOfOCRs")
+        self.OCRNumber = str(OCRNumber)
+        self.completeName = ("OCR_#"+self.OCRNumber+"_"+v.date)
 
     def save(self):
-        '''Saves the OCR Converted file to the OCR_Conversions folder'''
-        with open(os.path.join('OCR_Conversions', self.completeName+".txt"), "w", encoding="utf-8") as file:
-            file.write(E.encrypt(self.imageText))
-        v.settings["noOfOCRs"] += 1
-        v.save()        
+        '''Saves the encrypted OCR conversion to the document store and adds
+        it to the IDF index (if one has been built)'''
+        if self.OCRNumber is None:
+            self.take_number()
+        D.store().add("conversion", int(self.OCRNumber), self.completeName, E.encrypt_bytes(self.imageText),
+                      len(self.imageText), self.source_hash())
+        try:
+            I.add_file(self.completeName, self.imageText)
+        except Exception as e:
+            print(e)
+
+    def find_existing(self):
+        '''Finds the stored conversion of the same image file, and numbers
+        and names this conversion after it.
+
+        Returns:
+            The name of the image's stored archive copy (or of the conversion,
+            if it has none), or None if the image has no stored conversion
+        '''
+        store = D.store()
+        conversions = store.find_source(self.source_hash(), "conversion")
+        if not conversions:
+            return None
+        conversion = store.document(max(conversions))
+        self.OCRNumber = str(conversion["number"])
+        self.completeName = conversion["name"]
+        images = store.find_source(self.source_hash(), "image")
+        return store.document(max(images))["name"] if images else self.completeName
+
+    def source_hash(self):
+        '''Hashes the image file's bytes (or the pixels, for an image given
+        in memory), to be stored with the conversion.'''
+        if self.sourceHash is None:
+            self.sourceHash = D.source_hash(self.data if self.data is not None else self.image.tobytes())
+        return self.sourceHash
         
 
 
+# ====== Tiling Sub-Routine ====== #
+
+def stitch(texts):
+    '''Joins the text of each strip of an image. Where strips overlap, a line
+    read at the bottom of one strip and again at the top of the next is only
+    kept once.
+
+    Returns:
+        String of the text of the whole image
+    '''
+    lines = []
+    for text in texts:
+        stripLines = text.strip().splitlines()
+        if lines and stripLines and stripLines[0].strip() == lines[-1].strip():
+            stripLines = stripLines[1:]
+        lines.extend(stripLines)
+    return "\n".join(lines)
+
+
+
+# ====== Multi-Page Sub-Routines ====== #
+
+# Image types which can hold more than one page
+multiPageTypes = (".tif", ".tiff", ".gif", ".webp")
+
+def page_count(file):
+    '''Returns the number of pages (frames) in an image file.'''
+    with Image.open(file) as image:
+        return getattr(image, "n_frames", 1)
+
+def pages(source):
+    '''Yields each page of a document, one at a time.
+
+    Args:
+        source: Path of a multi-page image (e.g. TIFF), whose frames are
+            decoded one at a time as they are asked for, or a list of image
+            paths in page order (decoded later, by the OCR object)
+
+    Yields:
+        PIL image of each frame, or the path of each image
+    '''
+    if isinstance(source, str):
+        with Image.open(source) as image:
+            for i in range(getattr(image, "n_frames", 1)):
+                image.seek(i)
+                yield image.copy()
+    else:
+        yield from source
+
+def read_page(page, engine):
+    '''Reads one page of a document (run on a look-ahead thread).
+
+    Returns:
+        The page's text, or an empty string if none was found
+    '''
+    # Pages are not saved on their own, so no OCR number is used up
+    ocr = OCR(page, OCRNumber=0, engine=engine)
+    return ocr.imageText if ocr.read() else ""
+
+def convert_pages(source, engine=None, lookahead=2):
+    '''Converts every page of a multi-page document into one conversion.
+
+    Pages are read lookahead at a time while later pages wait to be decoded,
+    and each page's text is encrypted and appended to the conversion (in a
+    temporary file) as soon as the pages before it are done - memory use does
+    not grow with the number of pages. The conversion is then copied into the
+    document store, followed by the original file(s) once the document is
+    finished.
+
+    Args:
+        source: Path of a multi-page image or a list of image paths (see pages)
+        engine: Engine to use instead of defaultEngine
+        lookahead: Number of pages being read at once
+
+    Yields:
+        Tuples of (page number, text), in page order, as each page finishes
+    '''
+    OCRNumber = A.take("noOfOCRs")
+    completeName = "OCR_#"+str(OCRNumber)+"_"+v.date
+    # Each different word is kept for the IDF index rather than the whole text
+    words = set()
+    characters = 0
+    with tempfile.TemporaryFile() as file, ThreadPoolExecutor(max(lookahead, 1)) as pool:
+        writer = E.Stream_Writer(file)
+        lookahead = max(lookahead, 1)
+        remaining = pages(source)
+        running = deque()
+        pageNumber = 0
+        try:
+            while True:
+                # Keeps lookahead pages in progress
+                for page in itertools.islice(remaining, lookahead - len(running)):
+                    running.append(pool.submit(read_page, page, engine))
+                if not running:
+                    break
+                pageNumber += 1
+                text = running.popleft().result()
+                piece = ("\n\n" if pageNumber > 1 else "") + text
+                writer.write(piece)
+                characters += len(piece)
+                words.update(N.split_words(N.normalise(text.lower())))
+                yield pageNumber, text
+        finally:
+            # Pages read so far are kept if the conversion is stopped early
+            writer.close()
+            size = file.tell()
+            file.seek(0)
+            D.store().add_stream("conversion", OCRNumber, completeName, file, size, characters)
+
+    sources = [source] if isinstance(source, str) else list(source)
+    for i, original in enumerate(sources):
+        extension = os.path.splitext(original)[1].lower()
+        suffix = "_p"+str(i + 1) if len(sources) > 1 else ""
+        archiveName = completeName+suffix+extension
+        queue_archive(archiveName, copy_archive, OCRNumber, original, archiveName)
+    try:
+        I.add_file(completeName, " ".join(words))
+    except Exception as e:
+        print(e)
+
+
+
+# ====== Archive Sub-Routines ====== #
+
+def queue_archive(name, function, *args):
+    '''Runs function(*args) on the archiver thread, keeping it in pending
+    under name until it is done.'''
+    future = archiver.submit(function, *args)
+    pending[name] = future
+
+    def done(future):
+        # The name may have been queued again since
+        if pending.get(name) is future:
+            del pending[name]
+    # Run straight away if the job has already finished
+    future.add_done_callback(done)
+
+def png_bytes(image):
+    '''Encodes an image as PNG, first converting modes PNG cannot store
+    (e.g. CMYK) to RGB, or RGBA if the image has transparency.'''
+    if image.mode not in pngModes:
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+def write_archive(OCRNumber, name, image, data, sourceHash):
+    '''Adds an archive copy of an image to the document store, encoding
+    image as PNG if data (the bytes to store) is None (run on the archiver
+    thread). The conversion has already been saved, so errors are printed
+    rather than raised.'''
+    try:
+        if data is None:
+            data = png_bytes(image)
+        D.store().add("image", OCRNumber, name, data, 0, sourceHash)
+    except Exception as e:
+        print("Could not archive " + name + ": " + str(e))
+
+def copy_archive(OCRNumber, source, name):
+    '''Adds an original image file to the document store (run on the
+    archiver thread).'''
+    try:
+        with open(source, "rb") as f:
+            data = f.read()
+        D.store().add("image", OCRNumber, name, data, 0, D.source_hash(data))
+    except Exception as e:
+        print("Could not archive " + name + ": " + str(e))
+
+def wait_for_archives(name=None):
+    '''Waits until the archive copy called name (or every copy, if name is
+    None) has been added.'''
+    futures = list(pending.values()) if name is None else [pending.get(name)]
+    for future in futures:
+        if future is not None:
+            future.result()
+
+
+
+# ====== Cache Sub-Routine ====== #
+
+def cache_stats():
+    '''Returns a dictionary of the OCR cache's counters, its hit rate and
+    the bytes of pixel data which were not recognised again.'''
+    stats = cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    stats["hitRate"] = stats["hits"] / lookups if lookups else 0.0
+    stats["pixelBytesSkipped"] = pixelBytesSkipped
+    return stats
+
+
+
+# ====== Quality Sub-Routine ====== #
+
+def quality_threshold():
+    '''Returns the share of known words at which an attempt is accepted -
+    minimumQuality if a word list was loaded, otherwise builtInQuality.'''
+    if N.wordSet is None:
+        N.load_words()
+    return minimumQuality if N.dictionaryLoaded else builtInQuality
+
+
+
 # ====== Main Sub-Routines ====== #
 
-def convert(file):
+def convert(file, progress=None, commit=None):
     '''Main refferal sub-routine for OCR program'''
-    ocr = OCR(file)
-    return ocr.convert()
+    ocr = OCR(file, progress=progress)
+    return ocr.convert(commit)
 
-def cleanup(file):
-    '''Cleanup referral sub-routine for OCR program'''
-    ocr = OCR(file)
-    return ocr.convert()
+def cleanup(file, progress=None, commit=None):
+    '''Cleanup referral sub-routine for OCR program - converts the image
+    starting with the first clean-up pipeline'''
+    ocr = OCR(file, progress=progress)
+    ocr.tries = 1
+    return ocr.convert(commit)
 
 
 
-# ====== Python Boiler Plate ====== #
+# ====== Batch Sub-Routines ====== #
 
-if __name__ == "__main__":
-    '''Asks for inputs if called as main file'''
+# Image types picked up when converting a folder
+imageTypes = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+def start_worker(settings, engineName, strategyName, threshold):
+    '''Runs once in each batch worker process. Copies the parent's settings
+    across and starts the worker's own engine, which is kept for every image
+    the worker converts. Each image's conversion and archive copy are
+    written to the document store together (see convert_job).'''
+    global defaultEngine, strategy, confidenceThreshold, raceWidth
+    v.settings = settings
+    D.start_batch()
+    defaultEngine = engines[engineName]()
+    strategy = strategyName
+    confidenceThreshold = threshold
+    raceWidth = 1
+
+def convert_job(job):
+    '''Converts one batch image inside a worker process.
+
+    Args:
+        job: Tuple of (image path, OCRNumber)
+
+    Returns:
+        Tuple of (path, OCRNumber, text, error, seconds, variant, confidence,
+        quality) - error is None if the image was converted and saved,
+        otherwise the error message. Variant, confidence and quality are those
+        of OCR.
+    '''
+    path, OCRNumber = job
+    start = time.perf_counter()
     try:
-        file = ("Enter a file location: ")
-        convert(file)
-    except:
-        print("There was an error or no text could be identified")
+        ocr = OCR(path, OCRNumber)
+        text = ocr.convert()[0]
+        wait_for_archives()
+        # Written before reporting back, so a failed write is not reported
+        # as done
+        D.store().flush()
+        # A repeat scan keeps the number of its stored conversion
+        OCRNumber = int(ocr.OCRNumber)
+        return (path, OCRNumber, text, None, time.perf_counter() - start, ocr.variant, ocr.confidence, ocr.quality)
+    except Exception as e:
+        return (path, OCRNumber, None, str(e), time.perf_counter() - start, None, None, 0.0)
 
+def convert_many(images, engineName="tesseract", workers=None, queueSize=None, strategyName=None, threshold=None):
+    '''Converts many images at once across a pool of worker processes.
 
+    A block of OCR numbers is reserved up front (see Allocator.reserve) so
+    workers can save without taking numbers themselves. At most queueSize
+    images are handed to the workers at a time, so a large folder is never
+    held in memory all at once.
 
+    Args:
+        images: Path of a folder of images, or a list of image paths
+        engineName: Name of the engine (in engines) each worker uses
+        workers: Number of worker processes (defaults to the number of CPUs)
+        queueSize: Images in progress at once (defaults to twice workers)
+        strategyName: "retry" or "race" (defaults to strategy)
+        threshold: Confidence at which a race stops (defaults to
+            confidenceThreshold)
 
+    Yields:
+        Tuples of (path, OCRNumber, text, error, seconds, variant,
+        confidence, quality) as each image finishes, in no particular order.
+    '''
+    if isinstance(images, str):
+        images = [os.path.join(images, f) for f in sorted(os.listdir(images))
+                  if f.lower().endswith(imageTypes) and os.path.isfile(os.path.join(images, f))]
+    if not images:
+        return
+    firstNumber = A.reserve("noOfOCRs", len(images))
 
+    workers = workers or os.cpu_count() or 1
+    queueSize = max(queueSize or workers * 2, 1)
+    jobs = iter([(path, firstNumber + i) for i, path in enumerate(images)])
+    with ProcessPoolExecutor(workers, initializer=start_worker,
+                             initargs=(v.settings, engineName, strategyName or strategy,
+                                       confidenceThreshold if threshold is None else threshold)) as pool:
+        running = set()
+        for job in jobs:
+            running.add(pool.submit(convert_job, job))
+            if len(running) >= queueSize:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in running:
+            yield future.result()
 
+def batch_main(args):
+    '''Headless command for converting a folder or list of images.'''
+    parser = argparse.ArgumentParser(prog="OCR_Program.py", description="Convert many images to text at once")
+    parser.add_argument("images", nargs="+", help="a folder of images or a list of image files")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("-q", "--queue-size", type=int, default=None, help="images in progress at once (default: 2 x workers)")
+    parser.add_argument("-e", "--engine", default="tesseract", choices=sorted(engines), help="OCR engine")
+    parser.add_argument("-s", "--strategy", default=strategy, choices=["retry", "race"],
+                        help="retry clean-ups in turn, or race preprocessing variants")
+    parser.add_argument("--threshold", type=float, default=confidenceThreshold,
+                        help="confidence (0-100) at which a race stops early")
+    args = parser.parse_args(args)
 
+    images = args.images
+    if len(images) == 1 and os.path.isdir(images[0]):
+        images = images[0]
+    try:
+        v.load()
+    except Exception:
+        pass
+    engine = engines[args.engine]()
+    print("engine: " + engine.version().strip())
+    if isinstance(engine, Tesseract_Engine) and engine.backend() != "tesserocr":
+        print("tesserocr is not installed - tesseract is started for every image (PIP install tesserocr to keep it loaded)")
 
+    start = time.perf_counter()
+    latencies = []
+    chosen = Counter()
+    qualities = []
+    for path, OCRNumber, text, error, seconds, variant, confidence, quality in convert_many(
+            images, args.engine, args.workers, args.queue_size, args.strategy, args.threshold):
+        latencies.append(seconds)
+        if error is None:
+            chosen[variant] += 1
+            qualities.append(quality)
+            detail = str(variant) + ("" if confidence is None else ", confidence {:.1f}".format(confidence))
+            detail += ", quality {:.2f}".format(quality)
+            print("OCR_#" + str(OCRNumber) + " <- " + path + " ({:.3f}s, {})".format(seconds, detail))
+        else:
+            print("FAILED " + path + ": " + error)
+    total = time.perf_counter() - start
+    if latencies:
+        latencies.sort()
+        print(str(len(latencies)) + " images in {:.2f} seconds - {:.2f} images/sec".format(total, len(latencies) / total))
+        print("latency per image: mean {:.3f}s, median {:.3f}s, 95th percentile {:.3f}s, max {:.3f}s".format(
+            sum(latencies) / len(latencies), latencies[len(latencies) // 2],
+            latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], latencies[-1]))
+        if qualities:
+            threshold = quality_threshold()
+            print("mean quality {:.2f}, below {}: {}".format(sum(qualities) / len(qualities), threshold,
+                                                            sum(1 for quality in qualities if quality < threshold)))
+        print("text taken from: " + ", ".join(str(variant) + " x" + str(count) for variant, count in chosen.most_common()))
 
 
 
-        
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    # Arguments given - run as a headless batch command
+    if len(sys.argv) > 1:
+        batch_main(sys.argv[1:])
+        sys.exit()
+    try:
+        file = input("Enter a file location: ")
+        print(convert(file)[0])
+    except:
+        print("There was an error or no text could be identified")
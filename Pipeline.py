@@ -0,0 +1,306 @@
+#   PIPELINE PROGRAM    #
+
+# =========================================================================== #
+'''
+Program for turning a folder of images straight into summaries, without the
+interface. Each image goes through the stages OCR, summarise, encrypt and save,
+with a queue of limited size between each stage - a stage which falls behind
+makes the stages before it wait, rather than letting work pile up in memory.
+The stages run at the same time on different images (using asyncio), with the
+slow parts done in worker processes. Comments are attempted to be written in
+accordance with PEP 8 Style Guide:
+http://legacy.python.org/dev/peps/pep-0008/#comments
+https://google.github.io/styleguide/pyguide.html
+'''
+# =========================================================================== #
+
+
+
+# ====== Imports (Python Native Modules and My Program Modules) ====== #
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import TLDR_Program as TLDR
+import OCR_Program as OCR
+import Encryption as E
+import IDF_Index as I
+import Allocator as A
+import Storage as D
+import Variables as v
+import argparse
+import asyncio
+import time
+import sys
+import os
+
+
+
+# ====== Variable definitions ====== #
+
+# Stages in the order each image goes through them, and how many images each
+# works on at once by default
+stages = ["ocr", "summarise", "encrypt", "save"]
+defaultConcurrency = {"ocr": os.cpu_count() or 1, "summarise": 1, "encrypt": 1, "save": 2}
+
+# Marks the end of the images in a queue
+finished = None
+
+
+
+# ====== Stage Sub-Routines (run in executors) ====== #
+
+def start_worker(settings, engineName):
+    '''Runs once in each worker process. Copies the parent's settings across
+    and starts the worker's own OCR engine. Archive copies of the images are
+    held back and written once each image is read (see ocr_image).'''
+    v.settings = settings
+    D.start_batch()
+    OCR.defaultEngine = OCR.engines[engineName]()
+    # The other workers are already using every CPU
+    OCR.raceWidth = 1
+
+def ocr_image(path, OCRNumber):
+    '''Reads the text from an image and archives it (OCR stage).
+
+    Returns:
+        Tuple of (text or None if no text was found, quality, hash of the
+        image file)
+    '''
+    ocr = OCR.OCR(path, OCRNumber)
+    found = ocr.read()
+    ocr.archive()
+    OCR.wait_for_archives()
+    D.store().flush()
+    return (ocr.imageText if found else None), ocr.quality, ocr.source_hash()
+
+def summarise_text(title, text, summaryAmount, scorer):
+    '''Summarises the text of an image (summarise stage), using the TL;DR
+    cache.
+
+    Returns:
+        String of the summary
+    '''
+    key = TLDR.cache_key(title, text, summaryAmount, scorer)
+    summary = TLDR.cache.get(key)
+    if summary is None:
+        S = TLDR.new_summary(title, text, summaryAmount, scorer)
+        S.rank_words()
+        S.rank_sentences()
+        S.form_summary()
+        summary = S.summary
+        TLDR.cache.put(key, summary)
+    return summary
+
+def encrypt_texts(texts):
+    '''Encrypts each of the texts (encrypt stage).'''
+    return [E.encrypt_bytes(text) for text in texts]
+
+def save_documents(documents, conversionName, text):
+    '''Adds each (kind, number, name, encrypted text, characters, source
+    hash) to the document store, which writes them in batches, and adds the
+    conversion to the IDF index (save stage).'''
+    store = D.store()
+    for document in documents:
+        store.add(*document)
+    try:
+        I.add_file(conversionName, text)
+    except Exception as e:
+        print(e)
+
+
+
+# ====== Main Pipeline Class ====== #
+
+class Pipeline:
+    '''Runs images through every stage, several at a time.
+
+    Each job is a dictionary for one image, which is passed from stage to
+    stage. A job which fails at a stage is given an error and passed straight
+    through the later stages.
+
+    Attributes:
+        self.concurrency: Number of images each stage works on at once
+        self.queueSize: Number of jobs waiting between two stages at most
+        self.busy: Seconds each stage spent working, added up over all jobs
+    '''
+    def __init__(self, summaryAmount=5, scorer="frequency", engineName="tesseract", title=None,
+                 concurrency=None, queueSize=4):
+        '''Inits the class. Assigns the object wide variables.'''
+        self.summaryAmount = summaryAmount
+        self.scorer = scorer
+        self.engineName = engineName
+        self.title = title
+        self.concurrency = dict(defaultConcurrency)
+        self.concurrency.update(concurrency or {})
+        self.queueSize = queueSize
+        self.busy = {stage: 0.0 for stage in stages}
+
+    async def run(self, images):
+        '''Runs every image through the pipeline. Saved documents are written
+        to the document store in batches, the last once every job is done.
+
+        Yields:
+            Each finished job, in the order they finish
+        '''
+        store = D.store()
+        store.begin_batch()
+        try:
+            async for job in self.run_stages(images):
+                yield job
+        finally:
+            store.end_batch()
+
+    async def run_stages(self, images):
+        '''Starts every stage and passes the jobs coming out of the last.'''
+        processes = self.concurrency["ocr"] + self.concurrency["summarise"] + self.concurrency["encrypt"]
+        with ProcessPoolExecutor(processes, initializer=start_worker, initargs=(v.settings, self.engineName)) as pool, \
+                ThreadPoolExecutor(self.concurrency["save"]) as threads:
+            self.executors = {"ocr": pool, "summarise": pool, "encrypt": pool, "save": threads}
+            queues = [asyncio.Queue(self.queueSize) for i in range(len(stages) + 1)]
+            tasks = [asyncio.ensure_future(self.feed(images, queues[0]))]
+            for i, stage in enumerate(stages):
+                tasks.append(asyncio.ensure_future(self.run_stage(stage, queues[i], queues[i + 1])))
+            try:
+                while True:
+                    job = await queues[-1].get()
+                    if job is finished:
+                        break
+                    yield job
+                for task in tasks:
+                    await task
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def feed(self, images, queue):
+        '''Reserves numbers for the images and puts a job for each into the
+        first queue, waiting whenever it is full.'''
+        firstOCR = A.reserve("noOfOCRs", len(images))
+        firstSummary = A.reserve("noOfSummaries", len(images))
+        for i, path in enumerate(images):
+            title = self.title
+            if title is None:
+                title = os.path.splitext(os.path.basename(path))[0].replace("_", " ").replace("-", " ")
+            await queue.put({"path": path, "title": title, "OCRNumber": firstOCR + i,
+                             "summaryNumber": firstSummary + i, "error": None, "start": time.perf_counter()})
+        await queue.put(finished)
+
+    async def run_stage(self, stage, inbox, outbox):
+        '''Runs concurrency[stage] workers taking jobs from inbox and passing
+        them on to outbox, then marks the end of outbox once every job is
+        through.'''
+        workers = [asyncio.ensure_future(self.stage_worker(stage, inbox, outbox))
+                   for i in range(self.concurrency[stage])]
+        await asyncio.gather(*workers)
+        await outbox.put(finished)
+
+    async def stage_worker(self, stage, inbox, outbox):
+        '''Takes jobs from inbox one at a time until the end is reached.'''
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await inbox.get()
+            if job is finished:
+                # Left in the queue for the stage's other workers
+                await inbox.put(finished)
+                return
+            if job["error"] is None:
+                start = time.perf_counter()
+                try:
+                    await self.process(stage, job, loop)
+                except Exception as e:
+                    job["error"] = stage + ": " + str(e)
+                self.busy[stage] += time.perf_counter() - start
+            await outbox.put(job)
+
+    async def process(self, stage, job, loop):
+        '''Carries out one stage for a job in the stage's executor.'''
+        executor = self.executors[stage]
+        if stage == "ocr":
+            job["text"], job["quality"], job["sourceHash"] = await loop.run_in_executor(executor, ocr_image, job["path"],
+                                                                                       job["OCRNumber"])
+            if job["text"] is None:
+                raise ValueError("no text could be identified")
+        elif stage == "summarise":
+            job["summary"] = await loop.run_in_executor(executor, summarise_text, job["title"], job["text"],
+                                                        self.summaryAmount, self.scorer)
+        elif stage == "encrypt":
+            job["encrypted"] = await loop.run_in_executor(executor, encrypt_texts, [job["text"], job["summary"]])
+        elif stage == "save":
+            job["conversionName"] = "OCR_#" + str(job["OCRNumber"]) + "_" + v.date
+            job["summaryName"] = "Summary_#" + str(job["summaryNumber"]) + "_" + v.date
+            conversion, summary = job.pop("encrypted")
+            documents = [("conversion", job["OCRNumber"], job["conversionName"], conversion, len(job["text"]),
+                          job["sourceHash"]),
+                         ("summary", job["summaryNumber"], job["summaryName"], summary, len(job["summary"]),
+                          D.source_hash(job["text"]))]
+            await loop.run_in_executor(executor, save_documents, documents, job["conversionName"], job["text"])
+        job["seconds"] = time.perf_counter() - job["start"]
+
+
+
+# ====== Main Sub-Routines ====== #
+
+def summarise_images(images, summaryAmount=5, scorer="frequency", engineName="tesseract", title=None,
+                     concurrency=None, queueSize=4):
+    '''Runs a folder (or list) of images through the pipeline.
+
+    Returns:
+        Tuple of (list of finished jobs, the Pipeline, seconds taken)
+    '''
+    if isinstance(images, str):
+        images = [os.path.join(images, f) for f in sorted(os.listdir(images))
+                  if f.lower().endswith(OCR.imageTypes) and os.path.isfile(os.path.join(images, f))]
+    pipeline = Pipeline(summaryAmount, scorer, engineName, title, concurrency, queueSize)
+
+    async def collect():
+        jobs = []
+        async for job in pipeline.run(images):
+            if job["error"] is None:
+                print("Summary_#" + str(job["summaryNumber"]) + " <- " + job["path"] +
+                      " ({:.3f}s)".format(job["seconds"]))
+            else:
+                print("FAILED " + job["path"] + ": " + job["error"])
+            jobs.append(job)
+        return jobs
+
+    start = time.perf_counter()
+    jobs = asyncio.run(collect())
+    return jobs, pipeline, time.perf_counter() - start
+
+def main(args):
+    '''Headless command for turning a folder of images into summaries.'''
+    parser = argparse.ArgumentParser(prog="Pipeline.py", description="Convert images and summarise them in one go")
+    parser.add_argument("images", nargs="+", help="a folder of images or a list of image files")
+    parser.add_argument("-n", "--sentences", type=int, default=5, help="sentences in each summary")
+    parser.add_argument("-t", "--title", default=None, help="title for every summary (default: each file's name)")
+    parser.add_argument("-s", "--scorer", default="frequency", choices=sorted(TLDR.scorers), help="sentence scorer")
+    parser.add_argument("-e", "--engine", default="tesseract", choices=sorted(OCR.engines), help="OCR engine")
+    parser.add_argument("-q", "--queue-size", type=int, default=4, help="jobs waiting between two stages at most")
+    for stage in stages:
+        parser.add_argument("--" + stage, type=int, default=defaultConcurrency[stage],
+                            help="images worked on at once in the " + stage + " stage")
+    args = parser.parse_args(args)
+
+    images = args.images
+    if len(images) == 1 and os.path.isdir(images[0]):
+        images = images[0]
+    try:
+        v.load()
+    except Exception:
+        pass
+
+    concurrency = {stage: max(getattr(args, stage), 1) for stage in stages}
+    jobs, pipeline, total = summarise_images(images, args.sentences, args.scorer, args.engine, args.title,
+                                             concurrency, max(args.queue_size, 1))
+    done = sum(1 for job in jobs if job["error"] is None)
+    if jobs:
+        print(str(done) + " of " + str(len(jobs)) + " images summarised in {:.2f} seconds - {:.2f} images/sec".format(
+            total, len(jobs) / total))
+        print("time busy in each stage: " + ", ".join(stage + " {:.2f}s".format(pipeline.busy[stage]) for stage in stages))
+    return 0 if done == len(jobs) else 1
+
+
+
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
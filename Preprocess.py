@@ -0,0 +1,199 @@
+#   PREPROCESS PROGRAM    #
+
+# =========================================================================== #
+'''
+Program for cleaning up images before OCR to make the text easier to read.
+Each stage (grayscale, upscale, binarise, denoise) works on an image held in
+memory and stages are joined together into pipelines, which time each stage
+as it runs. Nothing is written to disk between stages. Comments are attempted
+to be written in accordance with PEP 8 Style Guide:
+http://legacy.python.org/dev/peps/pep-0008/#comments
+https://google.github.io/styleguide/pyguide.html
+'''
+# =========================================================================== #
+
+
+
+# ====== Imports (Python Native Modules and My Program Modules) ====== #
+
+from PIL import ImageFilter, Image
+import numpy as np
+import time
+
+
+
+# ====== Stages ====== #
+
+def grayscale(image):
+    '''Converts the image to 8-bit grayscale.'''
+    return image.convert("L")
+
+def upscale(image, scale=2):
+    '''Enlarges the image by scale in one step. LANCZOS used (new name for
+    anti-aliasing in PIL).'''
+    width, height = image.size
+    return image.resize((int(width * scale), int(height * scale)), Image.LANCZOS)
+
+def otsu_threshold(pixels):
+    '''Finds the grey level which best splits the pixels into dark (text) and
+    light (background), using Otsu's method over the whole histogram at once.
+
+    Returns:
+        Integer threshold - pixels above it are background
+    '''
+    return histogram_threshold(np.bincount(pixels.ravel(), minlength=256))
+
+def histogram_threshold(histogram):
+    '''Otsu's method on a 256 bin histogram of grey levels, for when the
+    pixels are not all held at once.'''
+    histogram = np.asarray(histogram, dtype=np.float64)
+    total = histogram.sum()
+    weight = np.cumsum(histogram) / total
+    mean = np.cumsum(histogram * np.arange(256)) / total
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean[-1] * weight - mean) ** 2 / (weight * (1 - weight))
+    return int(np.argmax(np.nan_to_num(between)))
+
+def binarise(image):
+    '''Turns the image pure black and white at the Otsu threshold.'''
+    pixels = np.asarray(image.convert("L"))
+    threshold = otsu_threshold(pixels)
+    return Image.fromarray(np.where(pixels > threshold, 255, 0).astype(np.uint8), "L")
+
+def denoise(image, size=3):
+    '''Removes speckles with a median filter of size by size pixels.'''
+    return image.filter(ImageFilter.MedianFilter(size))
+
+# Stages which can be used in a pipeline, by name
+stageFunctions = {"grayscale": grayscale, "upscale": upscale, "binarise": binarise, "denoise": denoise}
+
+
+
+# ====== Strips ====== #
+
+def find_cuts(image, height, overlap=32, bandHeight=256):
+    '''Plans how to cut a tall image into horizontal strips of at most height
+    rows, cutting between lines of text wherever possible.
+
+    Dark pixels are counted along each row (a projection profile). Each cut is
+    placed in the middle of the widest (then lowest) blank gap in the lower
+    half of the strip. If there is no gap (e.g. a picture across the whole
+    strip), the strip is cut at its lightest row and the next strip starts
+    overlap rows higher, so a line cut through is still read whole in one of
+    the strips.
+
+    The image is read in bands of bandHeight rows, once for the histogram and
+    once for the profile, so only one band is ever held in grayscale.
+
+    Returns:
+        List of (top, bottom) rows for each strip, from the top down
+    '''
+    width, rows = image.size
+    bands = [(y, min(y + bandHeight, rows)) for y in range(0, rows, bandHeight)]
+    histogram = np.zeros(256, dtype=np.int64)
+    for y, bottom in bands:
+        histogram += image.crop((0, y, width, bottom)).convert("L").histogram()
+    threshold = histogram_threshold(histogram)
+    ink = np.zeros(rows, dtype=np.int64)
+    for y, bottom in bands:
+        band = np.asarray(image.crop((0, y, width, bottom)).convert("L"))
+        ink[y:bottom] = (band <= threshold).sum(axis=1)
+    # A few dark pixels in a row are counted as noise
+    blank = ink <= max(1, width // 500)
+    overlap = min(overlap, height // 4)
+
+    strips = []
+    top = 0
+    while rows - top > height:
+        start = top + height // 2
+        window = blank[start:top + height]
+        # Widest run of blank rows in the window
+        bestStart, bestLength, runStart = None, 0, None
+        for i, isBlank in enumerate(np.append(window, False)):
+            if isBlank and runStart is None:
+                runStart = i
+            elif not isBlank and runStart is not None:
+                # Ties go to the lower gap, for fewer, fuller strips
+                if i - runStart >= bestLength:
+                    bestStart, bestLength = runStart, i - runStart
+                runStart = None
+        if bestStart is not None:
+            cut = start + bestStart + bestLength // 2
+            strips.append((top, cut))
+            top = cut
+        else:
+            cut = start + int(np.argmin(ink[start:top + height]))
+            strips.append((top, cut))
+            top = cut - overlap
+    strips.append((top, rows))
+    return strips
+
+
+
+# ====== Pipeline Class ====== #
+
+class Pipeline:
+    '''A list of stages run one after the other on an image in memory.
+
+    Attributes:
+        self.stages: Tuples of (stage name, arguments)
+        self.key: Text describing the stages and their settings, which is the
+            same for any pipeline doing the same thing
+        self.timings: (stage name, seconds) for each stage of the last run
+    '''
+    def __init__(self, *stages):
+        '''Inits the class. Stages are given as names, or as tuples of a name
+        and its arguments, e.g. Pipeline("grayscale", ("upscale", 2)).'''
+        self.stages = []
+        for stage in stages:
+            if isinstance(stage, str):
+                stage = (stage,)
+            if stage[0] not in stageFunctions:
+                raise ValueError("Unknown stage: " + str(stage[0]))
+            self.stages.append((stage[0], tuple(stage[1:])))
+        self.key = ",".join(name + repr(args) for name, args in self.stages)
+        self.timings = []
+
+    def run(self, image, timings=None):
+        '''Runs every stage on the image. The stage timings are added to the
+        timings list if one is given (needed when the same pipeline may be run
+        on several threads at once), otherwise to self.timings.
+
+        Returns:
+            The processed image (the image passed in is not changed)
+        '''
+        if timings is None:
+            timings = self.timings = []
+        for name, args in self.stages:
+            start = time.perf_counter()
+            image = stageFunctions[name](image, *args)
+            timings.append((name, time.perf_counter() - start))
+        return image
+
+
+
+# ====== Retry Pipelines and Variants ====== #
+
+# Used in turn for each retry of an OCR conversion, each cleaning the original
+# image a little harder than the last
+retries = [Pipeline("grayscale", ("upscale", 2)),
+           Pipeline("grayscale", ("upscale", 2), "binarise"),
+           Pipeline("grayscale", ("upscale", 2), "denoise", "binarise"),
+           Pipeline("grayscale", ("upscale", 3), "denoise", "binarise"),
+           Pipeline("grayscale", "denoise", ("upscale", 3), "binarise", ("denoise", 3))]
+
+
+
+# Read at the same time by the "race" OCR strategy, which keeps whichever
+# variant the engine is most confident about
+variants = [("raw", Pipeline()),
+            ("binarised", Pipeline("grayscale", "binarise")),
+            ("upscaled", Pipeline("grayscale", ("upscale", 2), "binarise"))]
+
+
+
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    print("This file cannot be run as main...")
+    input()
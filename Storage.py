@@ -0,0 +1,383 @@
+#   STORAGE PROGRAM    #
+
+# =========================================================================== #
+'''
+Program for keeping every saved document (OCR conversions, summaries and the
+archive copies of images) in one SQLite database instead of loose files in the
+Summaries, OCR_Conversions and OCR_Images folders. Conversions and summaries
+are stored encrypted, with columns describing each document so it can be found
+without reading it. Writes are collected into batches which are each committed
+in one transaction, and the database is kept in WAL mode so that reading never
+waits for a writer in another process. Comments are attempted to be written in
+accordance with PEP 8 Style Guide:
+http://legacy.python.org/dev/peps/pep-0008/#comments
+https://google.github.io/styleguide/pyguide.html
+'''
+# =========================================================================== #
+
+
+
+# ====== Imports (Python Native Modules and My Program Modules) ====== #
+
+from multiprocessing import util
+import Encryption as E
+import threading
+import argparse
+import hashlib
+import sqlite3
+import time
+import sys
+import io
+import os
+import re
+
+
+
+# ====== Variable definitions ====== #
+
+# Default location of the database
+databasePath = "Documents.db"
+
+# Kinds of document stored, and the folders they were kept in as loose files
+folders = {"conversion": "OCR_Conversions", "summary": "Summaries", "image": "OCR_Images"}
+
+# Rows held before they are written, while a batch is open
+batchSize = 64
+
+# Tables and indexes, created when the database is first opened
+schema = ["""CREATE TABLE IF NOT EXISTS documents (
+                 id INTEGER PRIMARY KEY,
+                 kind TEXT NOT NULL,
+                 number INTEGER NOT NULL,
+                 name TEXT NOT NULL,
+                 created REAL NOT NULL,
+                 source_hash TEXT,
+                 text_size INTEGER NOT NULL,
+                 stored_size INTEGER NOT NULL,
+                 data BLOB NOT NULL)""",
+          "CREATE UNIQUE INDEX IF NOT EXISTS documents_name ON documents (kind, name)",
+          "CREATE INDEX IF NOT EXISTS documents_created ON documents (created)",
+          "CREATE INDEX IF NOT EXISTS documents_source_hash ON documents (source_hash)"]
+
+# Every column except the data, in the order documents() returns them
+columns = ["id", "kind", "number", "name", "created", "source_hash", "text_size", "stored_size"]
+
+# Finds the number in a loose file's name, e.g. OCR_#12_01-02-2017.txt
+numberPattern = re.compile("_#([0-9]+)_")
+
+
+
+# ====== Main Document Store Class ====== #
+
+class Document_Store:
+    '''Database of saved documents.
+
+    Documents are added to a list of pending rows. Outside a batch each row is
+    written straight away; inside one (see begin_batch) rows are written
+    batchSize at a time, each lot in a single transaction. Can be used from
+    several threads at once.
+
+    Attributes:
+        self.path: Location of the database
+        self.pending: Rows waiting to be written
+        self.batching: Number of batches open
+    '''
+    def __init__(self, path=databasePath, batchSize=batchSize):
+        '''Inits the class, opening (or creating) the database.'''
+        self.path = path
+        self.batchSize = batchSize
+        self.pending = []
+        self.batching = 0
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # Safe in WAL mode - a crash can only lose the last few commits
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            for statement in schema:
+                self.connection.execute(statement)
+
+    # == Writing Documents == #
+
+    def add(self, kind, number, name, data, textSize=0, sourceHash=None, created=None):
+        '''Adds a document, replacing any of the same kind and name.
+
+        Args:
+            kind: "conversion", "summary" or "image"
+            number: The document's OCR or summary number
+            name: The document's name, e.g. OCR_#12_01-02-2017
+            data: Bytes to store (encrypted, for conversions and summaries)
+            textSize: Number of characters in the text (0 for images)
+            sourceHash: Hash of what the document was made from (see
+                source_hash), or None
+            created: Time the document was made (defaults to now)
+        '''
+        row = (kind, number, name, time.time() if created is None else created, sourceHash, textSize, len(data), data)
+        with self.lock:
+            self.pending.append(row)
+            if self.batching == 0 or len(self.pending) >= self.batchSize:
+                self.flush()
+
+    def add_stream(self, kind, number, name, file, size, textSize=0, sourceHash=None, created=None):
+        '''Adds a document read from an open binary file of size bytes. The
+        bytes are copied into the database a piece at a time, so large
+        documents are never held in memory whole.'''
+        with self.lock, self.connection:
+            self.write_pending()
+            cursor = self.connection.execute(
+                "INSERT OR REPLACE INTO documents (kind, number, name, created, source_hash, text_size, stored_size, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, zeroblob(?))",
+                (kind, number, name, time.time() if created is None else created, sourceHash, textSize, size, size))
+            if hasattr(self.connection, "blobopen"):
+                with self.connection.blobopen("documents", "data", cursor.lastrowid) as blob:
+                    while True:
+                        data = file.read(E.chunkSize)
+                        if not data:
+                            break
+                        blob.write(data)
+            else:
+                # Incremental blob writes need Python 3.11
+                self.connection.execute("UPDATE documents SET data = ? WHERE id = ?", (file.read(), cursor.lastrowid))
+
+    def flush(self):
+        '''Writes every pending row in one transaction.'''
+        with self.lock:
+            if self.pending:
+                with self.connection:
+                    self.write_pending()
+
+    def write_pending(self):
+        '''Inserts the pending rows (the caller commits them).'''
+        rows, self.pending = self.pending, []
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO documents (kind, number, name, created, source_hash, text_size, stored_size, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def begin_batch(self):
+        '''Holds new rows back to be written batchSize at a time.'''
+        with self.lock:
+            self.batching += 1
+
+    def end_batch(self):
+        '''Ends a batch, writing anything still pending.'''
+        with self.lock:
+            self.batching = max(self.batching - 1, 0)
+            self.flush()
+
+    # == Reading Documents == #
+
+    def documents(self, kinds=None, since=None):
+        '''Lists the stored documents, newest first, without their data.
+
+        Args:
+            kinds: Kinds of document to list (defaults to every kind)
+            since: Only list documents made after this time
+
+        Returns:
+            List of dictionaries of each document's columns (see columns)
+        '''
+        query = "SELECT " + ", ".join(columns) + " FROM documents WHERE created > ?"
+        arguments = [since or 0]
+        if kinds is not None:
+            query += " AND kind IN (" + ", ".join("?" for kind in kinds) + ")"
+            arguments += list(kinds)
+        self.flush()
+        with self.lock:
+            rows = self.connection.execute(query + " ORDER BY created DESC, id DESC", arguments).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def document(self, documentId):
+        '''Returns a dictionary of a document's columns (see columns).
+
+        Raises:
+            KeyError: There is no document with this id
+        '''
+        self.flush()
+        with self.lock:
+            row = self.connection.execute("SELECT " + ", ".join(columns) + " FROM documents WHERE id = ?",
+                                          (documentId,)).fetchone()
+        if row is None:
+            raise KeyError(documentId)
+        return dict(zip(columns, row))
+
+    def find_source(self, sourceHash, kind=None):
+        '''Lists the ids of documents made from the source with this hash.'''
+        self.flush()
+        with self.lock:
+            if kind is None:
+                rows = self.connection.execute("SELECT id FROM documents WHERE source_hash = ?", (sourceHash,))
+            else:
+                rows = self.connection.execute("SELECT id FROM documents WHERE source_hash = ? AND kind = ?",
+                                               (sourceHash, kind))
+            return [row[0] for row in rows.fetchall()]
+
+    def find(self, kind, name):
+        '''Returns the id of the document of this kind and name, or None.'''
+        self.flush()
+        with self.lock:
+            row = self.connection.execute("SELECT id FROM documents WHERE kind = ? AND name = ?", (kind, name)).fetchone()
+        return None if row is None else row[0]
+
+    def highest_number(self, kind):
+        '''Returns the highest number of any stored document of this kind,
+        or 0 if there are none.'''
+        self.flush()
+        with self.lock:
+            row = self.connection.execute("SELECT MAX(number) FROM documents WHERE kind = ?", (kind,)).fetchone()
+        return row[0] or 0
+
+    def read(self, documentId):
+        '''Returns the stored bytes of a document.
+
+        Raises:
+            KeyError: There is no document with this id
+        '''
+        self.flush()
+        with self.lock:
+            row = self.connection.execute("SELECT data FROM documents WHERE id = ?", (documentId,)).fetchone()
+        if row is None:
+            raise KeyError(documentId)
+        return row[0]
+
+    def open(self, documentId):
+        '''Opens a document's stored bytes as a read-only file object, which
+        reads from the database as it goes (with Python 3.11 or later).'''
+        if not hasattr(self.connection, "blobopen"):
+            return io.BytesIO(self.read(documentId))
+        self.flush()
+        with self.lock:
+            try:
+                return self.connection.blobopen("documents", "data", documentId, readonly=True)
+            except sqlite3.OperationalError:
+                raise KeyError(documentId)
+
+    def read_text(self, documentId):
+        '''Reads and decrypts a stored conversion or summary.'''
+        return E.decrypt_bytes(self.read(documentId))
+
+    def reader(self, documentId):
+        '''Opens a stored conversion or summary for reading a chunk at a time
+        (see Encryption.Encrypted_Reader).'''
+        return E.Encrypted_Reader(self.open(documentId), ownFile=True)
+
+    # == Removing Documents == #
+
+    def delete_older(self, cutoff):
+        '''Deletes every document made before the cutoff time.
+
+        Returns:
+            Number of documents deleted
+        '''
+        with self.lock, self.connection:
+            self.write_pending()
+            return self.connection.execute("DELETE FROM documents WHERE created < ?", (cutoff,)).rowcount
+
+    def clear(self):
+        '''Deletes every document.'''
+        with self.lock, self.connection:
+            self.pending = []
+            self.connection.execute("DELETE FROM documents")
+
+    def close(self):
+        '''Writes anything pending and closes the database.'''
+        with self.lock:
+            self.flush()
+            self.connection.close()
+
+    # == Importing Loose Files == #
+
+    def import_folders(self, folders=folders):
+        '''Adds the loose files in each kind's folder to the database, in one
+        batch. The files are stored as they are (files in any encrypted format
+        can be read) and are not deleted.
+
+        Returns:
+            Number of files added
+        '''
+        added = 0
+        self.begin_batch()
+        try:
+            for kind, folder in folders.items():
+                if not os.path.isdir(folder):
+                    continue
+                for entry in sorted(os.scandir(folder), key=lambda entry: entry.name):
+                    if not entry.is_file():
+                        continue
+                    match = numberPattern.search(entry.name)
+                    name = entry.name if kind == "image" else os.path.splitext(entry.name)[0]
+                    with open(entry.path, "rb") as f:
+                        data = f.read()
+                    textSize = 0 if kind == "image" else len(E.decrypt_bytes(data))
+                    self.add(kind, int(match.group(1)) if match else 0, name, data, textSize,
+                             created=entry.stat().st_mtime)
+                    added += 1
+        finally:
+            self.end_batch()
+        return added
+
+
+
+# ====== Sub-Routines ====== #
+
+def source_hash(source):
+    '''Hashes the text or bytes a document was made from.
+
+    Returns:
+        String of the SHA-256 hash in hexadecimal
+    '''
+    if isinstance(source, str):
+        source = source.encode("utf-8", "surrogatepass")
+    return hashlib.sha256(source).hexdigest()
+
+openStore = None
+
+def store(path=databasePath):
+    '''Returns the shared document store for this process, opening it the
+    first time (and again in a forked child, which cannot share the parent's
+    connection).'''
+    global openStore
+    if openStore is None or openStore.path != path or openStore.pid != os.getpid():
+        openStore = Document_Store(path)
+        openStore.pid = os.getpid()
+    return openStore
+
+def start_batch(path=databasePath):
+    '''Used by worker processes - holds the process's saves back to be
+    written in batches, with whatever is left written when the process
+    ends.'''
+    documents = store(path)
+    documents.begin_batch()
+    # Run as the worker process exits, which atexit handlers are not
+    util.Finalize(documents, documents.end_batch, exitpriority=10)
+
+
+
+# ====== Command Line ====== #
+
+def main(args):
+    '''Command for importing loose files into the database, or listing what
+    is stored.'''
+    parser = argparse.ArgumentParser(prog="Storage.py", description="Document store tools")
+    parser.add_argument("command", choices=["import", "list"],
+                        help="import the loose files in " + ", ".join(folders.values()) + ", or list the documents")
+    parser.add_argument("--database", default=databasePath, help="location of the database")
+    args = parser.parse_args(args)
+
+    documents = Document_Store(args.database)
+    try:
+        if args.command == "import":
+            print(str(documents.import_folders()) + " files imported into " + args.database)
+        else:
+            for document in documents.documents():
+                print("{:<10} {:<32} {:>10} bytes  {}".format(document["kind"], document["name"], document["stored_size"],
+                                                              time.strftime("%d-%m-%Y %H:%M", time.localtime(document["created"]))))
+    finally:
+        documents.close()
+    return 0
+
+
+
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
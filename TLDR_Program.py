@@ -15,13 +15,46 @@ https://google.github.io/styleguide/pyguide.html
 
 # ====== Imports (Python Native Modules and My Program Modules) ====== #
 
+from collections import Counter
 from operator import itemgetter
+import Normaliser as N
 import Encryption as E
+import IDF_Index as I
+import Allocator as A
+import Storage as D
+import Cache as C
 import Variables as v
+import multiprocessing
+import itertools
+import argparse
+import tempfile
+import difflib
+import heapq
 import time
 import sys
 import os
 
+# NumPy is optional - the vectorised scorer is only used when it is installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Changed whenever scoring changes, so summaries cached by older versions
+# are no longer used
+scorerVersion = "1"
+
+# Summaries already worked out - 256 kept in memory and up to 16 MB on disk
+# (encrypted, like every other saved file)
+cache = C.Two_Tier_Cache(C.LRU_Cache(256), C.Disk_Cache("Summary_Cache", 16 * 1024 * 1024),
+                         E.encrypt_bytes, E.decrypt_bytes)
+
+# Summary_Session only compares changed parts of up to diffLimit sentences on
+# each side with difflib (which cannot be stopped part way) - larger changed
+# parts are replaced whole, which gives the same summary. The session's check
+# function is called every checkEvery sentences while it updates
+diffLimit = 2000
+checkEvery = 256
 
 
 # ====== Main TLDR Class ====== #
@@ -35,15 +68,23 @@ class Summary:
     ranks each word based on occurence and whether it appears in the title.
     Totals the score of sentences based on score of words and then places best
     sentences in order of their placement in the original text.
+
+    Other scorers are subclasses which override rank_words and rank_sentences
+    (see scorers) - form_summary only needs sentenceScore to hold the score of
+    each sentence index.
     '''
+    # Hash of the text summarised, stored with the summary if known
+    sourceHash = None
+
     def __init__(self, title, text, summaryAmount):
         '''Inits the class. Assigns all the object wide variables.'''
+        self.sourceHash = D.source_hash(text)
         self.text = text.lower()
         self.title = title.lower()
         self.summaryAmount = summaryAmount
         self.split_to_sentences()
 
-    def summarise(self):
+    def summarise(self, summaryNumber=None):
         '''Calls each of the residing functions within the class for the summary
         process.
         
@@ -52,7 +93,7 @@ class Summary:
         self.rank_words()
         self.rank_sentences()
         self.form_summary()
-        self.save()
+        self.save(summaryNumber)
         return self.summary
         
     def split_to_sentences(self):
@@ -64,16 +105,8 @@ class Summary:
             self.rawSentences: Sentences containing all their punctuation marks
             self.sentences: The pure alpha-numerical sentences
         '''
-        self.text = " ".join(self.text.splitlines())
-        self.rawSentences = self.text.split(". ") 
-
-        self.sentences = []
-        for sentence in self.rawSentences:
-            for word in sentence:
-                for character in word:
-                    if character not in v.alphabet:
-                        sentence = sentence.replace(character, "")
-            self.sentences.append(sentence)
+        self.rawSentences = N.split_sentences(self.text)
+        self.sentences = N.normalise_many(self.rawSentences)
 
     def rank_words(self):
         '''Ranks words based on occurence in text and whether they appear in the
@@ -89,21 +122,19 @@ class Summary:
             titleWords: Each word in the title
             self.wordScore: Dictionary of words and their corresponding scores
         '''
-        for character in self.title:
-            if character not in v.alphabet:
-                self.title = self.title.replace(character, "")
+        self.title = N.normalise(self.title)
 
-        titleWords = self.title.split(" ")
+        titleWords = N.split_words(self.title)
 
         words = []
         for sentence in self.sentences:
-            words.extend(sentence.split(" "))
+            words.extend(N.split_words(sentence))
 
         self.wordScore = {}
         for word in words:
             if word in self.wordScore.keys():
                 self.wordScore[word] += 1
-            elif word in v.notAcceptedWords:
+            elif word in N.stopWords:
                 continue
             else:
                 self.wordScore[word] = 1
@@ -118,94 +149,877 @@ class Summary:
 
         Adds the score of each word in the sentence that is also in wordScore.
         Any sentences that are less than 6 words long are discounted. Uses the
-        split sentences and wordRank as sources.
+        split sentences and wordRank as sources. Sentences are kept by their
+        position so repeated sentences are scored separately.
 
         Attributes:
-            self.sentenceScore: Dictionary of sentences and their corresponding
-                scores
+            self.sentenceScore: Dictionary of sentence indexes and their
+                corresponding scores
             words: List of words in each sentence
         '''
         self.sentenceScore = {}
-        for sentence in self.sentences:
-            words = sentence.split(" ")
+        for index, sentence in enumerate(self.sentences):
+            words = N.split_words(sentence)
             if len(words) < 6:
                 continue
             for word in words:
                 if word in self.wordScore.keys():
-                    if sentence not in self.sentenceScore:
-                        self.sentenceScore[sentence] = self.wordScore[word]
+                    if index not in self.sentenceScore:
+                        self.sentenceScore[index] = self.wordScore[word]
                     else:
-                        self.sentenceScore[sentence] += self.wordScore[word]
+                        self.sentenceScore[index] += self.wordScore[word]
 
     def form_summary(self):
         '''Forms a summary from the ranked sentences of the length specified
         by summaryLength.
         
-        Sorts the ranked sentences from highest to lowest scoring (values) with
-        the native python worting function. Identifies the sentences in the
-        original text and retrieves their indexes and prints the corresponding
-        sentences from the original text (to get original formatting and
-        all characters in original sentence).
+        Selects the highest scoring sentences with a heap, which only keeps
+        summaryAmount of them at a time (sentences with equal scores are taken
+        in the order they appear). As sentenceScore is keyed by position, the
+        winners are put back in order of the original text straight away and
+        the corresponding sentences are taken from the original text (to get
+        original formatting and all characters in original sentence).
         
         Attributes:
-            orderedSentences: Scored sentences ordered by their scores
-            finalSentences: The X number of higest ranked sentences
-            sentenceIndex: Top ranked sentences and their indexes in the 
-                original text
-            sortedFinalSentences: Top ranked sentences ordered by their index
+            finalSentences: The X number of higest ranked (index, score) pairs
+            sentenceIndexes: Indexes of the top ranked sentences in order
             self.summary: Final summary output
         '''
-        orderedSentences = sorted(self.sentenceScore.items(), key=itemgetter(1), reverse=True)
-        orderedSentences = [i[0] for i in orderedSentences]
-        finalSentences = orderedSentences[:int(self.summaryAmount)]
-                 
-        sentenceIndex = {}
-        for sentence in finalSentences:
-            sentenceIndex[sentence] = int(self.sentences.index(sentence))
-
-        sortedFinalSentences = sorted(sentenceIndex.items(), key=itemgetter(1), reverse=False)
-        sentenceIndexes = [i[1] for i in sortedFinalSentences]
+        finalSentences = heapq.nlargest(int(self.summaryAmount), self.sentenceScore.items(), key=itemgetter(1))
+        sentenceIndexes = sorted(i[0] for i in finalSentences)
         
         self.summary = [self.rawSentences[i] for i in sentenceIndexes]
         self.summary = [i.capitalize() for i in self.summary]
         self.summary = (". ".join(self.summary)+".")
 
-    def save(self):
-        '''Saves the summarised texts to the Summaries folder.
-
-        Encodes saved files in UTF-8 Format - non-UTF-8 characters cannot be
-        saved.
+    def save(self, summaryNumber=None):
+        '''Saves the encrypted summary to the document store.
         
+        Args:
+            summaryNumber: Number already reserved for this summary (by
+                summarise_many). If None, the next number is taken from the
+                allocator.
+
         Attributes:
-            summaryNumber: The number of previous summaries + 1
-            completeName: File name in the format of Summary_#_date.txt
+            completeName: Name in the format of Summary_#_date
 
         Raises:
-            Exception: Any errors flagged and printed
+            Exception: Any errors flagged and printed, then raised again if
+                summaryNumber was given, so that batches report the failure
         '''
+        reserved = summaryNumber is not None
         try:
-            summaryNumber = str(v.settings["noOfSummaries"])
-            completeName = ("Summary_#" + summaryNumber + "_" + v.date + ".txt")
-            with open(os.path.join('Summaries', completeName), "w", encoding="utf-8") as file:
-                file.write(E.encrypt(self.summary))
-            v.settings["noOfSummaries"] += 1
-            v.save()
+            if not reserved:
+                summaryNumber = A.take("noOfSummaries")
+            completeName = ("Summary_#" + str(summaryNumber) + "_" + v.date)
+            D.store().add("summary", summaryNumber, completeName, E.encrypt_bytes(self.summary),
+                          len(self.summary), self.sourceHash)
         except Exception as e:
             print(e)
+            if reserved:
+                raise
+
+
+
+class Vector_Summary(Summary):
+    '''Summary which ranks words and sentences using NumPy array operations.
+
+    Gives every distinct word a vocabulary id and builds a sparse sentence by
+    term count matrix once (stored as rows, terms and counts arrays). Word
+    scores, title boosts and sentence totals are then worked out over whole
+    arrays rather than word by word. Gives exactly the same wordScore and
+    sentenceScore as Summary, so form_summary and save are shared.
+    '''
+    def rank_words(self):
+        '''Ranks words based on occurence in text and whether they appear in the
+        title.
+
+        Same scoring as Summary.rank_words: 1 point for each occurence, none
+        for v.notAcceptedWords and 3 for each time the word is in the title.
+
+        Attributes:
+            words: Each word in the text, in order
+            self.lengths: Array of the number of words in each sentence
+            self.rows: Sentence index of each non-zero entry in the matrix
+            self.terms: Vocabulary id of each non-zero entry in the matrix
+            self.counts: Times the term appears in that sentence
+            self.scores: Array of word scores indexed by vocabulary id
+            self.wordScore: Dictionary of words and their corresponding scores
+        '''
+        self.title = N.normalise(self.title)
+
+        # Joining with spaces and splitting again gives the same words as
+        # splitting each sentence on its own
+        words = " ".join(self.sentences).split(" ")
+        vocabulary = {word: i for i, word in enumerate(dict.fromkeys(words))}
+        ids = np.fromiter(map(vocabulary.__getitem__, words), dtype=np.int64, count=len(words))
+        self.lengths = np.fromiter((sentence.count(" ") + 1 for sentence in self.sentences),
+                                   dtype=np.int64, count=len(self.sentences))
+        sentenceIds = np.repeat(np.arange(len(self.sentences)), self.lengths)
+
+        # Collapses repeated (sentence, term) pairs into the sparse matrix
+        cells, self.counts = np.unique(sentenceIds * len(vocabulary) + ids, return_counts=True)
+        self.rows, self.terms = np.divmod(cells, len(vocabulary))
+
+        self.scores = np.bincount(ids, minlength=len(vocabulary))
+        for word in N.stopWords:
+            if word in vocabulary:
+                self.scores[vocabulary[word]] = 0
+        for word in N.split_words(self.title):
+            if word in vocabulary and self.scores[vocabulary[word]] > 0:
+                self.scores[vocabulary[word]] += 3
+
+        names = list(vocabulary)
+        accepted = np.flatnonzero(self.scores)
+        self.wordScore = {names[i]: score for i, score in zip(accepted.tolist(), self.scores[accepted].tolist())}
+
+    def rank_sentences(self):
+        '''Ranks sentences based on the sum of the score of the words in the
+        sentence.
+
+        Multiplies the matrix by the word scores to total every sentence at
+        once. Sentences under 6 words long, or with no scoring words, are
+        discounted as in Summary.rank_sentences.
+
+        Attributes:
+            totals: Array of the score of each sentence
+            ranked: Indexes of the sentences which are given a score
+            self.sentenceScore: Dictionary of sentence indexes and their
+                corresponding scores
+        '''
+        totals = np.bincount(self.rows, weights=self.counts * self.scores[self.terms],
+                             minlength=len(self.sentences)).astype(np.int64)
+        ranked = np.flatnonzero((self.lengths >= 6) & (totals > 0))
+
+        self.sentenceScore = dict(zip(ranked.tolist(), totals[ranked].tolist()))
+
+
+
+class TFIDF_Summary(Summary):
+    '''Summary which weights each word by how rare it is across all stored
+    documents (TF-IDF).
+
+    A word's score is the number of times it appears in the text, multiplied
+    by its inverse document frequency from the corpus index (IDF_Index). Words
+    common to most documents get little weight, so no list of words to ignore
+    is needed. Title words get 3 extra occurences, as in Summary.
+    '''
+    def __init__(self, title, text, summaryAmount, index):
+        '''Inits the class. Assigns all the object wide variables.
+
+        Args:
+            index: Open IDF_Index to look up word weights in
+        '''
+        self.index = index
+        Summary.__init__(self, title, text, summaryAmount)
+
+    def rank_words(self):
+        '''Ranks words based on occurence in text, whether they appear in the
+        title and how rare they are in the corpus.
+
+        Attributes:
+            counts: Number of times each word appears in the text
+            weights: Inverse document frequency of each word
+            self.wordScore: Dictionary of words and their corresponding scores
+        '''
+        self.title = N.normalise(self.title)
+        counts = Counter()
+        for sentence in self.sentences:
+            counts.update(N.split_words(sentence))
+        del counts[""]
+
+        weights = {word: self.index.idf(word) for word in counts}
+        self.wordScore = {word: count * weights[word] for word, count in counts.items()}
+        for word in N.split_words(self.title):
+            if word in self.wordScore:
+                self.wordScore[word] += 3 * weights[word]
+
+
+
+class TextRank_Summary(Summary):
+    '''Summary which ranks sentences by how similar they are to the rest of
+    the text (TextRank), instead of by word scores.
+
+    Sentences are joined in a graph, weighted by the number of words they
+    share (as in the TextRank paper). Pairs are only found through an index of
+    which sentences each word appears in, never by comparing every sentence
+    with every other. Words shared by many sentences would make too many
+    pairs, so words are added rarest first until maxPairs is reached. Scores
+    come from power iteration (as in PageRank), which stops once the scores
+    change by less than tolerance, or after maxIterations or timeBudget
+    seconds. Sentences containing title words are favoured when the random
+    surfer jumps. Needs NumPy.
+    '''
+    damping = 0.85
+    tolerance = 1e-6
+    maxIterations = 100
+    maxPairs = 2000000
+    timeBudget = 2.0
+
+    def __init__(self, title, text, summaryAmount):
+        '''Inits the class. Assigns all the object wide variables.
+
+        Raises:
+            ImportError: NumPy is not installed
+        '''
+        if np is None:
+            raise ImportError("The TextRank scorer needs NumPy")
+        Summary.__init__(self, title, text, summaryAmount)
+
+    def rank_words(self):
+        '''Builds the sentence graph from an index of words to sentences.
+
+        Attributes:
+            self.lengths: Array of the number of words in each sentence
+            rows, terms: Each (sentence, word) pair in the text, once
+            postings: Sentences of each word, grouped by word
+            self.source, self.target, self.weight: The graph's edges
+            self.teleport: Chance of the random surfer jumping to each sentence
+        '''
+        self.title = N.normalise(self.title)
+        n = len(self.sentences)
+        words = " ".join(self.sentences).split(" ")
+        vocabulary = {word: i for i, word in enumerate(dict.fromkeys(words))}
+        ids = np.fromiter(map(vocabulary.__getitem__, words), dtype=np.int64, count=len(words))
+        self.lengths = np.fromiter((sentence.count(" ") + 1 for sentence in self.sentences),
+                                   dtype=np.int64, count=n)
+        sentenceIds = np.repeat(np.arange(n), self.lengths)
+
+        # Stop words and empty words do not join sentences together
+        ignored = np.zeros(len(vocabulary), dtype=bool)
+        for word in list(N.stopWords) + [""]:
+            if word in vocabulary:
+                ignored[vocabulary[word]] = True
+        keep = ~ignored[ids]
+        cells = np.unique(ids[keep] * n + sentenceIds[keep])
+        terms, rows = np.divmod(cells, n)
+
+        # Sentences containing title words are more likely to be jumped to
+        titleTerms = np.zeros(len(vocabulary), dtype=bool)
+        for word in N.split_words(self.title):
+            if word in vocabulary:
+                titleTerms[vocabulary[word]] = True
+        self.teleport = 1 + np.bincount(rows, weights=titleTerms[terms], minlength=n)
+        self.teleport /= self.teleport.sum()
+
+        # Adds words, rarest first, until the number of pairs is used up
+        frequency = np.bincount(terms, minlength=len(vocabulary))
+        pairs = frequency * (frequency - 1) // 2
+        order = np.argsort(frequency, kind="stable")
+        allowed = np.zeros(len(vocabulary), dtype=bool)
+        allowed[order[np.cumsum(pairs[order]) <= self.maxPairs]] = True
+        allowed &= frequency > 1
+        postings = rows[allowed[terms]]
+        counts = frequency[np.flatnonzero(allowed)]
+
+        # Pairs every sentence with the sentences after it in the same word's
+        # postings: position x is paired with x+1 up to the end of its group
+        ends = np.repeat(np.cumsum(counts), counts)
+        following = ends - np.arange(len(postings)) - 1
+        first = np.repeat(np.arange(len(postings)), following)
+        offsets = np.arange(len(first)) - np.repeat(np.cumsum(following) - following, following)
+        second = first + 1 + offsets
+        shared, common = np.unique(postings[first] * n + postings[second], return_counts=True)
+        a, b = np.divmod(shared, n)
+
+        weight = common / (np.log1p(self.lengths[a]) + np.log1p(self.lengths[b]))
+        self.source = np.concatenate([a, b])
+        self.target = np.concatenate([b, a])
+        self.weight = np.concatenate([weight, weight])
+
+    def rank_sentences(self):
+        '''Scores sentences by power iteration over the sentence graph.
+
+        Sentences less than 6 words long are discounted, as in
+        Summary.rank_sentences.
+
+        Attributes:
+            self.iterations: Number of iterations run
+            self.sentenceScore: Dictionary of sentence indexes and their
+                corresponding scores
+        '''
+        n = len(self.sentences)
+        outWeight = np.bincount(self.source, weights=self.weight, minlength=n)
+        share = self.weight / outWeight[self.source]
+        dangling = outWeight == 0
+        scores = np.full(n, 1.0 / n)
+        deadline = time.perf_counter() + self.timeBudget
+
+        self.iterations = 0
+        while self.iterations < self.maxIterations:
+            self.iterations += 1
+            # Sentences with no edges share their score with every sentence
+            spread = (np.bincount(self.target, weights=share * scores[self.source], minlength=n)
+                      + scores[dangling].sum() / n)
+            updated = (1 - self.damping) * self.teleport + self.damping * spread
+            change = np.abs(updated - scores).sum()
+            scores = updated
+            if change < self.tolerance or time.perf_counter() > deadline:
+                break
+
+        ranked = np.flatnonzero(self.lengths >= 6)
+        self.sentenceScore = dict(zip(ranked.tolist(), scores[ranked].tolist()))
+
+
+
+# ====== Streaming TLDR Class ====== #
+
+class Stream_Summary(Summary):
+    '''Summary which reads its text in chunks instead of holding all of it.
+
+    Makes two passes over the text. The first counts the words and the second
+    scores each sentence, keeping only the best summaryAmount of them in a
+    heap. Memory used depends on the number of different words and the
+    summary length instead of the length of the document.
+    '''
+    def __init__(self, title, source, summaryAmount, chunkSize=65536):
+        '''Inits the class. Assigns all the object wide variables.
+
+        Args:
+            source: A file object opened in text mode, or any iterable of
+                strings
+            chunkSize: Number of characters read from a file object at a time
+        '''
+        self.title = title.lower()
+        self.source = source
+        self.summaryAmount = summaryAmount
+        self.chunkSize = chunkSize
+        self.spool = None
+        self.start = None
+        # Seekable files are re-read for the second pass, anything else is
+        # copied to a temporary file while the first pass reads it
+        if hasattr(source, "seekable") and source.seekable():
+            self.start = source.tell()
+
+    def summarise(self, summaryNumber=None):
+        '''Calls each of the residing functions within the class for the summary
+        process.
+
+        Returns:
+            String containing the final summary.'''
+        try:
+            self.rank_words()
+            self.rank_sentences()
+        finally:
+            if self.spool is not None:
+                self.spool.close()
+        self.form_summary()
+        self.save(summaryNumber)
+        return self.summary
+
+    def read_chunks(self, spool=None):
+        '''Yields the source text a chunk at a time, copying each chunk to
+        spool if one is given.
+
+        Raises:
+            TypeError: If the source gives bytes rather than text.
+        '''
+        if hasattr(self.source, "read"):
+            # Stops at any empty read, so b"" cannot loop forever
+            chunks = iter(lambda: self.source.read(self.chunkSize) or None, None)
+        else:
+            chunks = iter(self.source)
+        for chunk in chunks:
+            if not isinstance(chunk, str):
+                raise TypeError("Stream_Summary needs text, not " + type(chunk).__name__ +
+                                " (open the file in text mode)")
+            if spool is not None:
+                spool.write(chunk)
+            yield chunk
+
+    def stream_sentences(self, chunks):
+        '''Splits a stream of text chunks into sentences.
+
+        Gives the same sentences as Summary.split_to_sentences would for the
+        whole text. A line break at the end of a chunk is held back until the
+        next one, as only the final line break in the text is dropped rather
+        than turned into a space.
+
+        Yields:
+            Lower case sentences containing their punctuation marks
+        '''
+        carry = ""
+        held = ""
+        for chunk in chunks:
+            chunk = held + chunk.lower()
+            held = ""
+            if chunk.endswith("\r\n"):
+                chunk, held = chunk[:-2], "\r\n"
+            elif chunk and N.lineBreaks.match(chunk[-1]):
+                chunk, held = chunk[:-1], chunk[-1]
+            pieces = (carry + N.lineBreaks.sub(" ", chunk)).split(". ")
+            carry = pieces.pop()
+            yield from pieces
+        yield carry
+
+    def rank_words(self):
+        '''First pass - ranks words based on occurence in text and whether they
+        appear in the title, as in Summary.rank_words.
+
+        Attributes:
+            self.wordScore: Dictionary of words and their corresponding scores
+        '''
+        self.title = N.normalise(self.title)
+        if self.start is None:
+            self.spool = tempfile.TemporaryFile("w+", encoding="utf-8")
+
+        self.wordScore = {}
+        for sentence in self.stream_sentences(self.read_chunks(self.spool)):
+            for word in N.split_words(N.normalise(sentence)):
+                if word in self.wordScore:
+                    self.wordScore[word] += 1
+                elif word not in N.stopWords:
+                    self.wordScore[word] = 1
+
+        for word in N.split_words(self.title):
+            if word in self.wordScore:
+                self.wordScore[word] += 3
+
+    def rank_sentences(self):
+        '''Second pass - scores each sentence and keeps the highest scoring ones.
+
+        Sentences are scored as in Summary.rank_sentences. The heap holds at
+        most summaryAmount sentences, with the lowest score (or latest sentence
+        of those with the lowest score) on top so it is the one replaced.
+
+        Attributes:
+            self.heap: The best sentences as (score, -index, index, sentence)
+        '''
+        if self.spool is not None:
+            self.spool.seek(0)
+            self.source = self.spool
+        else:
+            self.source.seek(self.start)
+
+        amount = int(self.summaryAmount)
+        self.heap = []
+        for index, rawSentence in enumerate(self.stream_sentences(self.read_chunks())):
+            words = N.split_words(N.normalise(rawSentence))
+            if len(words) < 6:
+                continue
+            score = sum(self.wordScore.get(word, 0) for word in words)
+            if score == 0 or amount <= 0:
+                continue
+            entry = (score, -index, index, rawSentence)
+            if len(self.heap) < amount:
+                heapq.heappush(self.heap, entry)
+            elif entry > self.heap[0]:
+                heapq.heapreplace(self.heap, entry)
+
+    def form_summary(self):
+        '''Forms a summary from the sentences left in the heap, placed in the
+        order they appeared in the text.
+
+        Attributes:
+            self.summary: Final summary output
+        '''
+        self.summary = [entry[3].capitalize() for entry in sorted(self.heap, key=itemgetter(2))]
+        self.summary = (". ".join(self.summary)+".")
+
+
+
+# ====== Incremental TLDR Class ====== #
+
+class Summary_Session(Summary):
+    '''Summary which is kept between edits of the same text.
+
+    Keeps the word counts, an index of which sentences each word is in (and how
+    many times) and the score of every sentence. When the text changes, the
+    old and new sentence lists are compared and only the sentences that were
+    added or removed change the word counts. Sentences containing a word whose
+    score changed have the difference added to their score, so they are not
+    totalled again. Gives the same summary as Summary would for the whole
+    text.
+    '''
+    def __init__(self, title, summaryAmount):
+        '''Inits the class with no text. Assigns all the object wide
+        variables.'''
+        self.summaryAmount = summaryAmount
+        self.rawSentences = []
+        self.sentences = []
+        self.ids = []
+        self.nextId = itertools.count()
+        self.sentenceWords = {}
+        self.wordCount = Counter()
+        self.wordIndex = {}
+        self.wordScore = {}
+        self.totals = {}
+        self.titleWords = Counter()
+        self.set_title(title)
+
+    def summarise(self, text, summaryNumber=None, progress=None, check=None, save=True):
+        '''Brings the session up to date with the text and forms the summary.
+
+        Args:
+            progress: Function called with a message as each stage starts, or
+                None. It may raise an exception to stop the summary (the
+                session should then be thrown away, as it may be part-updated)
+            check: Function called now and then while the session updates,
+                which may raise an exception to stop it in the same way, or
+                None
+            save: False to leave saving the summary to the caller
+
+        Returns:
+            String containing the final summary.'''
+        progress = progress or (lambda message: None)
+        progress("Update changed sentences")
+        self.sourceHash = D.source_hash(text)
+        self.update(text, check)
+        progress("Score sentences")
+        self.sentenceScore = {i: self.totals[sentenceId] for i, sentenceId in enumerate(self.ids)
+                              if self.totals.get(sentenceId, 0) > 0}
+        progress("Form summary")
+        self.form_summary()
+        if save:
+            progress("Save")
+            self.save(summaryNumber)
+        return self.summary
+
+    def set_title(self, title):
+        '''Changes the title, re-scoring only words which were added to or
+        removed from the title.'''
+        titleWords = Counter(N.split_words(N.normalise(title.lower())))
+        changed = {word for word in titleWords | self.titleWords if titleWords[word] != self.titleWords[word]}
+        self.titleWords = titleWords
+        self.rescore(changed, set())
+
+    def update(self, text, check=None):
+        '''Updates the word counts and sentence scores for the new text.
+
+        Sentences matching at the start and end of the old and new text are
+        skipped straight away and difflib compares what is left (unless
+        either side is over diffLimit sentences, when it is all replaced).
+        check, if given, is called every checkEvery sentences.
+
+        Attributes:
+            changed: Words whose count changed
+            added: Ids of the new sentences
+        '''
+        check = check or (lambda: None)
+        rawSentences = N.split_sentences(text.lower())
+        old = self.rawSentences
+        start = 0
+        while start < len(old) and start < len(rawSentences) and old[start] == rawSentences[start]:
+            start += 1
+        oldEnd, newEnd = len(old), len(rawSentences)
+        while oldEnd > start and newEnd > start and old[oldEnd - 1] == rawSentences[newEnd - 1]:
+            oldEnd -= 1
+            newEnd -= 1
+
+        changed = set()
+        added = set()
+        ids = []
+        check()
+        if max(oldEnd, newEnd) - start > diffLimit:
+            opcodes = [("replace", 0, oldEnd - start, 0, newEnd - start)]
+        else:
+            matcher = difflib.SequenceMatcher(None, old[start:oldEnd], rawSentences[start:newEnd], autojunk=False)
+            opcodes = matcher.get_opcodes()
+        done = 0
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == "equal":
+                ids.extend(self.ids[start + i1:start + i2])
+                continue
+            for sentenceId in self.ids[start + i1:start + i2]:
+                self.remove_sentence(sentenceId, changed)
+                done += 1
+                if done % checkEvery == 0:
+                    check()
+            for rawSentence in rawSentences[start + j1:start + j2]:
+                sentenceId = self.add_sentence(N.normalise(rawSentence), changed)
+                added.add(sentenceId)
+                ids.append(sentenceId)
+                done += 1
+                if done % checkEvery == 0:
+                    check()
+        check()
+
+        self.ids = self.ids[:start] + ids + self.ids[oldEnd:]
+        self.rawSentences = rawSentences
+        self.sentences = [self.sentenceWords[sentenceId][0] for sentenceId in self.ids]
+        self.rescore(changed, added, check)
+
+    def add_sentence(self, sentence, changed):
+        '''Counts the words of a new sentence.
+
+        Returns:
+            The id given to the sentence
+        '''
+        sentenceId = next(self.nextId)
+        words = N.split_words(sentence)
+        self.sentenceWords[sentenceId] = (sentence, words)
+        for word, count in Counter(words).items():
+            self.wordCount[word] += count
+            self.wordIndex.setdefault(word, {})[sentenceId] = count
+            changed.add(word)
+        return sentenceId
+
+    def remove_sentence(self, sentenceId, changed):
+        '''Takes the words of a removed sentence out of the counts.'''
+        sentence, words = self.sentenceWords.pop(sentenceId)
+        for word, count in Counter(words).items():
+            self.wordCount[word] -= count
+            del self.wordIndex[word][sentenceId]
+            if self.wordCount[word] == 0:
+                del self.wordCount[word]
+                del self.wordIndex[word]
+            changed.add(word)
+        self.totals.pop(sentenceId, None)
+
+    def rescore(self, changed, added, check=None):
+        '''Brings word and sentence scores up to date, as given by
+        Summary.rank_words and Summary.rank_sentences.
+
+        Each changed word's score difference is added to the sentences it
+        appears in, once for each time it appears. New sentences are totalled
+        afterwards. Sentences under 6 words long are never scored. check, if
+        given, is called every checkEvery words and sentences.
+        '''
+        check = check or (lambda: None)
+        for done, word in enumerate(changed, 1):
+            if done % checkEvery == 0:
+                check()
+            score = 0
+            if word in self.wordCount and word not in N.stopWords:
+                score = self.wordCount[word] + 3 * self.titleWords[word]
+            difference = score - self.wordScore.pop(word, 0)
+            if score:
+                self.wordScore[word] = score
+            if difference:
+                for sentenceId, count in self.wordIndex.get(word, {}).items():
+                    if sentenceId in self.totals and sentenceId not in added:
+                        self.totals[sentenceId] += count * difference
+
+        for done, sentenceId in enumerate(added, 1):
+            if done % checkEvery == 0:
+                check()
+            words = self.sentenceWords[sentenceId][1]
+            if len(words) >= 6:
+                self.totals[sentenceId] = sum(self.wordScore.get(word, 0) for word in words)
 
 
 
 # ====== Main Sub-Routine ====== #
 
-def summarise(title, text, summaryAmount):
-    S = Summary(title, text, summaryAmount)
+def frequency_summary(title, text, summaryAmount):
+    '''Creates a word count Summary, vectorised when NumPy is installed.'''
+    if np is not None:
+        return Vector_Summary(title, text, summaryAmount)
+    return Summary(title, text, summaryAmount)
+
+def tfidf_summary(title, text, summaryAmount):
+    '''Creates a TF-IDF Summary using this process's copy of the IDF index.'''
+    return TFIDF_Summary(title, text, summaryAmount, I.open_index())
+
+# Scorers which can be chosen by name. Each creates a Summary whose
+# rank_words and rank_sentences fill sentenceScore with the score of each
+# sentence index - form_summary and save are shared by all of them.
+scorers = {"frequency": frequency_summary,
+           "tfidf": tfidf_summary,
+           "textrank": TextRank_Summary}
+
+def new_summary(title, text, summaryAmount, scorer="frequency"):
+    '''Creates a Summary with the chosen scorer.
+
+    Args:
+        scorer: Name of a scorer in scorers - "frequency" (word counts),
+            "tfidf" (word counts weighted by the corpus IDF index) or
+            "textrank" (sentence similarity graph)
+
+    Raises:
+        ValueError: The scorer is not known
+        FileNotFoundError: "tfidf" was chosen before the IDF index was built
+        ImportError: "textrank" was chosen without NumPy installed
+    '''
+    if scorer not in scorers:
+        raise ValueError("Unknown scorer: " + str(scorer))
+    return scorers[scorer](title, text, summaryAmount)
+
+def cache_key(title, text, summaryAmount, scorer="frequency"):
+    '''Key for a summary in the cache. The text is normalised the same way as
+    in Summary, so texts which would give the same summary share a key. TF-IDF
+    summaries also depend on how many documents are in the index.'''
+    text = " ".join(text.lower().splitlines())
+    title = N.normalise(title.lower())
+    if scorer == "tfidf":
+        scorer += str(I.open_index().documents)
+    return C.make_key(scorerVersion, scorer, title, str(int(summaryAmount)), text)
+
+def summarise(title, text, summaryAmount, scorer="frequency", useCache=True):
+    '''Main refferal sub-routine for TLDR program.
+
+    Returns the cached summary, without scoring or saving again, if the same
+    text has already been summarised with the same title, amount and scorer.'''
+    if not useCache:
+        return new_summary(title, text, summaryAmount, scorer).summarise()
+    key = cache_key(title, text, summaryAmount, scorer)
+    summary = cache.get(key)
+    if summary is None:
+        summary = new_summary(title, text, summaryAmount, scorer).summarise()
+        cache.put(key, summary)
+    return summary
+
+def summarise_stream(title, source, summaryAmount):
+    '''Referral sub-routine for summarising a file object or iterable of text
+    chunks without loading all of it into memory.'''
+    S = Stream_Summary(title, source, summaryAmount)
     return S.summarise()
 
 
 
+# ====== Batch Sub-Routines ====== #
+
+def start_worker(settings):
+    '''Runs once in each batch worker process. Copies the parent's settings
+    across (needed when processes are spawned rather than forked). The word
+    tables are built once, when the worker imports Normaliser. The worker's
+    summaries are held back and written a chunk at a time (see
+    summarise_chunk).'''
+    v.settings = settings
+    D.start_batch()
+
+def summarise_job(job):
+    '''Summarises one batch document inside a worker process.
+
+    Args:
+        job: Tuple of (source, summaryNumber, title, text, summaryAmount,
+            scorer).
+            If text is None, source is the id of a stored document or the
+            path of an encrypted file (such as an OCR conversion), which is
+            read and decrypted here.
+
+    Returns:
+        Tuple of (source, summaryNumber, summary, error) - error is None if
+        the document was summarised and saved, otherwise the error message.
+    '''
+    source, summaryNumber, title, text, summaryAmount, scorer = job
+    try:
+        if text is None:
+            text = D.store().read_text(source) if isinstance(source, int) else E.read_file(source)
+        summary = new_summary(title, text, summaryAmount, scorer).summarise(summaryNumber)
+        return (source, summaryNumber, summary, None)
+    except Exception as e:
+        return (source, summaryNumber, None, str(e))
+
+def summarise_chunk(jobs):
+    '''Summarises a chunk of batch documents inside a worker process, then
+    writes their summaries to the document store in one transaction.
+
+    Results are only sent back once written, so a document reported as done
+    is saved. If the write fails, every document in the chunk is reported
+    as failed.
+
+    Returns:
+        List of (source, summaryNumber, summary, error) for each job (see
+        summarise_job)
+    '''
+    results = [summarise_job(job) for job in jobs]
+    try:
+        D.store().flush()
+    except Exception as e:
+        results = [(source, summaryNumber, None, error or "not saved: " + str(e))
+                   for source, summaryNumber, summary, error in results]
+    return results
+
+def summarise_many(documents, summaryAmount, title="", workers=None, chunkSize=1, scorer="frequency"):
+    '''Summarises many documents at once across a pool of worker processes.
+
+    A block of summary numbers is reserved up front (see Allocator.reserve)
+    so workers can save without taking numbers themselves. Reading,
+    decrypting, summarising and saving all happen in the workers.
+
+    Args:
+        documents: Path of a folder (e.g. OCR_Conversions) of encrypted files,
+            or a list of stored document ids, file paths and/or (title, text)
+            tuples
+        summaryAmount: Number of sentences in each summary
+        title: Title used for documents read from files
+        workers: Number of worker processes (defaults to the number of CPUs)
+        chunkSize: Number of documents sent to a worker at a time, whose
+            summaries are saved in one transaction (at most D.batchSize)
+        scorer: Scorer used for every document (see new_summary)
+
+    Yields:
+        Tuples of (source, summaryNumber, summary, error) as each document
+        finishes, in no particular order. For (title, text) documents, source
+        is the document's position in the list.
+    '''
+    if isinstance(documents, str):
+        documents = [os.path.join(documents, f) for f in sorted(os.listdir(documents))
+                     if os.path.isfile(os.path.join(documents, f))]
+
+    documents = list(documents)
+    if not documents:
+        return
+    firstNumber = A.reserve("noOfSummaries", len(documents))
+    jobs = []
+    for i, document in enumerate(documents):
+        if isinstance(document, (str, int)):
+            jobs.append((document, firstNumber + i, title, None, summaryAmount, scorer))
+        else:
+            jobs.append((i, firstNumber + i, document[0], document[1], summaryAmount, scorer))
+
+    # Kept within one batch, so a chunk is only written when it is finished
+    chunkSize = max(1, min(chunkSize, D.batchSize))
+    chunks = [jobs[i:i + chunkSize] for i in range(0, len(jobs), chunkSize)]
+    with multiprocessing.Pool(workers, initializer=start_worker, initargs=(v.settings,)) as pool:
+        try:
+            for results in pool.imap_unordered(summarise_chunk, chunks):
+                yield from results
+        except GeneratorExit:
+            # Stopped early - the chunks already handed out are still
+            # finished and saved (their numbers are reserved), rather than
+            # the workers being terminated part way through
+            pool.close()
+            pool.join()
+            raise
+        pool.close()
+        pool.join()
+
+def batch_main(args):
+    '''Headless command for summarising a folder or list of files.'''
+    parser = argparse.ArgumentParser(prog="TLDR_Program.py", description="Summarise many encrypted documents at once")
+    parser.add_argument("documents", nargs="*", help="a folder or a list of encrypted files")
+    parser.add_argument("--stored", action="store_true", help="summarise every OCR conversion in the document store")
+    parser.add_argument("-n", "--sentences", type=int, default=5, help="sentences in each summary")
+    parser.add_argument("-t", "--title", default="", help="title used for every document")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("-c", "--chunk-size", type=int, default=1, help="documents sent to a worker at a time")
+    parser.add_argument("-s", "--scorer", default="frequency", choices=sorted(scorers), help="sentence scorer")
+    args = parser.parse_args(args)
+
+    documents = args.documents
+    if len(documents) == 1 and os.path.isdir(documents[0]):
+        documents = documents[0]
+    if args.stored:
+        documents = [document["id"] for document in D.store().documents(["conversion"])]
+    elif not documents:
+        parser.error("give a folder or files to summarise, or --stored")
+    try:
+        v.load()
+    except Exception:
+        pass
+
+    start = time.time()
+    done = 0
+    for source, summaryNumber, summary, error in summarise_many(documents, args.sentences, args.title,
+                                                                args.workers, args.chunk_size, args.scorer):
+        if error is None:
+            done += 1
+            print("Summary_#" + str(summaryNumber) + " <- " + str(source))
+        else:
+            print("FAILED " + str(source) + ": " + error)
+    print(str(done) + " documents summarised in " + str(round(time.time() - start, 2)) + " seconds")
+
+
+
 # ====== Python Boiler Plate ====== #
 
 if __name__ == "__main__":
+    # Arguments given - run as a headless batch command
+    if len(sys.argv) > 1:
+        batch_main(sys.argv[1:])
+        sys.exit()
     try:
         title = input("ENTER A TITLE FOR THE TEXT: ")
         text = input("ENTER SOME TEXT TO BE SUMMARISED: ")
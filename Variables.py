@@ -38,10 +38,84 @@ notAcceptedWords = ["the", "of", "to", "and", "a", "in", "is", "it", "you",
                     "had", "by", "while", "where", "after", "so", "though",
                     "since", "until", "do", "there"]
 
+# Frequently used English words, which (with notAcceptedWords and any
+# dictionary files below) make up the words an OCR conversion is checked
+# against. Must be lower case. Words may be added.
+commonWords = ["not", "but", "what", "all", "were", "we", "when", "your", "can",
+               "said", "an", "each", "which", "she", "how", "their", "if",
+               "will", "up", "other", "about", "out", "many", "then", "them",
+               "these", "some", "her", "would", "make", "like", "him", "into",
+               "time", "has", "look", "two", "more", "write", "go", "see",
+               "number", "no", "way", "could", "people", "my", "than", "first",
+               "water", "been", "call", "who", "oil", "its", "now", "find",
+               "long", "down", "day", "did", "get", "come", "made", "may",
+               "part", "over", "new", "sound", "take", "only", "little", "work",
+               "know", "place", "year", "live", "me", "back", "give", "most",
+               "very", "after", "thing", "our", "just", "name", "good",
+               "sentence", "man", "think", "say", "great", "help", "low",
+               "line", "differ", "turn", "cause", "much", "mean", "before",
+               "move", "right", "boy", "old", "too", "same", "tell", "does",
+               "set", "three", "want", "air", "well", "also", "play", "small",
+               "end", "put", "home", "read", "hand", "port", "large", "spell",
+               "add", "even", "land", "here", "must", "big", "high", "such",
+               "follow", "act", "why", "ask", "men", "change", "went", "light",
+               "kind", "off", "need", "house", "picture", "try", "us", "again",
+               "animal", "point", "mother", "world", "near", "build", "self",
+               "earth", "father", "head", "stand", "own", "page", "should",
+               "country", "found", "answer", "school", "grow", "study", "still",
+               "learn", "plant", "cover", "food", "sun", "four", "between",
+               "state", "keep", "eye", "never", "last", "let", "thought", "city",
+               "tree", "cross", "farm", "hard", "start", "might", "story", "saw",
+               "far", "sea", "draw", "left", "late", "run", "don't", "press",
+               "close", "night", "real", "life", "few", "north", "open", "seem",
+               "together", "next", "white", "children", "begin", "got", "walk",
+               "example", "ease", "paper", "group", "always", "music", "those",
+               "both", "mark", "often", "letter", "mile", "river", "car",
+               "feet", "care", "second", "book", "carry", "took", "science",
+               "eat", "room", "friend", "began", "idea", "fish", "mountain",
+               "stop", "once", "base", "hear", "horse", "cut", "sure", "watch",
+               "colour", "color", "face", "wood", "main", "enough", "plain",
+               "girl", "usual", "young", "ready", "above", "ever", "red", "list",
+               "feel", "talk", "bird", "soon", "body", "dog", "family", "direct",
+               "pose", "leave", "song", "measure", "door", "product", "black",
+               "short", "numeral", "class", "wind", "question", "happen",
+               "complete", "ship", "area", "half", "rock", "order", "fire",
+               "south", "problem", "piece", "told", "knew", "pass", "top",
+               "whole", "king", "space", "heard", "best", "hour", "better",
+               "true", "during", "hundred", "five", "remember", "step", "early",
+               "hold", "west", "ground", "interest", "reach", "fast", "verb",
+               "sing", "listen", "six", "table", "travel", "less", "morning",
+               "ten", "simple", "several", "toward", "war", "lay", "against",
+               "pattern", "slow", "center", "centre", "love", "person", "money",
+               "serve", "appear", "road", "map", "rain", "rule", "govern",
+               "pull", "cold", "notice", "voice", "unit", "power", "town",
+               "fine", "certain", "fly", "fall", "lead", "cry", "dark",
+               "machine", "note", "wait", "plan", "figure", "star", "box",
+               "noun", "field", "rest", "correct", "able", "pound", "done",
+               "beauty", "drive", "stood", "contain", "front", "teach", "week",
+               "final", "gave", "green", "oh", "quick", "develop", "ocean",
+               "warm", "free", "minute", "strong", "special", "mind", "behind",
+               "clear", "tail", "produce", "fact", "street", "inch", "multiply",
+               "nothing", "course", "stay", "wheel", "full", "force", "blue",
+               "object", "decide", "surface", "deep", "moon", "island", "foot",
+               "system", "busy", "test", "record", "boat", "common", "gold",
+               "possible", "plane", "instead", "dry", "wonder", "laugh",
+               "thousand", "ago", "ran", "check", "game", "shape", "equate",
+               "hot", "miss", "brought", "heat", "snow", "tire", "bring", "yes",
+               "distant", "fill", "east", "paint", "language", "among", "text",
+               "image", "summary", "data", "information", "report", "use",
+               "used", "using", "any", "every", "made", "being", "because"]
+
+# Word lists (one word on each line) added to the words an OCR conversion is
+# checked against, if they exist - e.g. a Dictionary.txt beside the program
+dictionaryFiles = ["Dictionary.txt", "/usr/share/dict/words"]
+
 # Current date
 date = str(time.strftime("%d-%m-%Y"))
 
-# Default settings - changes when settings.txt is loaded
+# Default settings - changes when settings.txt is loaded. noOfSummaries and
+# noOfOCRs are only read once, to start the counters in counters.txt (see
+# Allocator)
 settings = {"noOfDays":30, "noOfSummaries":1, "noOfOCRs":1}
 
 
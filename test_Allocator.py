@@ -0,0 +1,95 @@
+#   ALLOCATOR TESTS    #
+
+# =========================================================================== #
+'''
+Tests for OCR and summary numbers being handed out by several processes at
+once. Run with:
+python -m unittest test_Allocator
+Comments are attempted to be written in accordance with PEP 8 Style Guide:
+http://legacy.python.org/dev/peps/pep-0008/#comments
+https://google.github.io/styleguide/pyguide.html
+'''
+# =========================================================================== #
+
+
+
+# ====== Imports (Python Native Modules and My Program Modules) ====== #
+
+import multiprocessing
+import Allocator as A
+import unittest
+import tempfile
+import os
+
+
+
+# ====== Sub-Routines ====== #
+
+def take_numbers(path, worker, count, results):
+    '''Takes count numbers one at a time, reserving a block of 5 part way
+    through, and sends them all back. Numbers left in the process's block
+    are given back as it ends.'''
+    numbers = []
+    for i in range(count):
+        numbers.append(A.take("noOfOCRs", path))
+        if i == count // 2:
+            first = A.reserve("noOfOCRs", 5, path)
+            numbers.extend(range(first, first + 5))
+    results.put(numbers)
+
+
+
+# ====== Tests ====== #
+
+class Test_Concurrent_Allocators(unittest.TestCase):
+    '''Several processes taking numbers from the same counters file.'''
+    def test_no_duplicate_numbers(self):
+        workers = 6
+        counts = [1, 7, 16, 17, 40, 55]
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, A.counterPath)
+            # Counters start at 1, without looking at the document store
+            A.reset(path)
+            results = multiprocessing.Queue()
+            processes = [multiprocessing.Process(target=take_numbers, args=(path, worker, counts[worker], results))
+                         for worker in range(workers)]
+            for process in processes:
+                process.start()
+            numbers = []
+            for process in processes:
+                numbers.extend(results.get(timeout=60))
+            for process in processes:
+                process.join()
+                self.assertEqual(process.exitcode, 0)
+
+            self.assertEqual(len(numbers), sum(counts) + 5 * workers)
+            self.assertEqual(len(set(numbers)), len(numbers))
+            self.assertGreater(A.read_counters(path)["noOfOCRs"], max(numbers))
+
+    def test_unused_numbers_given_back(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, A.counterPath)
+            A.reset(path)
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(target=take_numbers, args=(path, 0, 3, results))
+            process.start()
+            numbers = results.get(timeout=60)
+            process.join()
+            # 3 numbers taken from a block of 16, then 5 reserved after it -
+            # the block's unused numbers are no longer at the end, so are
+            # skipped. Only numbers at the end can be given back
+            self.assertEqual(A.read_counters(path)["noOfOCRs"], max(numbers) + 1)
+
+            A.reset(path)
+            allocator = A.ID_Allocator("noOfSummaries", 16, path)
+            self.assertEqual([allocator.take(), allocator.take()], [1, 2])
+            allocator.release()
+            self.assertEqual(A.read_counters(path)["noOfSummaries"], 3)
+            self.assertEqual(A.reserve("noOfSummaries", 1, path), 3)
+
+
+
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+#   ENCRYPTION TESTS    #
+
+# =========================================================================== #
+'''
+Tests for the encryption formats - the original text format (which must give
+exactly what it always has), the binary formats and reading part of a file.
+Run with:
+python -m unittest test_Encryption
+Comments are attempted to be written in accordance with PEP 8 Style Guide:
+http://legacy.python.org/dev/peps/pep-0008/#comments
+https://google.github.io/styleguide/pyguide.html
+'''
+# =========================================================================== #
+
+
+
+# ====== Imports (Python Native Modules and My Program Modules) ====== #
+
+from unittest import mock
+import Encryption as E
+import unittest
+import random
+import io
+import os
+
+
+
+# ====== Sub-Routines ====== #
+
+def legacy_encrypt(message, key, modulo, password):
+    '''The text format as first written, a character at a time.'''
+    cipherText = "".join(chr((ord(message[i]) + ord(key[i % len(key)])) % modulo) for i in range(len(message)))
+    cipherText = key + "//%%//" + str(modulo) + "//%%//" + cipherText
+    return "".join(chr((ord(cipherText[i]) + ord(password[i % len(password)])) % 255)
+                   for i in range(len(cipherText)))
+
+def make_text(size, seed=0, extra=""):
+    '''Makes size characters of words, punctuation and line breaks, with
+    some of the characters in extra mixed in.'''
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz" * 4 + "     ,.\n" + extra
+    return "".join(rng.choice(letters) for i in range(size))
+
+def version_2(message):
+    '''Encrypts the text in binary format version 2 (one keystream, no
+    chunks), which is no longer written but can still be read.'''
+    nonce = os.urandom(16)
+    body = message.encode("utf-8", "surrogatepass")
+    return E.header.pack(E.magic, 2, 0, nonce) + E.xor(body, E.keystream(E.file_key(nonce), 0, len(body)))
+
+
+
+# ====== Tests ====== #
+
+class Test_Text_Format(unittest.TestCase):
+    '''The original text format.'''
+    def test_same_as_legacy(self):
+        key = bytes(range(32))
+        for size in (0, 5, E.vectorMinimum - 1, E.vectorMinimum, 5000):
+            message = make_text(size, size, "éü€")
+            with mock.patch("Encryption.os.urandom", return_value=key), \
+                 mock.patch("Encryption.random.randint", return_value=200):
+                encrypted = E.encrypt(message)
+            b64Key = E.b64encode(key).decode("utf-8")
+            self.assertEqual(encrypted, legacy_encrypt(message, b64Key, 200, E.Encryption().password))
+
+    def test_shift_vector_same_as_scalar(self):
+        if E.np is None:
+            self.skipTest("NumPy is not installed")
+        text = make_text(3000, 1, "é")
+        key = "aKey+/=09"
+        for modulo, direction, start in ((255, 1, 0), (127, 1, 5), (200, -1, 17)):
+            vector = E.shift(text, key, modulo, direction, start)
+            with mock.patch("Encryption.np", None):
+                scalar = E.shift(text, key, modulo, direction, start)
+            self.assertEqual(vector, scalar)
+
+    def test_round_trip(self):
+        message = make_text(10000, 2)
+        self.assertEqual(E.decrypt(E.encrypt(message)), message)
+        self.assertEqual(E.decrypt_bytes(E.encrypt(message).encode("utf-8")), message)
+
+    def test_stream_same_as_whole(self):
+        message = make_text(10000, 3)
+        target = io.StringIO(newline="")
+        E.encrypt_stream(io.StringIO(message), target, 999)
+        encrypted = target.getvalue()
+        self.assertEqual(E.decrypt(encrypted), message)
+        self.assertEqual("".join(E.decrypt_stream(io.StringIO(encrypted, newline=""), 777)), message)
+
+
+class Test_Binary_Formats(unittest.TestCase):
+    '''Binary format versions 2 and 3.'''
+    def setUp(self):
+        self.message = make_text(3 * E.blockSize // 2, 4, "é€😀")
+
+    def test_version_3_round_trip(self):
+        data = E.encrypt_bytes(self.message)
+        self.assertEqual(E.format_version(data), 3)
+        self.assertEqual(E.decrypt_bytes(data), self.message)
+        self.assertEqual("".join(E.read_stream(io.BytesIO(data))), self.message)
+        self.assertEqual(E.decrypt_bytes(E.encrypt_bytes("")), "")
+
+    def test_version_2_round_trip(self):
+        data = version_2(self.message)
+        self.assertEqual(E.format_version(data), 2)
+        self.assertEqual(E.decrypt_bytes(data), self.message)
+        self.assertEqual("".join(E.read_stream(io.BytesIO(data), 1001)), self.message)
+
+    def test_unknown_version(self):
+        data = bytearray(E.encrypt_bytes(self.message))
+        data[len(E.magic)] = 9
+        with self.assertRaises(ValueError):
+            E.decrypt_bytes(bytes(data))
+
+
+class Test_Random_Access(unittest.TestCase):
+    '''Reading part of a file with Encrypted_Reader.'''
+    def test_read_matches_slice(self):
+        # Several chunks, with characters of every UTF-8 length across them
+        message = make_text(3 * E.blockSize, 5, "é€😀" * 10)
+        reader = E.Encrypted_Reader(io.BytesIO(E.encrypt_bytes(message)))
+        self.assertGreater(len(reader.chunks), 3)
+        self.assertEqual(reader.length, len(message))
+        rng = random.Random(6)
+        starts = reader.starts[1:-1] + [rng.randrange(len(message)) for i in range(20)]
+        for start in starts:
+            for count in (1, 10, E.blockSize + 3):
+                self.assertEqual(reader.read(start, count), message[start:start + count])
+        self.assertEqual(reader.read(), message)
+        self.assertEqual(reader.read(len(message) - 5), message[-5:])
+        self.assertEqual(reader.read(len(message) + 5, 10), "")
+
+    def test_older_format_read_whole(self):
+        message = make_text(500, 7)
+        reader = E.Encrypted_Reader(io.BytesIO(version_2(message)))
+        self.assertEqual(reader.read(100, 50), message[100:150])
+        reader = E.Encrypted_Reader(io.BytesIO(E.encrypt(message).encode("utf-8")))
+        self.assertEqual(reader.read(100, 50), message[100:150])
+
+    def test_incomplete_file(self):
+        data = E.encrypt_bytes(make_text(500, 8))
+        with self.assertRaises(ValueError):
+            E.Encrypted_Reader(io.BytesIO(data[:-E.footer.size]))
+
+
+
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    unittest.main()
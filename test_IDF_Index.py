@@ -0,0 +1,82 @@
+#   IDF INDEX TESTS    #
+
+# =========================================================================== #
+'''
+Tests for the IDF index being added to by several processes at once. Run with:
+python -m unittest test_IDF_Index
+Comments are attempted to be written in accordance with PEP 8 Style Guide:
+http://legacy.python.org/dev/peps/pep-0008/#comments
+https://google.github.io/styleguide/pyguide.html
+'''
+# =========================================================================== #
+
+
+
+# ====== Imports (Python Native Modules and My Program Modules) ====== #
+
+import multiprocessing
+import IDF_Index as I
+import unittest
+import tempfile
+import os
+
+
+
+# ====== Sub-Routines ====== #
+
+def add_documents(indexFile, worker, count):
+    '''Adds count documents, each with its own words (so the table has to
+    grow while other processes are adding to it).'''
+    for i in range(count):
+        name = "OCR_#" + str(worker) + "_" + str(i)
+        words = " ".join("word" + str(worker) + "x" + str(i) + "x" + str(j) for j in range(30))
+        I.add_file(name, "shared " + words, indexFile)
+
+
+
+# ====== Tests ====== #
+
+class Test_Concurrent_Writers(unittest.TestCase):
+    '''Several processes adding documents to the same index.'''
+    def test_no_documents_lost(self):
+        workers = 6
+        count = 40
+        with tempfile.TemporaryDirectory() as folder:
+            indexFile = os.path.join(folder, I.indexPath)
+            I.IDF_Index(indexFile, writable=True).close()
+            processes = [multiprocessing.Process(target=add_documents, args=(indexFile, worker, count))
+                         for worker in range(workers)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+                self.assertEqual(process.exitcode, 0)
+
+            index = I.IDF_Index(indexFile)
+            try:
+                self.assertEqual(index.documents, workers * count)
+                self.assertEqual(index.frequency("shared"), workers * count)
+                self.assertEqual(index.frequency("word0x0x0"), 1)
+                self.assertEqual(len(index.indexed()), workers * count)
+            finally:
+                index.close()
+
+    def test_file_added_once(self):
+        with tempfile.TemporaryDirectory() as folder:
+            indexFile = os.path.join(folder, I.indexPath)
+            I.IDF_Index(indexFile, writable=True).close()
+            I.add_file("OCR_#1_01-01-2017", "some text", indexFile)
+            I.add_file("OCR_#1_01-01-2017", "some text", indexFile)
+            index = I.IDF_Index(indexFile)
+            try:
+                self.assertEqual(index.documents, 1)
+                self.assertEqual(index.frequency("some"), 1)
+            finally:
+                index.close()
+
+
+
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    unittest.main()
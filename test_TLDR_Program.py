@@ -0,0 +1,144 @@
+#   TLDR TESTS    #
+
+# =========================================================================== #
+'''
+Tests that the other summary classes (vectorised, streaming and incremental)
+give the same scores and summaries as Summary. Nothing is saved. Run with:
+python -m unittest test_TLDR_Program
+Comments are attempted to be written in accordance with PEP 8 Style Guide:
+http://legacy.python.org/dev/peps/pep-0008/#comments
+https://google.github.io/styleguide/pyguide.html
+'''
+# =========================================================================== #
+
+
+
+# ====== Imports (Python Native Modules and My Program Modules) ====== #
+
+import TLDR_Program as TLDR
+import unittest
+import random
+import io
+
+
+
+# ====== Sub-Routines ====== #
+
+words = ("the cat dog sat on mat and ran far away from home river bank tree grew tall near old "
+         "house where people lived quiet lives every day was much like before until storm came").split()
+
+def make_sentences(count, seed=0):
+    '''Makes count sentences of words, some repeated, with a mix of
+    punctuation and line breaks after them.'''
+    rng = random.Random(seed)
+    sentences = []
+    for i in range(count):
+        if sentences and rng.random() < 0.1:
+            sentences.append(rng.choice(sentences))
+        else:
+            sentence = " ".join(rng.choice(words) for j in range(rng.randint(3, 14)))
+            sentences.append(sentence.capitalize() + rng.choice([".", ".", "!", "?", ".\n", ".\n\n"]))
+    return sentences
+
+def make_text(count, seed=0):
+    '''Joins make_sentences into one text.'''
+    return " ".join(make_sentences(count, seed))
+
+def ranked(summary):
+    '''Scores the summary without saving it.
+
+    Returns:
+        The summary object, with wordScore, sentenceScore and summary filled
+    '''
+    summary.rank_words()
+    summary.rank_sentences()
+    summary.form_summary()
+    return summary
+
+
+
+# ====== Tests ====== #
+
+class Test_Vector_Summary(unittest.TestCase):
+    '''Vector_Summary against Summary.'''
+    def setUp(self):
+        if TLDR.np is None:
+            self.skipTest("NumPy is not installed")
+
+    def test_same_scores(self):
+        for seed in range(5):
+            text = make_text(200, seed)
+            expected = ranked(TLDR.Summary("River bank tree", text, 5))
+            actual = ranked(TLDR.Vector_Summary("River bank tree", text, 5))
+            self.assertEqual(actual.wordScore, expected.wordScore)
+            self.assertEqual(actual.sentenceScore, expected.sentenceScore)
+            self.assertEqual(actual.summary, expected.summary)
+
+
+class Test_Stream_Summary(unittest.TestCase):
+    '''Stream_Summary against Summary.'''
+    def test_same_summary(self):
+        for seed in range(5):
+            text = make_text(300, seed)
+            expected = ranked(TLDR.Summary("Old house", text, 4))
+            for chunkSize in (7, 100, 100000):
+                actual = ranked(TLDR.Stream_Summary("Old house", io.StringIO(text), 4, chunkSize))
+                self.assertEqual(actual.wordScore, expected.wordScore)
+                self.assertEqual(actual.summary, expected.summary)
+
+    def test_iterable_source(self):
+        sentences = make_sentences(300, 9)
+        text = " ".join(sentences)
+        expected = ranked(TLDR.Summary("Storm", text, 3))
+        pieces = [sentence + " " for sentence in sentences[:-1]] + [sentences[-1]]
+        actual = ranked(TLDR.Stream_Summary("Storm", iter(pieces), 3))
+        self.assertEqual(actual.summary, expected.summary)
+
+    def test_binary_source(self):
+        with self.assertRaises(TypeError):
+            ranked(TLDR.Stream_Summary("Storm", io.BytesIO(b"Some text. More text."), 1))
+
+
+class Test_Summary_Session(unittest.TestCase):
+    '''Summary_Session, after a series of edits, against Summary for the
+    final text.'''
+    def check(self, session, title, text):
+        expected = ranked(TLDR.Summary(title, text, session.summaryAmount))
+        self.assertEqual(session.summarise(text, save=False), expected.summary)
+        self.assertEqual(session.sentenceScore, expected.sentenceScore)
+
+    def test_edits(self):
+        rng = random.Random(1)
+        sentences = make_sentences(150, 1)
+        session = TLDR.Summary_Session("Quiet lives", 5)
+        self.check(session, "Quiet lives", " ".join(sentences))
+        for edit in range(20):
+            position = rng.randrange(len(sentences))
+            change = rng.choice(["insert", "delete", "replace"])
+            if change == "insert":
+                sentences[position:position] = make_sentences(rng.randint(1, 4), edit + 100)
+            elif change == "delete":
+                del sentences[position:position + rng.randint(1, 3)]
+            else:
+                sentences[position] = make_sentences(1, edit + 200)[0]
+            self.check(session, "Quiet lives", " ".join(sentences))
+
+    def test_title_change(self):
+        text = make_text(100, 2)
+        session = TLDR.Summary_Session("Cat", 3)
+        self.check(session, "Cat", text)
+        session.set_title("Storm came")
+        self.check(session, "Storm came", text)
+
+    def test_whole_text_replaced(self):
+        session = TLDR.Summary_Session("Tree", 3)
+        self.check(session, "Tree", make_text(80, 3))
+        self.check(session, "Tree", make_text(80, 4))
+        self.check(session, "Tree", "")
+
+
+
+# ====== Python Boiler Plate ====== #
+
+if __name__ == "__main__":
+    unittest.main()